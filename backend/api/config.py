@@ -32,11 +32,104 @@ class Config:
     REDIS_DB: int = int(os.getenv("REDIS_DB", "0"))
     REDIS_TIMEOUT: int = int(os.getenv("REDIS_TIMEOUT", "5"))
     REDIS_TTL_SECONDS: int = int(os.getenv("REDIS_TTL_SECONDS", "300"))  # 5 minutes
+    # Topology: "standalone", "sentinel" or "cluster"
+    REDIS_MODE: str = os.getenv("REDIS_MODE", "standalone")
+    REDIS_SENTINELS: str = os.getenv("REDIS_SENTINELS", "")  # host:port,host:port
+    REDIS_SENTINEL_MASTER: str = os.getenv("REDIS_SENTINEL_MASTER", "mymaster")
+    REDIS_CLUSTER_NODES: str = os.getenv("REDIS_CLUSTER_NODES", "")  # seed nodes, host:port,...
+    # Standalone read replicas for GET paths (host:port,...); one is picked per process
+    REDIS_REPLICA_HOSTS: str = os.getenv("REDIS_REPLICA_HOSTS", "")
+    
+    # Storage backend: "redis", or "file" for single-node deployments without
+    # Redis (reads the worker's memory-mapped snapshot file)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "redis")
+    SNAPSHOT_FILE_PATH: str = os.getenv("SNAPSHOT_FILE_PATH", "/data/snapshot/eta.snap")
+    # History streams go to their own file so the snapshot file stays small
+    SNAPSHOT_HISTORY_FILE_PATH: str = os.getenv("SNAPSHOT_HISTORY_FILE_PATH", "/data/snapshot/history.snap")
+    # How often API processes check for a newly published snapshot file (seconds)
+    SNAPSHOT_FILE_CHECK_SECONDS: float = float(os.getenv("SNAPSHOT_FILE_CHECK_SECONDS", "0.5"))
+    
+    # Local ETA read model replayed from the worker's compacted Kafka topic
+    ETA_REPLICA_ENABLED: bool = os.getenv("ETA_REPLICA_ENABLED", "false").lower() == "true"
+    KAFKA_BOOTSTRAP_SERVERS: str = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092")
+    KAFKA_TOPIC_ETA_STATE: str = os.getenv("KAFKA_TOPIC_ETA_STATE", "eta_state")
+    ETA_REPLICA_RETRY_SECONDS: int = int(os.getenv("ETA_REPLICA_RETRY_SECONDS", "5"))
+    
+    # HTTP caching
+    # Upper bound for Cache-Control max-age on ETA responses (seconds)
+    ETA_MAX_AGE_SECONDS: int = int(os.getenv("ETA_MAX_AGE_SECONDS", "30"))
+    STATIONS_MAX_AGE_SECONDS: int = int(os.getenv("STATIONS_MAX_AGE_SECONDS", "3600"))
+    # Encoded response bodies (per version and encoding) kept per API process
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "4096"))
+    
+    # How often API processes check for a new station catalog (seconds)
+    STATION_CATALOG_REFRESH_SECONDS: int = int(os.getenv("STATION_CATALOG_REFRESH_SECONDS", "30"))
+    
+    # Line status: feed data older than this is reported as stale (seconds)
+    LINE_STATUS_STALE_SECONDS: int = int(os.getenv("LINE_STATUS_STALE_SECONDS", "120"))
+    
+    # Worker heartbeat (/health/feeds): a heartbeat older than this means the
+    # worker has stalled; feeds use LINE_STATUS_STALE_SECONDS. The heartbeat
+    # is re-read at most every HEARTBEAT_CACHE_SECONDS per process
+    WORKER_STALE_SECONDS: int = int(os.getenv("WORKER_STALE_SECONDS", "120"))
+    HEARTBEAT_CACHE_SECONDS: float = float(os.getenv("HEARTBEAT_CACHE_SECONDS", "2"))
+    
+    # Unknown-station filter: how often to check a line for a new published
+    # station set (seconds); "no data" results are cached for
+    # NEGATIVE_CACHE_SECONDS, up to NEGATIVE_CACHE_SIZE entries
+    KNOWN_STATIONS_REFRESH_SECONDS: int = int(os.getenv("KNOWN_STATIONS_REFRESH_SECONDS", "5"))
+    NEGATIVE_CACHE_SECONDS: float = float(os.getenv("NEGATIVE_CACHE_SECONDS", "5"))
+    NEGATIVE_CACHE_SIZE: int = int(os.getenv("NEGATIVE_CACHE_SIZE", "10000"))
+    
+    # Trip planning: how often to check for a new trip index per line (seconds)
+    TRIP_INDEX_REFRESH_SECONDS: int = int(os.getenv("TRIP_INDEX_REFRESH_SECONDS", "5"))
+    TRIP_PLAN_MAX_OPTIONS: int = int(os.getenv("TRIP_PLAN_MAX_OPTIONS", "5"))
+    # Most trip IDs accepted by one bulk /trips request
+    TRIP_BULK_MAX: int = int(os.getenv("TRIP_BULK_MAX", "50"))
+    
+    # Arrival history analytics
+    HISTORY_MAX_WINDOW_MINUTES: int = int(os.getenv("HISTORY_MAX_WINDOW_MINUTES", "1440"))
+    HISTORY_MAX_QUERY_EVENTS: int = int(os.getenv("HISTORY_MAX_QUERY_EVENTS", "100000"))
+    # Stream entries read per XREVRANGE while filtering a history query
+    HISTORY_QUERY_PAGE_SIZE: int = int(os.getenv("HISTORY_QUERY_PAGE_SIZE", "5000"))
+    HISTORY_BUNCHING_RATIO: float = float(os.getenv("HISTORY_BUNCHING_RATIO", "0.25"))
+    
+    # Nearby stations search
+    NEARBY_CELL_METERS: int = int(os.getenv("NEARBY_CELL_METERS", "500"))
+    NEARBY_DEFAULT_RADIUS_METERS: int = int(os.getenv("NEARBY_DEFAULT_RADIUS_METERS", "1000"))
+    NEARBY_MAX_RADIUS_METERS: int = int(os.getenv("NEARBY_MAX_RADIUS_METERS", "5000"))
+    NEARBY_MAX_K: int = int(os.getenv("NEARBY_MAX_K", "10"))
+    
+    # Per-token rate limiting (token bucket per JWT "sub", shared through Redis;
+    # per API process with STORAGE_BACKEND=file)
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_PER_SECOND: float = float(os.getenv("RATE_LIMIT_PER_SECOND", "5"))
+    RATE_LIMIT_BURST: int = int(os.getenv("RATE_LIMIT_BURST", "20"))
+    # Tokens a process takes from Redis at once and may spend locally, and for how long
+    RATE_LIMIT_LOCAL_BATCH: int = int(os.getenv("RATE_LIMIT_LOCAL_BATCH", "5"))
+    RATE_LIMIT_LEASE_SECONDS: float = float(os.getenv("RATE_LIMIT_LEASE_SECONDS", "1"))
+    
+    # Overload shedding per API process (0 disables a check)
+    SHED_MAX_IN_FLIGHT: int = int(os.getenv("SHED_MAX_IN_FLIGHT", "256"))
+    SHED_MAX_LOOP_LAG_MS: int = int(os.getenv("SHED_MAX_LOOP_LAG_MS", "200"))
+    SHED_LAG_CHECK_INTERVAL_MS: int = int(os.getenv("SHED_LAG_CHECK_INTERVAL_MS", "100"))
+    SHED_RETRY_AFTER_SECONDS: int = int(os.getenv("SHED_RETRY_AFTER_SECONDS", "1"))
+    
+    # Request profiling (off unless PROFILE_REQUESTS > 0 or a worker receives SIGUSR2)
+    PROFILE_REQUESTS: int = int(os.getenv("PROFILE_REQUESTS", "0"))
+    PROFILE_SIGNAL_REQUESTS: int = int(os.getenv("PROFILE_SIGNAL_REQUESTS", "50"))
+    PROFILE_SAMPLE_RATE: float = float(os.getenv("PROFILE_SAMPLE_RATE", "0.1"))
+    PROFILE_SAMPLE_INTERVAL_MS: int = int(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "1"))
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "/tmp/profiles")
     
     # API Configuration
     API_HOST: str = os.getenv("API_HOST", "0.0.0.0")
     API_PORT: int = int(os.getenv("API_PORT", "8000"))
     
+    # Production server (gunicorn + uvicorn workers)
+    API_WORKERS: int = int(os.getenv("API_WORKERS", str(os.cpu_count() or 1)))
+    WARMUP_RETRY_SECONDS: int = int(os.getenv("WARMUP_RETRY_SECONDS", "5"))
+    
     # Supported subway lines (MVP focus on main Manhattan lines)
     # Can be expanded to support all MTA lines
     SUPPORTED_LINES = ["1", "2", "3", "4", "5", "6", "7", "A", "B", "C", "D", "E", "F", "G", "J", "L", "M", "N", "Q", "R", "W", "Z"]
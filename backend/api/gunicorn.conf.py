@@ -0,0 +1,25 @@
+"""
+Gunicorn configuration for the production API server
+
+Usage: gunicorn -c gunicorn.conf.py main:app
+"""
+from config import Config
+
+config = Config()
+
+bind = f"{config.API_HOST}:{config.API_PORT}"
+workers = config.API_WORKERS
+worker_class = "workers.ProductionUvicornWorker"
+
+# Import the app (and its static data) once in the master, then fork
+preload_app = True
+
+keepalive = 5
+graceful_timeout = 30
+timeout = 30
+
+
+def on_starting(server):
+    """Warm static station data in the master before workers are forked"""
+    from main import preload
+    preload()
@@ -1,27 +1,94 @@
 """
 FastAPI application for NYC Subway ETA API
 Provides REST endpoints to query cached ETA data
+
+Development: python main.py (single process, auto-reload)
+Production:  gunicorn -c gunicorn.conf.py main:app
 """
+import asyncio
+import signal
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import uvicorn
 
 from config import Config
-from routers import eta_router
+from routers import (
+    eta_router, nearby_router, lines_router, history_router, trips_router, positions_router, gtfs_rt_router
+)
 from routers import health
+from routers.dependencies import redis_service, eta_replica, warm_up
+from services.profiling import RequestProfiler, ProfilingMiddleware
+from services.load_shedding import LoadShedder, LoadSheddingMiddleware
 import logging
 
 config = Config()
 config.validate()  # Validate configuration on startup
 
 logger = logging.getLogger(__name__)
+request_profiler = RequestProfiler(config)
+load_shedder = LoadShedder(config)
+
+
+def preload():
+    """
+    Load static station data before worker processes are forked
+    
+    Called from the gunicorn master (see gunicorn.conf.py) so every worker
+    inherits a warm station catalog and spatial index. The Redis pool is
+    closed afterwards so workers do not share sockets with the master.
+    """
+    if warm_up():
+        logger.info("Preloaded station data before fork")
+    redis_service.close()
+
+
+async def _warm_up_until_ready(app: FastAPI):
+    """Retry warm-up in the background until it succeeds"""
+    while not await asyncio.to_thread(warm_up):
+        logger.warning(f"Warm-up failed (Redis unavailable), retrying in {config.WARMUP_RETRY_SECONDS}s")
+        await asyncio.sleep(config.WARMUP_RETRY_SECONDS)
+    app.state.ready = True
+    logger.info("API warm-up complete")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open the Redis pool and warm caches before serving traffic"""
+    # `kill -USR2 <worker pid>` profiles a sample of the next requests
+    signal.signal(signal.SIGUSR2, request_profiler.handle_signal)
+    if config.PROFILE_REQUESTS:
+        request_profiler.arm(config.PROFILE_REQUESTS)
+    
+    lag_monitor = asyncio.create_task(load_shedder.monitor())
+    # Started here rather than in preload: threads do not survive the fork
+    eta_replica.start()
+    
+    app.state.ready = await asyncio.to_thread(warm_up)
+    warm_up_task = None
+    if app.state.ready:
+        logger.info("API warm-up complete")
+    else:
+        warm_up_task = asyncio.create_task(_warm_up_until_ready(app))
+    
+    yield
+    
+    if warm_up_task:
+        warm_up_task.cancel()
+    lag_monitor.cancel()
+    eta_replica.stop()
+    request_profiler.flush()
+    redis_service.close()
+
 
 app = FastAPI(
     title="NYC Subway ETA API",
     description="Real-time subway arrival estimates for Manhattan-bound lines",
     version="1.0.0",
     docs_url="/docs",
-    redoc_url="/redoc"
+    redoc_url="/redoc",
+    lifespan=lifespan
 )
 
 # CORS middleware (configure as needed for production)
@@ -33,9 +100,22 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Sampled request profiling (a single integer check per request while disarmed)
+app.add_middleware(ProfilingMiddleware, profiler=request_profiler)
+
+# Shed requests with 503 + Retry-After while this process is overloaded
+# (outermost, so rejected requests skip all other middleware)
+app.add_middleware(LoadSheddingMiddleware, shedder=load_shedder)
+
 # Include routers
 app.include_router(health.router)
 app.include_router(eta_router)
+app.include_router(nearby_router)
+app.include_router(lines_router)
+app.include_router(history_router)
+app.include_router(trips_router)
+app.include_router(positions_router)
+app.include_router(gtfs_rt_router)
 
 
 @app.get("/")
@@ -45,7 +125,8 @@ async def root():
         "service": "NYC Subway ETA API",
         "version": "1.0.0",
         "docs": "/docs",
-        "health": "/health"
+        "health": "/health",
+        "ready": "/ready"
     }
 
 
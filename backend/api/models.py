@@ -1,7 +1,7 @@
 """
 Pydantic models for API request/response schemas
 """
-from typing import Optional, List
+from typing import Optional, Dict, List, Union
 from pydantic import BaseModel, Field
 from datetime import datetime
 
@@ -12,7 +12,8 @@ class TrainETA(BaseModel):
     eta_minutes: int = Field(..., description="Minutes until arrival", ge=0)
     train_id: str = Field(..., description="GTFS trip ID")
     route_id: str = Field(..., description="Subway line identifier")
-    status: str = Field(default="on_time", description="Train status")
+    status: str = Field(default="on_time", description="on_time, delayed, early, unscheduled or scheduled (static timetable during a feed outage)")
+    delay_seconds: Optional[int] = Field(None, description="Predicted minus scheduled arrival, when the trip is in the static schedule")
 
 
 class DirectionETA(BaseModel):
@@ -30,6 +31,142 @@ class ETAResponse(BaseModel):
     last_updated: Optional[str] = Field(None, description="When data was last updated")
 
 
+class StationLineETA(BaseModel):
+    """ETAs for one line at a station"""
+    line: str = Field(..., description="Subway line identifier")
+    etas: List[DirectionETA] = Field(..., description="ETAs grouped by direction")
+
+
+class NearbyStation(BaseModel):
+    """A station near the requested location with its current ETAs"""
+    station_id: str = Field(..., description="GTFS station ID")
+    name: str = Field(..., description="Human-readable station name")
+    lat: float = Field(..., description="Station latitude")
+    lon: float = Field(..., description="Station longitude")
+    distance_m: float = Field(..., description="Distance from the requested location in meters")
+    lines: List[str] = Field(..., description="Lines serving the station")
+    arrivals: List[StationLineETA] = Field(..., description="Current ETAs per line")
+
+
+class NearbyResponse(BaseModel):
+    """Response model for nearby stations endpoint"""
+    lat: float
+    lon: float
+    stations: List[NearbyStation] = Field(..., description="Stations sorted by distance")
+
+
+class DirectionStatus(BaseModel):
+    """Service summary for one direction of a line"""
+    direction: str = Field(..., description="Direction: N (Northbound) or S (Southbound)")
+    active_trains: int = Field(..., description="Trains currently reporting predictions", ge=0)
+    median_headway_minutes: Optional[float] = Field(None, description="Median headway at key stations")
+    max_headway_minutes: Optional[float] = Field(None, description="Largest headway at key stations")
+    key_stations: List[str] = Field(default_factory=list, description="Stations the headways were measured at")
+
+
+class LineStatusSummary(BaseModel):
+    """Service summary for a line"""
+    line: str = Field(..., description="Subway line identifier")
+    status: str = Field(..., description="good_service, gaps, no_service or stale")
+    directions: List[DirectionStatus]
+    feed_timestamp: Optional[float] = Field(None, description="FeedHeader timestamp of the source feed")
+    feed_age_seconds: Optional[float] = Field(None, description="Age of the source feed data")
+    updated_at: Optional[str] = Field(None, description="When the worker computed the summary")
+
+
+class LineStatusResponse(BaseModel):
+    """Response model for line status endpoint"""
+    lines: List[LineStatusSummary]
+    updated_at: Optional[str] = None
+
+
+class SummaryStats(BaseModel):
+    """Distribution summary of a sample"""
+    count: int
+    mean: float
+    median: float
+    p90: float
+    max: float
+    stdev: float
+    cv: Optional[float] = Field(None, description="Coefficient of variation (headways only)")
+
+
+class BunchingStats(BaseModel):
+    """Bunched arrivals (headway well below the stop's median)"""
+    count: int
+    rate: Optional[float] = Field(None, description="Share of headways that are bunched")
+
+
+class HistoryStatsResponse(BaseModel):
+    """Response model for arrival history statistics"""
+    line: str
+    station_id: Optional[str] = None
+    direction: Optional[str] = None
+    window_minutes: int
+    arrivals: int = Field(..., description="Observed arrivals in the window")
+    headway_minutes: Optional[SummaryStats] = None
+    bunching: BunchingStats
+    prediction_error_seconds: Optional[SummaryStats] = Field(
+        None, description="Observed arrival minus first prediction"
+    )
+    abs_error_by_lead_seconds: dict = Field(
+        default_factory=dict, description="Absolute prediction error by lead time bucket"
+    )
+
+
+class TripOption(BaseModel):
+    """A train serving both stops of a trip plan"""
+    trip_id: str = Field(..., description="GTFS trip ID")
+    direction: str = Field(..., description="Direction: N (Northbound) or S (Southbound)")
+    board_time: str = Field(..., description="ISO format arrival time at the origin")
+    arrive_time: str = Field(..., description="ISO format arrival time at the destination")
+    board_in_minutes: int = Field(..., description="Minutes until the train reaches the origin", ge=0)
+    ride_minutes: int = Field(..., description="Minutes from origin to destination", ge=0)
+    stops: int = Field(..., description="Number of stops travelled")
+
+
+class TripPlanResponse(BaseModel):
+    """Response model for trip planning endpoint"""
+    line: str
+    from_station_id: str
+    to_station_id: str
+    options: List[TripOption] = Field(..., description="Trains sorted by boarding time")
+
+
+class TripStop(BaseModel):
+    """A remaining stop of a followed trip"""
+    station_id: str = Field(..., description="GTFS station ID")
+    arrival_time: str = Field(..., description="ISO format predicted arrival time")
+    eta_minutes: int = Field(..., description="Minutes until arrival", ge=0)
+
+
+class TripPosition(BaseModel):
+    """Where a followed train is (see /positions/{line})"""
+    status: str = Field(..., description="incoming_at, stopped_at or in_transit_to")
+    current_stop: Optional[str] = None
+    next_stop: Optional[str] = None
+    progress: float = Field(..., description="Fraction of the run from current_stop to next_stop")
+    lat: float
+    lon: float
+    timestamp: Optional[int] = Field(None, description="Epoch seconds of the vehicle report")
+
+
+class TripResponse(BaseModel):
+    """Response model for following one train"""
+    trip_id: str = Field(..., description="GTFS trip ID")
+    line: str
+    direction: str = Field(..., description="Direction: N (Northbound) or S (Southbound)")
+    stops: List[TripStop] = Field(..., description="Remaining stops in travel order")
+    position: Optional[TripPosition] = None
+    updated_at: float = Field(..., description="Epoch seconds the worker wrote the trip")
+
+
+class TripsResponse(BaseModel):
+    """Response model for bulk trip lookup"""
+    trips: List[TripResponse]
+    missing: List[str] = Field(default_factory=list, description="Requested trip IDs not in the feed")
+
+
 class ErrorResponse(BaseModel):
     """Error response model"""
     error: str = Field(..., description="Error type")
@@ -43,3 +180,44 @@ class HealthResponse(BaseModel):
     redis: str
     timestamp: str
 
+
+class FeedHealth(BaseModel):
+    """Freshness of one MTA feed as last seen by the worker"""
+    feed: str
+    status: str = Field(..., description="ok, stale or failing")
+    last_success: Optional[float] = Field(None, description="Epoch of the last successful fetch + parse")
+    last_attempt: Optional[float] = None
+    header_timestamp: Optional[int] = Field(None, description="FeedHeader.timestamp of the last parsed feed")
+    data_age_seconds: Optional[float] = Field(None, description="Seconds since the header timestamp")
+    entities: Optional[int] = None
+    failures: int = Field(0, description="Consecutive failed attempts")
+    error: Optional[str] = None
+
+
+class WorkerHealthResponse(BaseModel):
+    """Worker heartbeat and per-feed freshness"""
+    status: str = Field(..., description="healthy, degraded (some feeds stale or failing) or stalled")
+    heartbeat_age_seconds: Optional[float] = None
+    cycles: Optional[int] = None
+    cycle_seconds: Optional[float] = None
+    pipeline_seconds: Optional[float] = Field(None, description="Time the fetch/parse/write pipeline ran this cycle")
+    poll_interval: Optional[int] = None
+    feeds: List[FeedHealth] = []
+    pipeline: Dict[str, Dict[str, float]] = {}
+    timestamp: str
+
+
+class ReadinessResponse(BaseModel):
+    """Readiness check response"""
+    status: str
+    ready: bool
+    timestamp: str
+
+
+class PositionsResponse(BaseModel):
+    """Response model for train positions endpoint (one array per train)"""
+    line: str = Field(..., description="Subway line identifier")
+    version: str = Field(..., description="Snapshot version the positions belong to")
+    updated_at: float = Field(..., description="Epoch seconds the worker wrote the positions")
+    fields: List[str] = Field(..., description="Column names of each train row: trip_id, direction, status, current_stop, next_stop, progress, lat, lon, timestamp")
+    trains: List[List[Union[str, float, int, None]]] = Field(..., description="One row per train, in `fields` order")
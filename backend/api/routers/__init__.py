@@ -1,5 +1,11 @@
 """Routers package"""
 from .eta import router as eta_router
+from .nearby import router as nearby_router
+from .lines import router as lines_router
+from .history import router as history_router
+from .trips import router as trips_router
+from .positions import router as positions_router
+from .gtfs_rt import router as gtfs_rt_router
 
-__all__ = ["eta_router"]
+__all__ = ["eta_router", "nearby_router", "lines_router", "history_router", "trips_router", "positions_router", "gtfs_rt_router"]
 
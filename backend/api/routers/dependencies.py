@@ -0,0 +1,75 @@
+"""
+Shared service instances and dependencies for routers
+"""
+import math
+from typing import Optional
+
+from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+
+from ..config import Config
+from ..services.redis_service import RedisService
+from ..services.snapshot_file import FileSnapshotService
+from ..services.auth_service import AuthService
+from ..services.station_catalog import StationCatalog
+from ..services.spatial_index import StationIndex
+from ..services.trip_index import TripIndex
+from ..services.rate_limit import RateLimiter
+from ..services.eta_replica import ETAReplica
+from ..services.encoding import ResponseEncoder
+from ..services.known_stations import KnownStations, MissCache
+from ..services.worker_health import WorkerHealth
+
+security = HTTPBearer()
+config = Config()
+# Named for the default backend; with STORAGE_BACKEND=file the same read
+# paths run against the worker's snapshot file
+redis_service = FileSnapshotService(config) if config.STORAGE_BACKEND == "file" else RedisService(config)
+auth_service = AuthService(config)
+station_catalog = StationCatalog(redis_service, config)
+station_index = StationIndex(station_catalog, config)
+trip_index = TripIndex(redis_service, config)
+rate_limiter = RateLimiter(redis_service, config)
+eta_replica = ETAReplica(config)
+response_encoder = ResponseEncoder(config)
+known_stations = KnownStations(station_catalog, redis_service, config)
+eta_misses = MissCache(config)
+worker_health = WorkerHealth(redis_service, config)
+
+
+def eta_source(line: Optional[str] = None):
+    """
+    Where to read ETAs from: the local Kafka replica once it has caught up
+    (and holds the line, if given), otherwise Redis
+    """
+    if eta_replica.ready and (line is None or eta_replica.serves(line)):
+        return eta_replica
+    return redis_service
+
+
+def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
+    """Dependency to verify JWT token and apply the token's rate limit"""
+    payload = auth_service.verify_token(credentials.credentials)
+    retry_after = rate_limiter.check(payload.get("sub"))
+    if retry_after:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Rate limit exceeded",
+            headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+        )
+    return payload
+
+
+def warm_up() -> bool:
+    """
+    Open the Redis connection pool (or map the snapshot file) and load
+    static data into memory
+    
+    Returns:
+        True if storage is reachable and caches are warm
+    """
+    if not redis_service.ping():
+        return False
+    station_catalog.refresh(force=True)
+    station_index.refresh()
+    return True
@@ -1,33 +1,30 @@
 """
 ETA router - handles ETA-related endpoints
 """
+import gzip
 import logging
 from typing import Optional
-from fastapi import APIRouter, HTTPException, Depends, status
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, status
 
 from ..models import ETAResponse, ErrorResponse
-from ..config import Config
-from ..services.redis_service import RedisService
-from ..services.auth_service import AuthService
+from ..services.http_cache import (
+    make_etag, content_etag, etag_matches, max_age_until, cache_headers, not_modified, accepted_codings
+)
+from ..services.encoding import negotiate, representation_etag
+from .dependencies import (
+    config, redis_service, station_catalog, eta_source, response_encoder, known_stations, eta_misses,
+    verify_token
+)
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/eta", tags=["ETA"])
-security = HTTPBearer()
-config = Config()
-redis_service = RedisService(config)
-auth_service = AuthService(config)
-
-
-def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
-    """Dependency to verify JWT token"""
-    return auth_service.verify_token(credentials.credentials)
 
 
 @router.get("", response_model=ETAResponse)
 async def get_eta(
     line: str,
     station_id: str,
+    request: Request,
     direction: Optional[str] = None,
     token_payload: dict = Depends(verify_token)
 ):
@@ -40,7 +37,12 @@ async def get_eta(
     - `direction`: Optional direction filter ("N" or "S")
     
     **Returns:**
-    - ETAResponse with next 3 trains per direction
+    - ETAResponse with next 3 trains per direction, as JSON or, per
+      `Accept`, MessagePack (`application/x-msgpack`) or Protobuf
+      (`application/x-protobuf`, schema in backend/api/proto/eta.proto)
+    - `304 Not Modified` if `If-None-Match` matches the current ETag
+    - `404 Not Found` for stations unknown on the line, or with no ETAs in
+      the current data (briefly cached)
     
     **Example:**
     ```
@@ -66,9 +68,42 @@ async def get_eta(
                 detail="Direction must be 'N' (Northbound) or 'S' (Southbound)"
             )
     
+    # Reject station IDs that exist neither in the catalog nor in the
+    # worker's data for the line without touching Redis
+    if not known_stations.contains(line, station_id):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Unknown station {station_id} for line {line}"
+        )
+    
+    media_type = negotiate(request.headers.get("accept"))
+    
     try:
-        # Fetch from Redis cache
-        eta_data = redis_service.get_eta(line, station_id, direction)
+        # Pin the request to the line's version in the current snapshot and
+        # answer conditional requests from that version alone
+        if_none_match = request.headers.get("if-none-match")
+        source = eta_source(line)
+        line_version = source.get_line_version(line)
+        if line_version:
+            etag = representation_etag(
+                make_etag(line, station_id, direction or "", line_version["version"]), media_type
+            )
+            max_age = max_age_until(line_version.get("next_update_at"), config.ETA_MAX_AGE_SECONDS)
+            if etag_matches(if_none_match, etag):
+                return not_modified(etag, max_age)
+            # This version was already encoded for another client
+            body = response_encoder.cached(etag)
+            if body is not None:
+                return response_encoder.response(body, media_type, cache_headers(etag, max_age))
+        
+        # Fetch from Redis cache, unless this version recently had nothing
+        eta_data = None
+        if line_version:
+            miss_key = (line, station_id, direction, line_version["version"])
+            if miss_key not in eta_misses:
+                eta_data = source.get_eta(line, station_id, direction, line_version)
+                if not eta_data:
+                    eta_misses.add(miss_key)
         
         if not eta_data:
             raise HTTPException(
@@ -89,19 +124,17 @@ async def get_eta(
             ))
             # Extract station name from first available entry
             if not station_name:
-                # Try to get from cache
-                cached_raw = redis_service.client.get(f"eta:{line}:{station_id}:{dir_data['direction']}")
-                if cached_raw:
-                    import json
-                    cached = json.loads(cached_raw)
-                    station_name = cached.get("station_name")
+                station_name = dir_data.get("station_name")
         
-        return ETAResponse(
+        eta_response = ETAResponse(
             line=line,
             station_id=station_id,
             station_name=station_name,
             etas=direction_etas
         )
+        
+        body = response_encoder.encode(eta_response.model_dump(), "ETAResponse", media_type, etag)
+        return response_encoder.response(body, media_type, cache_headers(etag, max_age))
     
     except HTTPException:
         raise
@@ -113,19 +146,93 @@ async def get_eta(
         )
 
 
+# Content codings of the system snapshot, preferred first
+SNAPSHOT_CODINGS = ["zstd", "gzip"]
+
+
+@router.get("/snapshot")
+async def get_snapshot(
+    request: Request,
+    token_payload: dict = Depends(verify_token)
+):
+    """
+    Get every line's ETAs (all stations and directions) in one document
+    
+    The worker builds and compresses the document once per cycle, and it is
+    served as stored. Clients that accept neither zstd nor gzip get it
+    decompressed once per API process and version.
+    
+    **Returns:**
+    - JSON `{version, updated_at, lines: {line: {version, updated_at,
+      next_update_at, stations: {station_id: {name, N: [...], S: [...]}}}}}`
+      with `Content-Encoding` zstd or gzip, per `Accept-Encoding`
+    - `304 Not Modified` if `If-None-Match` matches the current ETag
+    
+    **Example:**
+    ```
+    curl --compressed -H "Authorization: Bearer TOKEN" /eta/snapshot
+    ```
+    """
+    snapshot = redis_service.get_snapshot()
+    if not snapshot:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No snapshot available"
+        )
+    
+    version = snapshot["version"]
+    next_updates = [entry.get("next_update_at") for entry in snapshot.get("lines", {}).values()]
+    max_age = max_age_until(min(filter(None, next_updates), default=None), config.ETA_MAX_AGE_SECONDS)
+    # One representation per content coding; None is the decompressed form
+    candidates = accepted_codings(request.headers.get("accept-encoding"), SNAPSHOT_CODINGS) + [None]
+    etags = {coding: make_etag("eta-snapshot", version, coding or "identity") for coding in candidates}
+    if_none_match = request.headers.get("if-none-match")
+    for etag in etags.values():
+        if etag_matches(if_none_match, etag):
+            return not_modified(etag, max_age)
+    
+    for coding in candidates:
+        etag = etags[coding]
+        body = response_encoder.cached(etag)
+        if body is None:
+            if coding:
+                body = redis_service.get_system_snapshot(version, coding)
+            else:
+                compressed = redis_service.get_system_snapshot(version, "gzip")
+                body = gzip.decompress(compressed) if compressed is not None else None
+            if body is None:
+                continue
+            response_encoder.remember(etag, body)
+        
+        headers = {**cache_headers(etag, max_age), "Vary": "Accept-Encoding"}
+        if coding:
+            headers["Content-Encoding"] = coding
+        return Response(content=body, media_type="application/json", headers=headers)
+    
+    raise HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail=f"Snapshot {version} is not available"
+    )
+
+
 @router.get("/stations/{line}", response_model=dict)
 async def get_stations(
     line: str,
+    request: Request,
     token_payload: dict = Depends(verify_token)
 ):
     """
-    Get list of stations for a given line (from cache)
+    Get ordered list of stations for a given line
+    
+    Served from the in-process station catalog, which is compiled by the
+    worker from GTFS static data.
     
     **Parameters:**
     - `line`: Subway line identifier
     
     **Returns:**
-    - Dictionary with line and list of stations
+    - Dictionary with line and list of stations (id, name, lat, lon, order),
+      encoded per `Accept` like `/eta`
     """
     line = line.upper()
     
@@ -135,10 +242,20 @@ async def get_stations(
             detail=f"Invalid line. Supported lines: {', '.join(config.SUPPORTED_LINES)}"
         )
     
-    stations = redis_service.get_stations(line)
-    
-    if stations:
-        return stations
+    cached = station_catalog.get(line)
+    if cached:
+        stations, etag = cached
+        max_age = config.STATIONS_MAX_AGE_SECONDS
     else:
-        return {"line": line, "stations": []}
+        stations = {"line": line, "stations": []}
+        etag = content_etag(stations)
+        max_age = 0
+    
+    media_type = negotiate(request.headers.get("accept"))
+    etag = representation_etag(etag, media_type)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag, max_age)
+    
+    body = response_encoder.cached(etag) or response_encoder.encode(stations, "StationsResponse", media_type, etag)
+    return response_encoder.response(body, media_type, cache_headers(etag, max_age))
 
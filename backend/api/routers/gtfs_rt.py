@@ -0,0 +1,118 @@
+"""
+GTFS-RT router - filtered realtime feeds for downstream consumers
+"""
+import logging
+from typing import List
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, status
+
+from ..services.http_cache import make_etag, etag_matches, max_age_until, cache_headers, not_modified
+from .dependencies import config, redis_service, response_encoder, verify_token
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/gtfs-rt", tags=["GTFS-RT"])
+
+GTFS_RT_MEDIA_TYPE = "application/x-protobuf"
+
+
+def _serve(lines: List[str], request: Request):
+    """
+    Serve the concatenated GTFS-RT exports of some lines
+    
+    Concatenated protobuf messages parse as one merged message: entities
+    accumulate and the last header wins. Payloads are ordered newest header
+    first, so the merged header carries the oldest source timestamp.
+    """
+    invalid = [line for line in lines if line not in config.SUPPORTED_LINES]
+    if invalid:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid line {', '.join(invalid)}. Supported lines: {', '.join(config.SUPPORTED_LINES)}"
+        )
+    
+    timestamps = redis_service.get_gtfsrt_timestamps(lines)
+    if len(timestamps) < len(lines):
+        missing = [line for line in lines if line not in timestamps]
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No GTFS-RT data available for line {', '.join(missing)}"
+        )
+    
+    etag = make_etag("gtfs-rt", *(f"{line}@{timestamps[line]}" for line in lines))
+    max_age = max_age_until(min(timestamps.values()) + config.ETA_MAX_AGE_SECONDS, config.ETA_MAX_AGE_SECONDS)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag, max_age)
+    
+    body = response_encoder.cached(etag)
+    if body is None:
+        payloads = redis_service.get_gtfsrt(lines)
+        if len(payloads) < len(lines):
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="GTFS-RT data expired; retry shortly"
+            )
+        ordered = sorted(lines, key=lambda line: timestamps[line], reverse=True)
+        body = b"".join(payloads[line] for line in ordered)
+        response_encoder.remember(etag, body)
+    
+    return response_encoder.response(body, GTFS_RT_MEDIA_TYPE, cache_headers(etag, max_age))
+
+
+@router.get("")
+async def get_gtfs_rt_lines(
+    request: Request,
+    lines: str = Query(..., description="Comma-separated lines, e.g. A,C,E"),
+    token_payload: dict = Depends(verify_token)
+):
+    """
+    Get one GTFS-RT FeedMessage covering several lines
+    
+    **Parameters:**
+    - `lines`: Comma-separated subway lines
+    
+    **Returns:**
+    - GTFS-RT protobuf (`application/x-protobuf`) with the lines' trip
+      updates, vehicle positions and alerts; entity IDs are prefixed with
+      the line. The header timestamp is the oldest of the source feeds.
+    - `304 Not Modified` if `If-None-Match` matches the current ETag
+    
+    **Example:**
+    ```
+    GET /gtfs-rt?lines=A,C,E
+    ```
+    """
+    requested = list(dict.fromkeys(line.strip().upper() for line in lines.split(",") if line.strip()))
+    if not requested:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Pass at least one line"
+        )
+    return _serve(requested, request)
+
+
+@router.get("/{line}")
+async def get_gtfs_rt_line(
+    line: str,
+    request: Request,
+    token_payload: dict = Depends(verify_token)
+):
+    """
+    Get a line's GTFS-RT feed, filtered from the MTA feed that carries it
+    
+    The worker rebuilds the payload only when the source feed's header
+    timestamp changes, so polling faster than the MTA updates mostly gets
+    `304 Not Modified`.
+    
+    **Parameters:**
+    - `line`: Subway line identifier
+    
+    **Returns:**
+    - GTFS-RT protobuf (`application/x-protobuf`), parseable with any
+      GTFS-RT bindings
+    - `304 Not Modified` if `If-None-Match` matches the current ETag
+    
+    **Example:**
+    ```
+    GET /gtfs-rt/A
+    ```
+    """
+    return _serve([line.upper()], request)
@@ -1,15 +1,13 @@
 """
 Health check router
 """
-from fastapi import APIRouter
-from ..models import HealthResponse
-from ..services.redis_service import RedisService
-from ..config import Config
+from fastapi import APIRouter, Request, status
+from fastapi.responses import JSONResponse
+from ..models import HealthResponse, ReadinessResponse, WorkerHealthResponse
+from .dependencies import redis_service, worker_health
 from datetime import datetime
 
 router = APIRouter(tags=["Health"])
-config = Config()
-redis_service = RedisService(config)
 
 
 @router.get("/health", response_model=HealthResponse)
@@ -28,3 +26,46 @@ async def health_check():
         timestamp=datetime.utcnow().isoformat()
     )
 
+
+@router.get("/health/feeds", response_model=WorkerHealthResponse)
+async def feeds_health_check():
+    """
+    Worker heartbeat and per-feed freshness
+    
+    Served from the worker's heartbeat key, re-read at most every
+    HEARTBEAT_CACHE_SECONDS per API process.
+    
+    **Returns:**
+    - `status`: `healthy`, `degraded` (some feeds stale or failing) or
+      `stalled` (no heartbeat within WORKER_STALE_SECONDS)
+    - Per feed: last success, source header timestamp and its age, entity
+      count, consecutive failures and the last error
+    - The last cycle's duration and per-stage pipeline metrics
+    - 503 when the worker has stalled, so probes can restart it
+    """
+    body = WorkerHealthResponse(**worker_health.report(), timestamp=datetime.utcnow().isoformat())
+    if body.status == "stalled":
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=body.model_dump())
+    return body
+
+
+@router.get("/ready", response_model=ReadinessResponse)
+async def readiness_check(request: Request):
+    """
+    Readiness check endpoint
+    
+    Reports ready only after start-up warm-up (Redis pool opened, station
+    catalog and spatial index loaded) has completed.
+    
+    **Returns:**
+    - 200 when ready, 503 while warming up
+    """
+    ready = getattr(request.app.state, "ready", False)
+    body = ReadinessResponse(
+        status="ready" if ready else "warming_up",
+        ready=ready,
+        timestamp=datetime.utcnow().isoformat()
+    )
+    if not ready:
+        return JSONResponse(status_code=status.HTTP_503_SERVICE_UNAVAILABLE, content=body.model_dump())
+    return body
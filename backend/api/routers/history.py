@@ -0,0 +1,64 @@
+"""
+History router - service reliability over time windows
+"""
+import time
+import logging
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+
+from ..models import HistoryStatsResponse
+from ..services.history_analytics import compute_stats
+from .dependencies import config, redis_service, verify_token
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/history", tags=["History"])
+
+
+@router.get("/{line}/stats", response_model=HistoryStatsResponse)
+async def get_history_stats(
+    line: str,
+    station_id: Optional[str] = None,
+    direction: Optional[str] = None,
+    window_minutes: int = Query(60, ge=1),
+    token_payload: dict = Depends(verify_token)
+):
+    """
+    Get headway, bunching and prediction-error statistics for a line
+    
+    **Parameters:**
+    - `line`: Subway line identifier
+    - `station_id`: Optional station filter
+    - `direction`: Optional direction filter ("N" or "S")
+    - `window_minutes`: How far back to look (default 60)
+    
+    **Example:**
+    ```
+    GET /history/L/stats?window_minutes=180
+    ```
+    """
+    line = line.upper()
+    if line not in config.SUPPORTED_LINES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid line. Supported lines: {', '.join(config.SUPPORTED_LINES)}"
+        )
+    if direction:
+        direction = direction.upper()
+        if direction not in ["N", "S"]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Direction must be 'N' (Northbound) or 'S' (Southbound)"
+            )
+    
+    window_minutes = min(window_minutes, config.HISTORY_MAX_WINDOW_MINUTES)
+    events = redis_service.get_history(
+        line, time.time() - window_minutes * 60, config.HISTORY_MAX_QUERY_EVENTS, station_id, direction
+    )
+    
+    return HistoryStatsResponse(
+        line=line,
+        station_id=station_id,
+        direction=direction,
+        window_minutes=window_minutes,
+        **compute_stats(events, config.HISTORY_BUNCHING_RATIO)
+    )
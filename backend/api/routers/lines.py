@@ -0,0 +1,47 @@
+"""
+Lines router - per-line service status
+"""
+import time
+import logging
+from fastapi import APIRouter, HTTPException, Depends, status
+
+from ..models import LineStatusResponse, LineStatusSummary
+from .dependencies import config, redis_service, verify_token
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/lines", tags=["Lines"])
+
+
+@router.get("/status", response_model=LineStatusResponse)
+async def get_line_status(token_payload: dict = Depends(verify_token)):
+    """
+    Get service status for all lines
+    
+    Summaries are precomputed by the worker in the same pass as ETA
+    extraction and served from a single Redis read.
+    
+    **Returns:**
+    - LineStatusResponse with active trains per direction, median and max
+      headway at key stations, and feed freshness for each line
+    """
+    summary = redis_service.get_line_statuses()
+    if not summary:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No line status available yet"
+        )
+    
+    now = time.time()
+    lines = []
+    for line in config.SUPPORTED_LINES:
+        line_status = summary["lines"].get(line)
+        if not line_status:
+            continue
+        line_status = LineStatusSummary(**line_status)
+        if line_status.feed_timestamp:
+            line_status.feed_age_seconds = round(now - line_status.feed_timestamp, 1)
+            if line_status.feed_age_seconds > config.LINE_STATUS_STALE_SECONDS:
+                line_status.status = "stale"
+        lines.append(line_status)
+    
+    return LineStatusResponse(lines=lines, updated_at=summary.get("updated_at"))
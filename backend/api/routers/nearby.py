@@ -0,0 +1,93 @@
+"""
+Nearby router - nearest stations with their current ETAs
+"""
+import logging
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, status
+
+from ..models import NearbyResponse, NearbyStation, StationLineETA, DirectionETA, TrainETA
+from ..services.encoding import negotiate
+from .dependencies import config, station_index, eta_source, response_encoder, verify_token
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/nearby", tags=["Nearby"])
+
+
+@router.get("", response_model=NearbyResponse)
+async def get_nearby(
+    request: Request,
+    lat: float = Query(..., ge=-90, le=90),
+    lon: float = Query(..., ge=-180, le=180),
+    k: int = Query(3, ge=1),
+    radius: Optional[int] = Query(None, ge=1, description="Search radius in meters"),
+    token_payload: dict = Depends(verify_token)
+):
+    """
+    Get the k nearest stations with their current ETAs
+    
+    **Parameters:**
+    - `lat`, `lon`: Location to search from
+    - `k`: Number of stations to return (default 3)
+    - `radius`: Search radius in meters (default 1000)
+    
+    **Returns:**
+    - NearbyResponse with stations sorted by distance, each with ETAs for
+      every line serving it (fetched in one batched Redis read); JSON, or
+      MessagePack / Protobuf per `Accept` like `/eta`
+    
+    **Example:**
+    ```
+    GET /nearby?lat=40.7506&lon=-73.9935&k=3&radius=800
+    ```
+    """
+    k = min(k, config.NEARBY_MAX_K)
+    radius = min(radius or config.NEARBY_DEFAULT_RADIUS_METERS, config.NEARBY_MAX_RADIUS_METERS)
+    
+    try:
+        matches = station_index.nearest(lat, lon, k, radius)
+        stations = [station_index.stations[station_id] for _, station_id in matches]
+        etas = eta_source().get_etas_bulk([
+            (line, station["station_id"])
+            for station in stations
+            for line in station["lines"]
+        ])
+    except Exception as e:
+        logger.error(f"Error fetching nearby stations: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Internal server error: {str(e)}"
+        )
+    
+    nearby = []
+    for (distance_m, _), station in zip(matches, stations):
+        arrivals = []
+        for line in station["lines"]:
+            line_etas = etas.get((line, station["station_id"]))
+            if not line_etas:
+                continue
+            arrivals.append(StationLineETA(
+                line=line,
+                etas=[
+                    DirectionETA(
+                        direction=dir_data["direction"],
+                        trains=[TrainETA(**train) for train in dir_data["trains"][:3]]
+                    )
+                    for dir_data in line_etas
+                ]
+            ))
+        nearby.append(NearbyStation(
+            station_id=station["station_id"],
+            name=station["name"],
+            lat=station["lat"],
+            lon=station["lon"],
+            distance_m=round(distance_m, 1),
+            lines=station["lines"],
+            arrivals=arrivals
+        ))
+    
+    nearby_response = NearbyResponse(lat=lat, lon=lon, stations=nearby)
+    # Location-specific, so encoded per request rather than cached
+    media_type = negotiate(request.headers.get("accept"))
+    return response_encoder.response(
+        response_encoder.encode(nearby_response.model_dump(), "NearbyResponse", media_type), media_type
+    )
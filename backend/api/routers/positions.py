@@ -0,0 +1,68 @@
+"""
+Positions router - live train positions per line
+"""
+import logging
+from fastapi import APIRouter, HTTPException, Depends, Request, Response, status
+
+from ..models import PositionsResponse
+from ..services.http_cache import make_etag, etag_matches, max_age_until, cache_headers, not_modified
+from .dependencies import config, redis_service, verify_token
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/positions", tags=["Positions"])
+
+
+@router.get("/{line}", response_model=PositionsResponse)
+async def get_positions(
+    line: str,
+    request: Request,
+    token_payload: dict = Depends(verify_token)
+):
+    """
+    Get the current position of every train on a line
+    
+    The worker publishes one packed document per line and snapshot version
+    (a `fields` header plus one array per train); it is returned as stored.
+    Trains are placed between stations from their stop status and predicted
+    arrival, so `progress` is the fraction of the run from `current_stop`
+    to `next_stop`.
+    
+    **Parameters:**
+    - `line`: Subway line identifier
+    
+    **Returns:**
+    - PositionsResponse, with an `ETag` tied to the line's snapshot version
+    - `304 Not Modified` if `If-None-Match` matches the current ETag
+    
+    **Example:**
+    ```
+    GET /positions/A
+    ```
+    """
+    line = line.upper()
+    if line not in config.SUPPORTED_LINES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid line. Supported lines: {', '.join(config.SUPPORTED_LINES)}"
+        )
+    
+    line_version = redis_service.get_line_version(line)
+    if not line_version:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No position data available for line {line}"
+        )
+    
+    etag = make_etag(line, "positions", line_version["version"])
+    max_age = max_age_until(line_version.get("next_update_at"), config.ETA_MAX_AGE_SECONDS)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified(etag, max_age)
+    
+    body = redis_service.get_positions(line, line_version["version"])
+    if body is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No position data available for line {line}"
+        )
+    
+    return Response(content=body, media_type="application/json", headers=cache_headers(etag, max_age))
@@ -0,0 +1,167 @@
+"""
+Trips router - origin-to-destination trip ETAs and following a train
+"""
+import time
+import logging
+from datetime import datetime
+from typing import Dict
+from fastapi import APIRouter, HTTPException, Depends, Query, status
+
+from ..models import TripPlanResponse, TripOption, TripResponse, TripsResponse, TripStop
+from .dependencies import config, redis_service, trip_index, verify_token
+
+logger = logging.getLogger(__name__)
+router = APIRouter(prefix="/trips", tags=["Trips"])
+
+
+@router.get("/plan", response_model=TripPlanResponse)
+async def plan_trip(
+    line: str,
+    from_station: str = Query(..., alias="from", description="Boarding station ID"),
+    to_station: str = Query(..., alias="to", description="Alighting station ID"),
+    limit: int = Query(3, ge=1),
+    token_payload: dict = Depends(verify_token)
+):
+    """
+    Find the next trains from one station to another on a line
+    
+    Uses the worker's index of active trips (remaining stops with arrival
+    times); candidate trains come from the per-stop trip tables of the two
+    stations, not a scan over all trips.
+    
+    **Parameters:**
+    - `line`: Subway line
+    - `from`: Boarding station ID (e.g., "120" for 96 St)
+    - `to`: Alighting station ID (e.g., "132" for 14 St)
+    - `limit`: Number of options (default 3)
+    
+    **Example:**
+    ```
+    GET /trips/plan?line=1&from=120&to=132
+    ```
+    """
+    line = line.upper()
+    if line not in config.SUPPORTED_LINES:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Invalid line. Supported lines: {', '.join(config.SUPPORTED_LINES)}"
+        )
+    
+    line_trips = trip_index.get(line)
+    if not line_trips:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"No trip data available for line {line}"
+        )
+    
+    now = time.time()
+    options = []
+    for trip_id, from_pos, to_pos in line_trips.plan(
+        from_station, to_station, now, min(limit, config.TRIP_PLAN_MAX_OPTIONS)
+    ):
+        trip = line_trips.trips[trip_id]
+        board_at = trip["arrivals"][from_pos]
+        arrive_at = trip["arrivals"][to_pos]
+        options.append(TripOption(
+            trip_id=trip_id,
+            direction=trip["direction"],
+            board_time=datetime.fromtimestamp(board_at).isoformat(),
+            arrive_time=datetime.fromtimestamp(arrive_at).isoformat(),
+            board_in_minutes=int((board_at - now) / 60),
+            ride_minutes=int((arrive_at - board_at) / 60),
+            stops=to_pos - from_pos
+        ))
+    
+    return TripPlanResponse(
+        line=line,
+        from_station_id=from_station,
+        to_station_id=to_station,
+        options=options
+    )
+
+
+def _trip_response(record: Dict, now: float) -> TripResponse:
+    """Shape a stored trip record, dropping stops the train has passed"""
+    stops = [
+        TripStop(
+            station_id=station_id,
+            arrival_time=datetime.fromtimestamp(arrival).isoformat(),
+            eta_minutes=int((arrival - now) / 60)
+        )
+        for station_id, arrival in zip(record["stops"], record["arrivals"])
+        if arrival >= now
+    ]
+    return TripResponse(
+        trip_id=record["trip_id"],
+        line=record["line"],
+        direction=record["direction"],
+        stops=stops,
+        position=record.get("position"),
+        updated_at=record["updated_at"]
+    )
+
+
+@router.get("", response_model=TripsResponse)
+async def get_trips(
+    ids: str = Query(..., description="Comma-separated GTFS trip IDs"),
+    token_payload: dict = Depends(verify_token)
+):
+    """
+    Follow several trains at once
+    
+    All trips are read with one MGET.
+    
+    **Parameters:**
+    - `ids`: Comma-separated GTFS trip IDs (at most `TRIP_BULK_MAX`)
+    
+    **Returns:**
+    - TripsResponse with the trips found and the IDs that are not in the feed
+    
+    **Example:**
+    ```
+    GET /trips?ids=123450_1..N03R,123600_1..S03R
+    ```
+    """
+    trip_ids = list(dict.fromkeys(trip_id.strip() for trip_id in ids.split(",") if trip_id.strip()))
+    if not trip_ids or len(trip_ids) > config.TRIP_BULK_MAX:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Pass between 1 and {config.TRIP_BULK_MAX} trip IDs"
+        )
+    
+    now = time.time()
+    records = redis_service.get_trips(trip_ids)
+    return TripsResponse(
+        trips=[_trip_response(records[trip_id], now) for trip_id in trip_ids if trip_id in records],
+        missing=[trip_id for trip_id in trip_ids if trip_id not in records]
+    )
+
+
+# Declared after /plan so "plan" is not taken for a trip ID
+@router.get("/{trip_id}", response_model=TripResponse)
+async def get_trip(
+    trip_id: str,
+    token_payload: dict = Depends(verify_token)
+):
+    """
+    Follow one train: its remaining stops with predicted arrivals
+    
+    The worker keeps one key per active trip, deleted when the trip leaves
+    the feed, so this is a single Redis lookup. `position` is included when
+    the line's feed reports the vehicle.
+    
+    **Parameters:**
+    - `trip_id`: GTFS trip ID (the `train_id` of an ETA)
+    
+    **Example:**
+    ```
+    GET /trips/123450_1..N03R
+    ```
+    """
+    record = redis_service.get_trips([trip_id]).get(trip_id)
+    if not record:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail=f"Trip {trip_id} is not in the current feed"
+        )
+    return _trip_response(record, time.time())
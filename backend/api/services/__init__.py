@@ -1,5 +1,8 @@
 """Services package"""
 from .redis_service import RedisService
+from .station_catalog import StationCatalog
+from .spatial_index import StationIndex
+from .trip_index import TripIndex
 
-__all__ = ["RedisService"]
+__all__ = ["RedisService", "StationCatalog", "StationIndex", "TripIndex"]
 
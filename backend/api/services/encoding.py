@@ -0,0 +1,187 @@
+"""
+Response encodings (JSON, MessagePack, Protobuf) and per-version encoded body cache
+"""
+import json
+import logging
+from collections import OrderedDict
+from typing import Dict, Optional
+
+import msgpack
+from fastapi import Response
+from google.protobuf import descriptor_pb2, descriptor_pool, json_format, message_factory
+
+from ..config import Config
+from .http_cache import make_etag
+
+logger = logging.getLogger(__name__)
+
+JSON = "application/json"
+MSGPACK = "application/x-msgpack"
+PROTOBUF = "application/x-protobuf"
+
+# Accept values that select each encoding
+MEDIA_TYPES = {
+    "application/json": JSON,
+    "application/x-msgpack": MSGPACK,
+    "application/msgpack": MSGPACK,
+    "application/vnd.msgpack": MSGPACK,
+    "application/x-protobuf": PROTOBUF,
+    "application/protobuf": PROTOBUF,
+    "application/vnd.google.protobuf": PROTOBUF,
+}
+
+# Protobuf schema of the negotiable responses; published as backend/api/proto/eta.proto
+PROTO_PACKAGE = "nyc_subway_eta"
+PROTO_SCHEMA = {
+    "TrainETA": [
+        ("arrival_time", 1, "string"), ("eta_minutes", 2, "int32"), ("train_id", 3, "string"),
+        ("route_id", 4, "string"), ("status", 5, "string"), ("delay_seconds", 6, "int32", "optional"),
+    ],
+    "DirectionETA": [("direction", 1, "string"), ("trains", 2, "TrainETA", "repeated")],
+    "ETAResponse": [
+        ("line", 1, "string"), ("station_id", 2, "string"), ("station_name", 3, "string", "optional"),
+        ("etas", 4, "DirectionETA", "repeated"), ("last_updated", 5, "string", "optional"),
+    ],
+    "Station": [
+        ("id", 1, "string"), ("name", 2, "string"), ("lat", 3, "double"), ("lon", 4, "double"),
+        ("order", 5, "int32"),
+    ],
+    "StationsResponse": [("line", 1, "string"), ("stations", 2, "Station", "repeated")],
+    "StationLineETA": [("line", 1, "string"), ("etas", 2, "DirectionETA", "repeated")],
+    "NearbyStation": [
+        ("station_id", 1, "string"), ("name", 2, "string"), ("lat", 3, "double"), ("lon", 4, "double"),
+        ("distance_m", 5, "double"), ("lines", 6, "string", "repeated"),
+        ("arrivals", 7, "StationLineETA", "repeated"),
+    ],
+    "NearbyResponse": [("lat", 1, "double"), ("lon", 2, "double"), ("stations", 3, "NearbyStation", "repeated")],
+}
+
+_SCALAR_TYPES = {
+    "string": descriptor_pb2.FieldDescriptorProto.TYPE_STRING,
+    "int32": descriptor_pb2.FieldDescriptorProto.TYPE_INT32,
+    "double": descriptor_pb2.FieldDescriptorProto.TYPE_DOUBLE,
+}
+
+
+def _build_proto_messages() -> Dict[str, type]:
+    """Message classes for PROTO_SCHEMA, built without generated code"""
+    file_proto = descriptor_pb2.FileDescriptorProto(
+        name=f"{PROTO_PACKAGE}/eta.proto", package=PROTO_PACKAGE, syntax="proto3"
+    )
+    for message_name, fields in PROTO_SCHEMA.items():
+        message = file_proto.message_type.add(name=message_name)
+        for field_name, number, field_type, *label in fields:
+            field = message.field.add(name=field_name, number=number)
+            if field_type in _SCALAR_TYPES:
+                field.type = _SCALAR_TYPES[field_type]
+            else:
+                field.type = descriptor_pb2.FieldDescriptorProto.TYPE_MESSAGE
+                field.type_name = f".{PROTO_PACKAGE}.{field_type}"
+            if label == ["repeated"]:
+                field.label = descriptor_pb2.FieldDescriptorProto.LABEL_REPEATED
+            else:
+                field.label = descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL
+            if label == ["optional"]:
+                # proto3 `optional`: presence tracked through a synthetic oneof
+                field.proto3_optional = True
+                field.oneof_index = len(message.oneof_decl)
+                message.oneof_decl.add(name=f"_{field_name}")
+    
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(file_proto)
+    return {
+        name: message_factory.GetMessageClass(pool.FindMessageTypeByName(f"{PROTO_PACKAGE}.{name}"))
+        for name in PROTO_SCHEMA
+    }
+
+
+PROTO_MESSAGES = _build_proto_messages()
+
+
+def negotiate(accept: Optional[str]) -> str:
+    """
+    Pick the response encoding for an Accept header
+    
+    Honours q-values; anything unsupported, wildcards and a missing header
+    get JSON.
+    """
+    if not accept:
+        return JSON
+    best, best_q = JSON, 0.0
+    for part in accept.split(","):
+        media_type, *params = (item.strip() for item in part.split(";"))
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        encoding = MEDIA_TYPES.get(media_type.lower())
+        if encoding and q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def representation_etag(etag: str, media_type: str) -> str:
+    """ETag of one encoding of a resource (JSON keeps the resource's ETag)"""
+    return etag if media_type == JSON else make_etag(etag, media_type)
+
+
+class ResponseEncoder:
+    """
+    Encodes response payloads and keeps the bodies of recent versions
+    
+    Bodies are cached by representation ETag (which already covers the
+    resource, its data version and the encoding), so each version of a
+    response is encoded once per API process, however many clients poll it.
+    The cache holds the RESPONSE_CACHE_SIZE most recently used bodies.
+    """
+    
+    def __init__(self, config: Config = None):
+        self.config = config or Config()
+        self._bodies: OrderedDict = OrderedDict()
+    
+    def cached(self, etag: str) -> Optional[bytes]:
+        """Previously encoded body for a representation ETag"""
+        body = self._bodies.get(etag)
+        if body is not None:
+            self._bodies.move_to_end(etag)
+        return body
+    
+    def encode(self, payload: Dict, message: str, media_type: str, etag: Optional[str] = None) -> bytes:
+        """
+        Encode a payload, caching the body when an ETag is given
+        
+        Args:
+            payload: Response as plain data (e.g. model.model_dump())
+            message: Protobuf message name in PROTO_SCHEMA
+            media_type: Result of negotiate
+            etag: Representation ETag to cache the body under
+        """
+        if media_type == MSGPACK:
+            body = msgpack.packb(payload, use_bin_type=True)
+        elif media_type == PROTOBUF:
+            body = json_format.ParseDict(
+                payload, PROTO_MESSAGES[message](), ignore_unknown_fields=True
+            ).SerializeToString()
+        else:
+            body = json.dumps(payload, separators=(",", ":")).encode("utf-8")
+        
+        if etag:
+            self.remember(etag, body)
+        return body
+    
+    def remember(self, etag: str, body: bytes):
+        """Cache an already encoded body under its representation ETag"""
+        if self.config.RESPONSE_CACHE_SIZE <= 0:
+            return
+        self._bodies[etag] = body
+        self._bodies.move_to_end(etag)
+        if len(self._bodies) > self.config.RESPONSE_CACHE_SIZE:
+            self._bodies.popitem(last=False)
+    
+    @staticmethod
+    def response(body: bytes, media_type: str, headers: Optional[Dict] = None) -> Response:
+        """Response for an encoded body (varies by Accept)"""
+        return Response(content=body, media_type=media_type, headers={**(headers or {}), "Vary": "Accept"})
@@ -0,0 +1,184 @@
+"""
+In-process ETA read model fed by the worker's compacted Kafka topic
+"""
+import json
+import time
+import logging
+import threading
+from typing import Dict, List, Optional, Tuple
+
+from kafka import KafkaConsumer, TopicPartition
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class ETAReplica:
+    """
+    Local copy of the latest ETAs, kept current from KAFKA_TOPIC_ETA_STATE
+    
+    Each API process replays the compacted topic from the beginning on
+    start (no consumer group, no committed offsets), then follows it. Until
+    the replay reaches the end offsets seen at start, `ready` is False and
+    reads go to Redis. Afterwards ETA reads for lines the replica holds are
+    answered from memory with the same shapes as RedisService.
+    
+    A line's records for one worker cycle are spread over partitions and
+    arrive interleaved with other cycles, so they are collected apart and
+    the cycle becomes visible only once its `cycle_records` records are all
+    in. It then replaces the line's previous cycle whole, which also drops
+    the keys the worker tombstoned. The line's version entry carries its
+    cycle's records, so a request pinned to a version reads that cycle
+    alone even after a newer one lands.
+    
+    Lines whose newest cycle is older than REDIS_TTL_SECONDS are treated as
+    missing, matching the expiry of the Redis keys.
+    """
+    
+    def __init__(self, config: Config = None):
+        self.config = config or Config()
+        self.ready = False
+        # line -> {version, updated_at, next_update_at, etas} of its newest
+        # complete cycle; etas maps (station_id, direction) -> record
+        self._lines: Dict[str, Dict] = {}
+        # line -> {version, expected, etas} of the cycle being collected
+        self._pending: Dict[str, Dict] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+    
+    def start(self):
+        """Start replaying and following the topic in a background thread"""
+        if not self.config.ETA_REPLICA_ENABLED or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="eta-replica", daemon=True)
+        self._thread.start()
+    
+    def stop(self):
+        """Stop the consumer thread"""
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.ready = False
+    
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self._consume()
+            except Exception as e:
+                self.ready = False
+                logger.error(f"ETA replica consumer failed, retrying in {self.config.ETA_REPLICA_RETRY_SECONDS}s: {e}")
+                self._stop.wait(self.config.ETA_REPLICA_RETRY_SECONDS)
+    
+    def _consume(self):
+        topic = self.config.KAFKA_TOPIC_ETA_STATE
+        consumer = KafkaConsumer(
+            bootstrap_servers=self.config.KAFKA_BOOTSTRAP_SERVERS,
+            group_id=None,
+            enable_auto_commit=False,
+            key_deserializer=lambda k: k.decode("utf-8") if k else None,
+            value_deserializer=lambda v: json.loads(v) if v is not None else None
+        )
+        try:
+            partitions = consumer.partitions_for_topic(topic)
+            if not partitions:
+                raise RuntimeError(f"topic {topic} not found")
+            assigned = [TopicPartition(topic, partition) for partition in partitions]
+            consumer.assign(assigned)
+            consumer.seek_to_beginning(*assigned)
+            end_offsets = consumer.end_offsets(assigned)
+            
+            # Rebuild from scratch; the replay restores everything still live
+            self._lines, self._pending = {}, {}
+            replayed = 0
+            while not self._stop.is_set():
+                for records in consumer.poll(timeout_ms=500).values():
+                    for record in records:
+                        self._apply(record.key, record.value)
+                    replayed += len(records)
+                if not self.ready and all(consumer.position(tp) >= end_offsets[tp] for tp in assigned):
+                    self.ready = True
+                    logger.info(f"ETA replica caught up: {replayed} records, {len(self._lines)} lines")
+        finally:
+            consumer.close()
+    
+    def _apply(self, key: Optional[str], record: Optional[Dict]):
+        # Tombstones need no handling: the next complete cycle replaces the
+        # line's records whole. Records without a count come from workers
+        # that predate cycle tracking and are never served.
+        if not key or record is None or "cycle_records" not in record:
+            return
+        line, station_id, direction = key.split(":")
+        version = int(record["version"])
+        current = self._lines.get(line)
+        if current is not None and version <= int(current["version"]):
+            return
+        
+        pending = self._pending.get(line)
+        if pending is None or version > pending["version"]:
+            pending = self._pending[line] = {"version": version, "expected": record["cycle_records"], "etas": {}}
+        elif version < pending["version"]:
+            return
+        pending["etas"][(station_id, direction)] = record
+        
+        if len(pending["etas"]) >= pending["expected"]:
+            del self._pending[line]
+            # One assignment, so readers see the old cycle or the new one
+            self._lines[line] = {
+                "version": record["version"],
+                "updated_at": record["updated_at"],
+                "next_update_at": record["next_update_at"],
+                "etas": pending["etas"]
+            }
+    
+    def serves(self, line: str) -> bool:
+        """Whether reads for a line can be answered locally"""
+        return self.ready and self.get_line_version(line) is not None
+    
+    def get_line_version(self, line: str, snapshot: Optional[Dict] = None) -> Optional[Dict]:
+        """Version entry of a line's newest complete cycle, or None if absent or expired"""
+        line_version = self._lines.get(line)
+        if line_version and time.time() - line_version["updated_at"] < self.config.REDIS_TTL_SECONDS:
+            return line_version
+        return None
+    
+    def get_eta(
+        self,
+        line: str,
+        station_id: str,
+        direction: Optional[str] = None,
+        line_version: Optional[Dict] = None
+    ) -> Optional[List[Dict]]:
+        """Same as RedisService.get_eta, from memory, read from the pinned cycle if given"""
+        line_version = line_version or self.get_line_version(line)
+        if not line_version:
+            return None
+        etas = line_version.get("etas", {})
+        results = []
+        for dir_key in ([direction.upper()] if direction else ["N", "S"]):
+            record = etas.get((station_id, dir_key))
+            if record:
+                results.append({
+                    "direction": dir_key,
+                    "trains": record.get("trains", []),
+                    "station_name": record.get("station_name")
+                })
+        return results if results else None
+    
+    def get_etas_bulk(self, line_stations: List[Tuple[str, str]]) -> Dict[Tuple[str, str], List[Dict]]:
+        """Same as RedisService.get_etas_bulk, from memory"""
+        results: Dict[Tuple[str, str], List[Dict]] = {}
+        for line, station_id in line_stations:
+            line_version = self.get_line_version(line)
+            if not line_version:
+                continue
+            for dir_key in ("N", "S"):
+                record = line_version["etas"].get((station_id, dir_key))
+                if record:
+                    results.setdefault((line, station_id), []).append({
+                        "direction": dir_key,
+                        "trains": record.get("trains", [])
+                    })
+        return results
@@ -0,0 +1,92 @@
+"""
+Headway, bunching and prediction-error statistics over arrival history
+"""
+import math
+import statistics
+from collections import defaultdict
+from typing import Dict, List, Optional
+
+# Lead-time buckets (seconds) for prediction error breakdown
+LEAD_BUCKETS = [(0, 300, "0-5m"), (300, 600, "5-10m"), (600, 1200, "10-20m"), (1200, math.inf, "20m+")]
+
+
+def _percentile(sorted_values: List[float], pct: float) -> float:
+    """Linear-interpolated percentile of an already sorted list"""
+    position = (len(sorted_values) - 1) * pct / 100
+    lower = math.floor(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+
+def summarize_values(values: List[float]) -> Optional[Dict]:
+    """Count, mean, median, p90, max and standard deviation of a sample"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    return {
+        "count": len(ordered),
+        "mean": round(statistics.fmean(ordered), 2),
+        "median": round(_percentile(ordered, 50), 2),
+        "p90": round(_percentile(ordered, 90), 2),
+        "max": round(ordered[-1], 2),
+        "stdev": round(statistics.pstdev(ordered), 2)
+    }
+
+
+def compute_stats(events: List[Dict], bunching_ratio: float) -> Dict:
+    """
+    Compute reliability statistics from arrival records
+    
+    Args:
+        events: Arrival records with station_id, direction, arrival,
+            predicted and lead (epoch seconds / seconds)
+        bunching_ratio: A headway shorter than this fraction of the median
+            headway at the same stop counts as bunching
+    
+    Returns:
+        Dictionary with headway (minutes), bunching and prediction error
+        (seconds, observed minus first prediction) statistics
+    """
+    # Columnar layout: one arrival-time column per stop/direction
+    arrivals_by_stop: Dict[tuple, List[int]] = defaultdict(list)
+    errors: List[float] = []
+    errors_by_lead: Dict[str, List[float]] = defaultdict(list)
+    
+    for event in events:
+        arrivals_by_stop[(event["station_id"], event["direction"])].append(event["arrival"])
+        error = event["arrival"] - event["predicted"]
+        errors.append(error)
+        for low, high, label in LEAD_BUCKETS:
+            if low <= event["lead"] < high:
+                errors_by_lead[label].append(abs(error))
+                break
+    
+    headways: List[float] = []
+    bunched = 0
+    for times in arrivals_by_stop.values():
+        times.sort()
+        stop_headways = [(later - earlier) / 60 for earlier, later in zip(times, times[1:]) if later > earlier]
+        if not stop_headways:
+            continue
+        threshold = statistics.median(stop_headways) * bunching_ratio
+        bunched += sum(1 for h in stop_headways if h < threshold)
+        headways.extend(stop_headways)
+    
+    headway_stats = summarize_values(headways)
+    if headway_stats:
+        headway_stats["cv"] = round(headway_stats["stdev"] / headway_stats["mean"], 3) if headway_stats["mean"] else None
+    
+    return {
+        "arrivals": len(events),
+        "headway_minutes": headway_stats,
+        "bunching": {
+            "count": bunched,
+            "rate": round(bunched / len(headways), 3) if headways else None
+        },
+        "prediction_error_seconds": summarize_values(errors),
+        "abs_error_by_lead_seconds": {
+            label: summarize_values(errors_by_lead[label])
+            for _, _, label in LEAD_BUCKETS
+            if errors_by_lead[label]
+        }
+    }
@@ -0,0 +1,100 @@
+"""
+HTTP caching helpers (ETag / If-None-Match / Cache-Control)
+"""
+import hashlib
+import json
+import time
+from typing import Any, List, Optional
+
+from fastapi import Response, status
+
+
+def make_etag(*parts: Any) -> str:
+    """
+    Build a strong ETag from version identifiers
+    
+    Args:
+        parts: Values that together identify the response body
+    
+    Returns:
+        Quoted ETag string
+    """
+    digest = hashlib.sha1(":".join(str(p) for p in parts).encode("utf-8")).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def content_etag(payload: Any) -> str:
+    """Build a strong ETag from the JSON content of a payload"""
+    body = json.dumps(payload, sort_keys=True, separators=(",", ":"), default=str)
+    return make_etag(body)
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Check an If-None-Match header against an ETag
+    
+    Handles lists of ETags, the `*` wildcard and weak validators
+    (weak comparison is allowed for If-None-Match).
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (tag.strip() for tag in if_none_match.split(","))
+    return any(tag.removeprefix("W/") == etag for tag in candidates)
+
+
+def accepted_codings(accept_encoding: Optional[str], supported: List[str]) -> List[str]:
+    """
+    Content codings from `supported` that an Accept-Encoding header allows
+    
+    Returns them best first (by q-value, then by the order of `supported`);
+    codings with q=0 are excluded and `*` matches any supported coding.
+    """
+    if not accept_encoding:
+        return []
+    q_values = {}
+    for part in accept_encoding.split(","):
+        coding, *params = (item.strip() for item in part.split(";"))
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        q_values[coding.lower()] = q
+    
+    ranked = []
+    for position, coding in enumerate(supported):
+        q = q_values.get(coding, q_values.get("*", 0.0))
+        if q > 0:
+            ranked.append((-q, position, coding))
+    return [coding for _, _, coding in sorted(ranked)]
+
+
+def max_age_until(next_update_at: Optional[float], ceiling: int) -> int:
+    """
+    Seconds a response stays fresh given the next expected data update
+    
+    Args:
+        next_update_at: Epoch seconds of the next worker update (if known)
+        ceiling: Upper bound for the returned value
+    """
+    if not next_update_at:
+        return 0
+    return max(0, min(ceiling, int(next_update_at - time.time())))
+
+
+def cache_headers(etag: str, max_age: int) -> dict:
+    """Response headers for a cacheable representation"""
+    cache_control = f"public, max-age={max_age}" if max_age > 0 else "no-cache"
+    return {"ETag": etag, "Cache-Control": cache_control}
+
+
+def not_modified(etag: str, max_age: int) -> Response:
+    """Build a 304 Not Modified response"""
+    return Response(
+        status_code=status.HTTP_304_NOT_MODIFIED,
+        headers=cache_headers(etag, max_age)
+    )
@@ -0,0 +1,111 @@
+"""
+In-memory filters for ETA lookups that cannot succeed
+"""
+import time
+import logging
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Optional, Tuple
+
+from ..config import Config
+from .redis_service import RedisService
+from .station_catalog import StationCatalog
+
+logger = logging.getLogger(__name__)
+
+
+class KnownStations:
+    """
+    Set of valid station IDs per line
+    
+    A station is known for a line if the static catalog lists it there or
+    the worker's latest version of the line has ETA keys for it (the
+    `station_ids` key written next to the ETAs). The published set is
+    re-read when the line's version moves, checked at most every
+    KNOWN_STATIONS_REFRESH_SECONDS, like TripIndex.
+    
+    Lines with neither a catalog entry nor a published set accept every
+    station, so a cold or unreachable Redis never turns into false 404s.
+    """
+    
+    def __init__(self, station_catalog: StationCatalog, redis_service: RedisService, config: Config = None):
+        self.config = config or Config()
+        self.station_catalog = station_catalog
+        self.redis_service = redis_service
+        # Catalog version the static sets were built from, and the sets
+        self._catalog_version: Optional[str] = None
+        self._static: Dict[str, FrozenSet[str]] = {}
+        # line -> (version, station IDs with ETA keys in that version)
+        self._published: Dict[str, Tuple[str, FrozenSet[str]]] = {}
+        self._checked_at: Dict[str, float] = {}
+    
+    def _refresh_static(self):
+        self.station_catalog.refresh()
+        if self.station_catalog.version == self._catalog_version:
+            return
+        self._static = {
+            line: frozenset(station["id"] for station in payload.get("stations", []))
+            for line, payload in self.station_catalog.lines().items()
+        }
+        self._catalog_version = self.station_catalog.version
+    
+    def _refresh_published(self, line: str):
+        now = time.monotonic()
+        if now - self._checked_at.get(line, 0.0) < self.config.KNOWN_STATIONS_REFRESH_SECONDS:
+            return
+        self._checked_at[line] = now
+        
+        line_version = self.redis_service.get_line_version(line)
+        if not line_version:
+            return
+        version = line_version["version"]
+        cached = self._published.get(line)
+        if cached and cached[0] == version:
+            return
+        station_ids = self.redis_service.get_station_ids(line, version)
+        if station_ids is not None:
+            self._published[line] = (version, frozenset(station_ids))
+    
+    def contains(self, line: str, station_id: str) -> bool:
+        """Whether a station ID may have ETAs on a line"""
+        self._refresh_static()
+        static = self._static.get(line)
+        if static is not None and station_id in static:
+            return True
+        
+        self._refresh_published(line)
+        published = self._published.get(line)
+        if published is not None and station_id in published[1]:
+            return True
+        return static is None and published is None
+
+
+class MissCache:
+    """
+    Remembers lookups that found no data, for NEGATIVE_CACHE_SECONDS
+    
+    Keys include the line's snapshot version, so a new version is looked
+    up afresh even while an older miss is still cached. Holds at most
+    NEGATIVE_CACHE_SIZE entries, oldest evicted first.
+    """
+    
+    def __init__(self, config: Config = None):
+        self.config = config or Config()
+        self._expires: OrderedDict = OrderedDict()
+    
+    def __contains__(self, key: Tuple) -> bool:
+        expires = self._expires.get(key)
+        if expires is None:
+            return False
+        if expires <= time.monotonic():
+            del self._expires[key]
+            return False
+        return True
+    
+    def add(self, key: Tuple):
+        """Record a miss"""
+        if self.config.NEGATIVE_CACHE_SECONDS <= 0:
+            return
+        self._expires.pop(key, None)
+        self._expires[key] = time.monotonic() + self.config.NEGATIVE_CACHE_SECONDS
+        if len(self._expires) > self.config.NEGATIVE_CACHE_SIZE:
+            self._expires.popitem(last=False)
@@ -0,0 +1,97 @@
+"""
+Global overload shedding for the API
+"""
+import json
+import time
+import asyncio
+import logging
+from typing import Optional
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class LoadShedder:
+    """
+    Tracks in-flight requests and event-loop lag for one API process
+    
+    `monitor` wakes every SHED_LAG_CHECK_INTERVAL_MS and records how late
+    it woke up; a loop that is busy with CPU work or blocked in a sync call
+    wakes late. The process is overloaded while the last measured lag is
+    above SHED_MAX_LOOP_LAG_MS or more than SHED_MAX_IN_FLIGHT requests are
+    running (either check is off when set to 0).
+    """
+    
+    def __init__(self, config: Config = None):
+        self.config = config or Config()
+        self.in_flight = 0
+        self.loop_lag = 0.0
+        self.shed = 0
+    
+    async def monitor(self):
+        """Measure event-loop lag until cancelled"""
+        interval = self.config.SHED_LAG_CHECK_INTERVAL_MS / 1000
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(interval)
+            self.loop_lag = max(0.0, time.perf_counter() - started - interval)
+    
+    def overloaded(self) -> Optional[str]:
+        """Reason the process should shed the next request, or None"""
+        max_in_flight = self.config.SHED_MAX_IN_FLIGHT
+        if max_in_flight and self.in_flight >= max_in_flight:
+            return "too many requests in flight"
+        max_lag = self.config.SHED_MAX_LOOP_LAG_MS
+        if max_lag and self.loop_lag * 1000 > max_lag:
+            return "event loop lagging"
+        return None
+
+
+class LoadSheddingMiddleware:
+    """ASGI middleware that answers 503 with Retry-After while overloaded"""
+    
+    # Probes must keep answering so an overloaded process is not restarted
+    # (or a healthy worker restarted through /health/feeds); sub-paths of
+    # these prefixes are exempt too
+    EXEMPT_PATHS = ("/health", "/ready")
+    
+    def __init__(self, app, shedder: LoadShedder):
+        self.app = app
+        self.shedder = shedder
+    
+    def exempt(self, path: str) -> bool:
+        """Whether a path is a probe that is never shed"""
+        return any(path == prefix or path.startswith(prefix + "/") for prefix in self.EXEMPT_PATHS)
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.exempt(scope.get("path", "")):
+            await self.app(scope, receive, send)
+            return
+        
+        reason = self.shedder.overloaded()
+        if reason:
+            self.shedder.shed += 1
+            if self.shedder.shed % 100 == 1:
+                logger.warning(f"Shedding load ({reason}); {self.shedder.shed} requests shed so far")
+            await self._reject(send, reason)
+            return
+        
+        self.shedder.in_flight += 1
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.shedder.in_flight -= 1
+    
+    async def _reject(self, send, reason: str):
+        body = json.dumps({"detail": f"Service overloaded: {reason}"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(self.shedder.config.SHED_RETRY_AFTER_SECONDS).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
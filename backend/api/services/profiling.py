@@ -0,0 +1,130 @@
+"""
+Sampled request profiling for the API
+"""
+import os
+import sys
+import random
+import logging
+import threading
+from collections import defaultdict
+from typing import Dict, Optional
+from urllib.parse import parse_qs
+
+from ..config import Config
+
+logger = logging.getLogger(__name__)
+
+
+class RequestProfiler:
+    """
+    Samples the event-loop thread's stack while selected requests run
+    
+    Armed for PROFILE_REQUESTS requests at start-up, or for
+    PROFILE_SIGNAL_REQUESTS requests when a worker process receives SIGUSR2.
+    While armed, each request is profiled with probability
+    PROFILE_SAMPLE_RATE (one at a time). Samples are prefixed with
+    "route=...;line=..." frames and written in folded-stack format
+    (flamegraph.pl / speedscope) to PROFILE_DIR once the budget is spent.
+    
+    Concurrent requests share the event loop, so a sample can include
+    frames from other in-flight requests; the label marks whose window it
+    was taken in.
+    """
+    
+    def __init__(self, config: Config = None):
+        self.config = config or Config()
+        self.remaining = 0
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._label: Optional[str] = None
+        self._thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+        self._session = 0
+    
+    def arm(self, requests: Optional[int] = None):
+        """Profile the next `requests` sampled requests"""
+        self.remaining = requests or self.config.PROFILE_SIGNAL_REQUESTS
+        self._thread_id = threading.get_ident()
+        self._session += 1
+        self._stop.clear()
+        if self._sampler is None:
+            self._sampler = threading.Thread(target=self._run, name="request-sampler", daemon=True)
+            self._sampler.start()
+        logger.info(f"Request profiling armed for {self.remaining} requests (rate {self.config.PROFILE_SAMPLE_RATE})")
+    
+    def handle_signal(self, signum, frame):
+        """Signal handler that arms the profiler"""
+        self.arm()
+    
+    def should_sample(self) -> bool:
+        """Decide whether to profile the next request"""
+        if self.remaining <= 0 or self._label is not None:
+            return False
+        return random.random() < self.config.PROFILE_SAMPLE_RATE
+    
+    def begin(self, scope: dict):
+        """Start attributing samples to a request"""
+        line = parse_qs(scope.get("query_string", b"").decode()).get("line", [""])[0]
+        path = scope.get("path", "")
+        if not line and path.startswith("/eta/stations/"):
+            line = path.rsplit("/", 1)[-1]
+        label = f"route={scope.get('method', 'GET')} {path}"
+        self._label = f"{label};line={line.upper()}" if line else label
+    
+    def end(self):
+        """Stop attributing samples and flush when the budget is spent"""
+        self._label = None
+        self.remaining -= 1
+        if self.remaining <= 0:
+            self.flush()
+    
+    def flush(self):
+        """Write collected samples and stop the sampler thread"""
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+            self._sampler = None
+        if not self.counts:
+            return
+        
+        os.makedirs(self.config.PROFILE_DIR, exist_ok=True)
+        path = os.path.join(self.config.PROFILE_DIR, f"api-{os.getpid()}-session{self._session}.folded")
+        with open(path, "w") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+        self.counts.clear()
+        logger.info(f"Wrote request profile {path}")
+    
+    def _run(self):
+        interval = self.config.PROFILE_SAMPLE_INTERVAL_MS / 1000
+        while not self._stop.wait(interval):
+            label = self._label
+            if label is None:
+                continue
+            frame = sys._current_frames().get(self._thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.append(label)
+            self.counts[";".join(reversed(stack))] += 1
+
+
+class ProfilingMiddleware:
+    """ASGI middleware that hands sampled requests to a RequestProfiler"""
+    
+    def __init__(self, app, profiler: RequestProfiler):
+        self.app = app
+        self.profiler = profiler
+    
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.should_sample():
+            await self.app(scope, receive, send)
+            return
+        
+        self.profiler.begin(scope)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.profiler.end()
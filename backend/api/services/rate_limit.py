@@ -0,0 +1,134 @@
+"""
+Per-token rate limiting with Redis token buckets
+"""
+import math
+import time
+import logging
+import threading
+from typing import Dict, Optional, Tuple
+
+from ..config import Config
+from .redis_service import RedisService
+from .redis_keys import rate_limit_key
+
+logger = logging.getLogger(__name__)
+
+# Refill the bucket from Redis' clock, then take up to ARGV[3] tokens.
+# Returns {granted, seconds until the next token (as a string)}.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local clock = redis.call('TIME')
+local now = tonumber(clock[1]) + tonumber(clock[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local last = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - last) * rate)
+local granted = math.min(requested, math.floor(tokens))
+tokens = tokens - granted
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(capacity / rate) + 1)
+local retry_after = 0
+if granted == 0 then
+    retry_after = (1 - tokens) / rate
+end
+return {granted, tostring(retry_after)}
+"""
+
+
+class RateLimiter:
+    """
+    Token bucket per JWT subject, shared by all API processes through Redis
+    
+    Each bucket holds RATE_LIMIT_BURST tokens and refills at
+    RATE_LIMIT_PER_SECOND. The bucket lives in Redis and is updated by one
+    Lua script, so concurrent processes cannot double-spend it.
+    
+    Most requests never reach Redis: a process takes up to
+    RATE_LIMIT_LOCAL_BATCH tokens per script call and spends them locally
+    for RATE_LIMIT_LEASE_SECONDS, and a subject that was refused is refused
+    locally until its retry time. Leased tokens that go unspent are lost,
+    which errs on the side of limiting.
+    
+    If Redis is unreachable requests are allowed (the limiter fails open).
+    With STORAGE_BACKEND=file there is no Redis: the same bucket is kept in
+    each API process, so the effective limit scales with API_WORKERS.
+    """
+    
+    # Forget local state once this many subjects are tracked
+    MAX_LOCAL_SUBJECTS = 10000
+    
+    def __init__(self, redis_service: RedisService, config: Config = None):
+        self.redis_service = redis_service
+        self.config = config or Config()
+        # subject -> [tokens left, lease expiry, refused until]
+        self._local: Dict[str, list] = {}
+        self._lock = threading.Lock()
+        self._script = None
+        # subject -> [tokens, last refill] when buckets are kept in-process
+        self._buckets: Dict[str, list] = {}
+    
+    def _take_local(self, subject: str, requested: int) -> Tuple[int, float]:
+        """TOKEN_BUCKET_SCRIPT run against an in-process bucket"""
+        capacity, rate = self.config.RATE_LIMIT_BURST, self.config.RATE_LIMIT_PER_SECOND
+        now = time.monotonic()
+        with self._lock:
+            if len(self._buckets) >= self.MAX_LOCAL_SUBJECTS:
+                self._buckets.clear()
+            bucket = self._buckets.setdefault(subject, [float(capacity), now])
+            tokens = min(capacity, bucket[0] + max(0.0, now - bucket[1]) * rate)
+            granted = min(requested, math.floor(tokens))
+            bucket[0], bucket[1] = tokens - granted, now
+        return granted, (1 - bucket[0]) / rate if granted == 0 else 0.0
+    
+    def _take(self, subject: str, requested: int) -> Tuple[int, float]:
+        if self.config.STORAGE_BACKEND == "file":
+            return self._take_local(subject, requested)
+        if self._script is None:
+            self._script = self.redis_service.client.register_script(TOKEN_BUCKET_SCRIPT)
+        granted, retry_after = self._script(
+            keys=[rate_limit_key(subject)],
+            args=[self.config.RATE_LIMIT_BURST, self.config.RATE_LIMIT_PER_SECOND, requested],
+            client=self.redis_service.client
+        )
+        return int(granted), float(retry_after)
+    
+    def check(self, subject: Optional[str]) -> float:
+        """
+        Spend one token for a subject
+        
+        Args:
+            subject: JWT "sub" claim
+        
+        Returns:
+            0 if the request may proceed, otherwise seconds until it may retry
+        """
+        if not self.config.RATE_LIMIT_ENABLED:
+            return 0.0
+        subject = subject or "anonymous"
+        now = time.monotonic()
+        
+        with self._lock:
+            state = self._local.get(subject)
+            if state is not None:
+                if state[2] > now:
+                    return state[2] - now
+                if state[0] > 0 and state[1] > now:
+                    state[0] -= 1
+                    return 0.0
+        
+        try:
+            granted, retry_after = self._take(subject, max(1, self.config.RATE_LIMIT_LOCAL_BATCH))
+        except Exception as e:
+            logger.error(f"Rate limiter unavailable, allowing request: {e}")
+            return 0.0
+        
+        with self._lock:
+            if len(self._local) >= self.MAX_LOCAL_SUBJECTS:
+                self._local.clear()
+            if granted:
+                self._local[subject] = [granted - 1, now + self.config.RATE_LIMIT_LEASE_SECONDS, 0.0]
+                return 0.0
+            self._local[subject] = [0, 0.0, now + retry_after]
+        return retry_after
@@ -4,34 +4,67 @@ Redis service for caching ETA data
 import json
 import logging
 import redis
-from typing import Optional, Dict, List
-from datetime import datetime
+from typing import Optional, Dict, List, Tuple
 
 from ..config import Config
+from .redis_keys import (
+    SNAPSHOT_KEY, LINE_STATUS_KEY, STATIONS_VERSION_KEY, HEARTBEAT_KEY,
+    eta_key, station_ids_key, trips_key, trip_key, positions_key, history_key, stations_key,
+    gtfsrt_key, gtfsrt_timestamp_key, system_snapshot_key
+)
+from .redis_topology import connect, has_read_replicas
 
 logger = logging.getLogger(__name__)
 
 
 class RedisService:
-    """Service for interacting with Redis cache"""
+    """
+    Service for interacting with Redis cache
+    
+    Writes go through `client` (the primary); GET paths read through
+    `reader`, which is a replica when the topology has one (REDIS_MODE
+    sentinel/cluster or REDIS_REPLICA_HOSTS) and the primary otherwise.
+    
+    ETA and trip-index reads are pinned to the line versions of one read of
+    the worker's snapshot pointer, so a response never mixes cycles.
+    """
     
     def __init__(self, config: Config = None):
         self.config = config or Config()
         self._client: Optional[redis.Redis] = None
+        self._reader: Optional[redis.Redis] = None
+        self._binary_reader: Optional[redis.Redis] = None
     
     @property
     def client(self) -> redis.Redis:
-        """Lazy initialization of Redis client"""
+        """Lazy initialization of Redis client (primary)"""
         if self._client is None:
-            self._client = redis.Redis(
-                host=self.config.REDIS_HOST,
-                port=self.config.REDIS_PORT,
-                db=self.config.REDIS_DB,
-                decode_responses=True,
-                socket_connect_timeout=self.config.REDIS_TIMEOUT
-            )
+            self._client = connect(self.config)
         return self._client
     
+    @property
+    def reader(self) -> redis.Redis:
+        """Lazy initialization of the read client (replica when available)"""
+        if self._reader is None:
+            self._reader = connect(self.config, read_only=True) if has_read_replicas(self.config) else self.client
+        return self._reader
+    
+    @property
+    def binary_reader(self) -> redis.Redis:
+        """Read client without response decoding, for binary values"""
+        if self._binary_reader is None:
+            self._binary_reader = connect(
+                self.config, read_only=has_read_replicas(self.config), decode_responses=False
+            )
+        return self._binary_reader
+    
+    def _mget(self, keys: List[str], reader: Optional[redis.Redis] = None) -> List[Optional[str]]:
+        """MGET through the reader; in cluster mode keys may span slots"""
+        reader = reader or self.reader
+        if self.config.REDIS_MODE == "cluster":
+            return reader.mget_nonatomic(keys)
+        return reader.mget(keys)
+    
     def ping(self) -> bool:
         """Check Redis connection"""
         try:
@@ -40,7 +73,29 @@ class RedisService:
             logger.error(f"Redis ping failed: {e}")
             return False
     
-    def get_eta(self, line: str, station_id: str, direction: Optional[str] = None) -> Optional[Dict]:
+    def get_snapshot(self) -> Optional[Dict]:
+        """
+        Get the worker's snapshot pointer
+        
+        Returns:
+            Dictionary with the snapshot version and "lines" mapping each
+            line to {version, updated_at, next_update_at}, or None
+        """
+        try:
+            cached_data = self.reader.get(SNAPSHOT_KEY)
+            if cached_data:
+                return json.loads(cached_data)
+        except Exception as e:
+            logger.error(f"Error fetching snapshot pointer: {e}")
+        return None
+    
+    def get_eta(
+        self,
+        line: str,
+        station_id: str,
+        direction: Optional[str] = None,
+        line_version: Optional[Dict] = None
+    ) -> Optional[Dict]:
         """
         Get cached ETA data for a line and station
         
@@ -48,85 +103,319 @@ class RedisService:
             line: Subway line (e.g., "1", "A")
             station_id: GTFS station ID
             direction: Optional direction filter ("N" or "S")
+            line_version: The line's entry from get_line_version to pin the
+                read to (looked up when omitted)
         
         Returns:
             Cached ETA data or None if not found
         """
+        line_version = line_version or self.get_line_version(line)
+        if not line_version:
+            return None
         directions = [direction.upper()] if direction else ["N", "S"]
+        keys = [eta_key(line, line_version["version"], station_id, dir_key) for dir_key in directions]
         results = []
         
-        for dir_key in directions:
-            cache_key = f"eta:{line}:{station_id}:{dir_key}"
+        try:
+            cached = self._mget(keys)
+        except Exception as e:
+            logger.error(f"Error fetching ETA from cache: {e}")
+            return None
+        
+        for dir_key, cache_key, cached_data in zip(directions, keys, cached):
+            if not cached_data:
+                continue
             try:
-                cached_data = self.client.get(cache_key)
-                if cached_data:
-                    eta_data = json.loads(cached_data)
-                    results.append({
-                        "direction": dir_key,
-                        "trains": eta_data.get("trains", [])
-                    })
+                eta_data = json.loads(cached_data)
             except json.JSONDecodeError as e:
                 logger.error(f"Failed to decode cached data for {cache_key}: {e}")
-            except Exception as e:
-                logger.error(f"Error fetching ETA from cache: {e}")
+                continue
+            results.append({
+                "direction": dir_key,
+                "trains": eta_data.get("trains", []),
+                "station_name": eta_data.get("station_name")
+            })
         
         return results if results else None
     
-    def set_eta(
-        self, 
-        line: str, 
-        station_id: str, 
-        direction: str, 
-        trains: List[Dict],
-        station_name: Optional[str] = None,
-        ttl: Optional[int] = None
-    ) -> bool:
+    def get_etas_bulk(self, line_stations: List[Tuple[str, str]]) -> Dict[Tuple[str, str], List[Dict]]:
         """
-        Cache ETA data in Redis
+        Get cached ETA data for many line/station pairs in one round trip
+        
+        All pairs are read from the same snapshot.
         
         Args:
-            line: Subway line
-            station_id: GTFS station ID
-            direction: Direction ("N" or "S")
-            trains: List of train ETA dictionaries
-            station_name: Optional station name
-            ttl: Optional TTL in seconds (defaults to config value)
+            line_stations: List of (line, station_id) pairs
         
         Returns:
-            True if successful, False otherwise
-        """
-        cache_key = f"eta:{line}:{station_id}:{direction}"
-        cache_value = {
-            "line": line,
-            "station_id": station_id,
-            "direction": direction,
-            "trains": trains,
-            "station_name": station_name,
-            "last_updated": datetime.utcnow().isoformat()
-        }
+            Dictionary mapping (line, station_id) to a list of
+            {"direction", "trains"} entries; pairs without data are omitted
+        """
+        snapshot = self.get_snapshot()
+        line_versions = snapshot.get("lines", {}) if snapshot else {}
+        keys = [
+            (line, station_id, dir_key)
+            for line, station_id in line_stations
+            if line in line_versions
+            for dir_key in ("N", "S")
+        ]
+        if not keys:
+            return {}
         
         try:
-            ttl = ttl or self.config.REDIS_TTL_SECONDS
-            self.client.setex(cache_key, ttl, json.dumps(cache_value))
-            logger.debug(f"Cached ETA: {cache_key} ({len(trains)} trains)")
-            return True
+            cached = self._mget([
+                eta_key(line, line_versions[line]["version"], station_id, dir_key)
+                for line, station_id, dir_key in keys
+            ])
         except Exception as e:
-            logger.error(f"Failed to cache ETA for {cache_key}: {e}")
-            return False
+            logger.error(f"Error fetching ETAs from cache: {e}")
+            return {}
+        
+        results: Dict[Tuple[str, str], List[Dict]] = {}
+        for (line, station_id, dir_key), cached_data in zip(keys, cached):
+            if not cached_data:
+                continue
+            try:
+                eta_data = json.loads(cached_data)
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to decode cached data for {line}:{station_id}:{dir_key}: {e}")
+                continue
+            results.setdefault((line, station_id), []).append({
+                "direction": dir_key,
+                "trains": eta_data.get("trains", [])
+            })
+        return results
     
-    def get_stations(self, line: str) -> Optional[List[Dict]]:
+    def get_line_version(self, line: str, snapshot: Optional[Dict] = None) -> Optional[Dict]:
+        """
+        Get the version the worker's snapshot pointer holds for a line
+        
+        Args:
+            line: Subway line identifier
+            snapshot: Pointer from get_snapshot (read when omitted)
+        
+        Returns:
+            Dictionary with version, updated_at and next_update_at, or None
+        """
+        snapshot = snapshot or self.get_snapshot()
+        if not snapshot:
+            return None
+        return snapshot.get("lines", {}).get(line)
+    
+    def get_stations(self, line: str) -> Optional[Dict]:
         """Get list of stations for a line from cache"""
-        cache_key = f"stations:{line}"
+        cache_key = stations_key(line)
         try:
-            cached_data = self.client.get(cache_key)
+            cached_data = self.reader.get(cache_key)
             if cached_data:
                 return json.loads(cached_data)
         except Exception as e:
             logger.error(f"Error fetching stations from cache: {e}")
         return None
     
+    def get_station_ids(self, line: str, version: str) -> Optional[List[str]]:
+        """Get the stations a line version has ETA keys for"""
+        try:
+            cached_data = self.reader.get(station_ids_key(line, version))
+            if cached_data:
+                return json.loads(cached_data)
+        except Exception as e:
+            logger.error(f"Error fetching station IDs for line {line}: {e}")
+        return None
+    
+    def get_trip_index_version(self, line: str) -> Optional[str]:
+        """Get the version of a line's trip index (the line's snapshot version)"""
+        line_version = self.get_line_version(line)
+        return line_version["version"] if line_version else None
+    
+    def get_trip_index(self, line: str, version: str) -> Optional[Dict]:
+        """Get a line's active-trip index at a snapshot version"""
+        try:
+            cached_data = self.reader.get(trips_key(line, version))
+            if cached_data:
+                return json.loads(cached_data)
+        except Exception as e:
+            logger.error(f"Error fetching trip index for line {line}: {e}")
+        return None
+    
+    def get_trips(self, trip_ids: List[str]) -> Dict[str, Dict]:
+        """
+        Get active trips by GTFS trip ID (one MGET for all of them)
+        
+        Returns:
+            Dictionary mapping each found trip ID to its record
+        """
+        if not trip_ids:
+            return {}
+        try:
+            cached = self._mget([trip_key(trip_id) for trip_id in trip_ids])
+        except Exception as e:
+            logger.error(f"Error fetching trips from cache: {e}")
+            return {}
+        return {
+            trip_id: json.loads(cached_data)
+            for trip_id, cached_data in zip(trip_ids, cached)
+            if cached_data
+        }
+    
+    def get_gtfsrt_timestamps(self, lines: List[str]) -> Dict[str, int]:
+        """Source header timestamps of the lines' GTFS-RT exports (lines without one are left out)"""
+        try:
+            cached = self._mget([gtfsrt_timestamp_key(line) for line in lines])
+        except Exception as e:
+            logger.error(f"Error fetching GTFS-RT timestamps: {e}")
+            return {}
+        return {line: int(timestamp) for line, timestamp in zip(lines, cached) if timestamp}
+    
+    def get_gtfsrt(self, lines: List[str]) -> Dict[str, bytes]:
+        """Filtered GTFS-RT FeedMessage bytes of the given lines"""
+        try:
+            cached = self._mget([gtfsrt_key(line) for line in lines], self.binary_reader)
+        except Exception as e:
+            logger.error(f"Error fetching GTFS-RT exports: {e}")
+            return {}
+        return {line: payload for line, payload in zip(lines, cached) if payload is not None}
+    
+    def get_system_snapshot(self, version: str, coding: str) -> Optional[bytes]:
+        """Get the compressed system-wide ETA snapshot of a version ("gzip" or "zstd")"""
+        try:
+            return self.binary_reader.get(system_snapshot_key(version, coding))
+        except Exception as e:
+            logger.error(f"Error fetching system snapshot {version}: {e}")
+        return None
+    
+    def get_positions(self, line: str, version: str) -> Optional[str]:
+        """
+        Get a line's packed train positions at a snapshot version
+        
+        Returns:
+            The JSON document as stored by the worker (served without
+            re-encoding), or None
+        """
+        try:
+            return self.reader.get(positions_key(line, version))
+        except Exception as e:
+            logger.error(f"Error fetching positions for line {line}: {e}")
+        return None
+    
+    def get_history(
+        self,
+        line: str,
+        since: float,
+        limit: int,
+        station_id: Optional[str] = None,
+        direction: Optional[str] = None
+    ) -> List[Dict]:
+        """
+        Read arrival records from a line's history stream
+        
+        The stream is read newest first in pages of HISTORY_QUERY_PAGE_SIZE
+        entries, filtering as it goes, until `limit` matching records are
+        collected or the window is exhausted. A station query therefore
+        sees the most recent `limit` arrivals at that station rather than
+        whatever the first `limit` line-wide entries contained.
+        
+        Args:
+            line: Subway line identifier
+            since: Epoch seconds; only records written after this are returned
+            limit: Maximum number of matching records to return
+            station_id: Only records for this station
+            direction: Only records in this direction ("N" or "S")
+        
+        Returns:
+            List of arrival records, oldest first
+        """
+        stream_key = history_key(line)
+        oldest = str(int(since * 1000))
+        newest = "+"
+        page_size = self.config.HISTORY_QUERY_PAGE_SIZE
+        events: List[Dict] = []
+        try:
+            while len(events) < limit:
+                entries = self.reader.xrevrange(stream_key, max=newest, min=oldest, count=page_size)
+                for _, fields in entries:
+                    if (station_id and fields["s"] != station_id) or (direction and fields["d"] != direction):
+                        continue
+                    events.append({
+                        "station_id": fields["s"],
+                        "direction": fields["d"],
+                        "trip_id": fields["t"],
+                        "arrival": int(fields["a"]),
+                        "predicted": int(fields["p"]),
+                        "lead": int(fields["l"])
+                    })
+                    if len(events) >= limit:
+                        break
+                if len(entries) < page_size:
+                    break
+                # Exclusive bound: continue below the oldest entry of this page
+                newest = f"({entries[-1][0]}"
+        except Exception as e:
+            logger.error(f"Error reading history for line {line}: {e}")
+            return []
+        
+        events.reverse()
+        return events
+    
+    def get_line_statuses(self) -> Optional[Dict]:
+        """Get the system-wide line status summary written by the worker"""
+        try:
+            cached_data = self.reader.get(LINE_STATUS_KEY)
+            if cached_data:
+                return json.loads(cached_data)
+        except Exception as e:
+            logger.error(f"Error fetching line status from cache: {e}")
+        return None
+    
+    def get_heartbeat(self) -> Optional[Dict]:
+        """Get the worker's latest heartbeat"""
+        try:
+            cached_data = self.reader.get(HEARTBEAT_KEY)
+            if cached_data:
+                return json.loads(cached_data)
+        except Exception as e:
+            logger.error(f"Error fetching worker heartbeat: {e}")
+        return None
+    
+    def get_stations_version(self) -> Optional[str]:
+        """Get the version of the station catalog published by the worker"""
+        try:
+            return self.reader.get(STATIONS_VERSION_KEY)
+        except Exception as e:
+            logger.error(f"Error fetching station catalog version: {e}")
+        return None
+    
+    def get_all_stations(self, lines: List[str]) -> Dict[str, Dict]:
+        """
+        Get station lists for several lines in one round trip
+        
+        Returns:
+            Dictionary mapping line to its cached station payload
+        """
+        try:
+            cached = self._mget([stations_key(line) for line in lines])
+        except Exception as e:
+            logger.error(f"Error fetching stations from cache: {e}")
+            return {}
+        
+        stations = {}
+        for line, cached_data in zip(lines, cached):
+            if not cached_data:
+                continue
+            try:
+                stations[line] = json.loads(cached_data)
+            except json.JSONDecodeError as e:
+                logger.error(f"Failed to decode stations for line {line}: {e}")
+        return stations
+    
     def close(self):
         """Close Redis connection"""
+        if self._reader and self._reader is not self._client:
+            self._reader.close()
+        self._reader = None
+        if self._binary_reader:
+            self._binary_reader.close()
+            self._binary_reader = None
         if self._client:
             self._client.close()
             self._client = None
@@ -0,0 +1,77 @@
+"""
+Redis client construction for standalone, Sentinel and Cluster deployments
+"""
+import random
+import logging
+from typing import List, Tuple
+
+import redis
+from redis.cluster import RedisCluster, ClusterNode
+from redis.sentinel import Sentinel
+
+logger = logging.getLogger(__name__)
+
+
+def parse_nodes(value: str) -> List[Tuple[str, int]]:
+    """Parse "host:port,host:port" into (host, port) pairs"""
+    nodes = []
+    for item in value.split(","):
+        item = item.strip()
+        if item:
+            host, _, port = item.partition(":")
+            nodes.append((host, int(port or 6379)))
+    return nodes
+
+
+def connect(config, read_only: bool = False, decode_responses: bool = True) -> redis.Redis:
+    """
+    Create a Redis client for the configured REDIS_MODE
+    
+    - standalone: REDIS_HOST:REDIS_PORT; read-only clients pick one of
+      REDIS_REPLICA_HOSTS at random when it is set
+    - sentinel: the primary of REDIS_SENTINEL_MASTER discovered through
+      REDIS_SENTINELS, or one of its replicas for read-only clients
+    - cluster: a RedisCluster seeded from REDIS_CLUSTER_NODES (default
+      REDIS_HOST:REDIS_PORT); read-only clients route reads to replicas
+    
+    Args:
+        config: API or worker configuration
+        read_only: Client only serves reads and may use a replica
+        decode_responses: Return str (False returns raw bytes, for binary values)
+    
+    Returns:
+        Redis client (RedisCluster in cluster mode)
+    """
+    options = {
+        "decode_responses": decode_responses,
+        "socket_connect_timeout": config.REDIS_TIMEOUT
+    }
+    
+    if config.REDIS_MODE == "cluster":
+        nodes = parse_nodes(config.REDIS_CLUSTER_NODES) or [(config.REDIS_HOST, config.REDIS_PORT)]
+        return RedisCluster(
+            startup_nodes=[ClusterNode(host, port) for host, port in nodes],
+            read_from_replicas=read_only,
+            **options
+        )
+    
+    if config.REDIS_MODE == "sentinel":
+        sentinel = Sentinel(parse_nodes(config.REDIS_SENTINELS), socket_timeout=config.REDIS_TIMEOUT)
+        if read_only:
+            return sentinel.slave_for(config.REDIS_SENTINEL_MASTER, db=config.REDIS_DB, **options)
+        return sentinel.master_for(config.REDIS_SENTINEL_MASTER, db=config.REDIS_DB, **options)
+    
+    if config.REDIS_MODE != "standalone":
+        raise ValueError(f"Unknown REDIS_MODE {config.REDIS_MODE!r} (standalone, sentinel or cluster)")
+    
+    host, port = config.REDIS_HOST, config.REDIS_PORT
+    replicas = parse_nodes(config.REDIS_REPLICA_HOSTS)
+    if read_only and replicas:
+        host, port = random.choice(replicas)
+        logger.info(f"Reading from Redis replica {host}:{port}")
+    return redis.Redis(host=host, port=port, db=config.REDIS_DB, **options)
+
+
+def has_read_replicas(config) -> bool:
+    """Whether read-only clients can be served by something other than the primary"""
+    return config.REDIS_MODE != "standalone" or bool(config.REDIS_REPLICA_HOSTS)
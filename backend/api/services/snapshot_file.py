@@ -0,0 +1,323 @@
+"""
+Reads the worker's memory-mapped snapshot file (STORAGE_BACKEND=file)
+
+File layout (little-endian; keep in sync with backend/worker/services/snapshot_file.py):
+    header   MAGIC (8 bytes), entry count (u32), written_at (f64 epoch seconds)
+    index    one entry per key, sorted by key bytes:
+             key offset (u64), key length (u32), value offset (u64),
+             value length (u32), expires_at (f64 epoch seconds, 0 = never)
+    keys     the UTF-8 keys, back to back
+    values   the values, back to back
+
+Keys and values are the ones the worker writes to Redis with the Redis
+backend, so RedisService's read paths work unchanged on top of it. The
+snapshot file holds the unversioned keys and the versions its pointer names.
+History streams are in a second file of the same format, one key per stream
+chunk ("<stream key>:<first ms>-<first seq>", zero-padded so a stream's
+chunks sort oldest first), each chunk value indexed:
+    count    u32
+    ms       u64 per entry  } entry IDs, ascending
+    seq      u32 per entry  }
+    offsets  u32 per entry + 1, into the payloads
+    payloads the entries' fields as JSON objects, back to back
+"""
+import os
+import json
+import mmap
+import time
+import struct
+import logging
+import threading
+from bisect import bisect_left, bisect_right
+from typing import Dict, List, Optional, Tuple
+
+from ..config import Config
+from .redis_service import RedisService
+from .redis_keys import key_version
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"NYCETA\x00\x01"
+HEADER = struct.Struct("<8sId")
+INDEX_ENTRY = struct.Struct("<QIQId")
+CHUNK_COUNT = struct.Struct("<I")
+CHUNK_MS = struct.Struct("<Q")
+CHUNK_SEQ = struct.Struct("<I")
+CHUNK_SPAN = struct.Struct("<II")
+
+
+class SnapshotFile:
+    """
+    The current snapshot file, mapped read-only
+    
+    The worker publishes each cycle by renaming a new file over the old one.
+    Lookups check the path for a new file at most every
+    SNAPSHOT_FILE_CHECK_SECONDS and remap it; the old mapping stays valid
+    for lookups already holding it. A file only holds the versions its own
+    pointer names, so the previous mapping is kept and versioned keys
+    missing from the current file are looked up there: a request pinned to
+    the previous pointer still resolves after a remap.
+    
+    All processes on the host share the file's pages and a lookup
+    binary-searches the index in place, but the value is returned as a copy
+    (bytes, like redis-py returns), not a view into the mapping.
+    """
+    
+    def __init__(self, path: str, config: Config = None):
+        self.path = path
+        self.config = config or Config()
+        # (mapping, entry count, file identity), swapped as one reference
+        self._mapped: Optional[Tuple[mmap.mmap, int, Tuple]] = None
+        self._previous: Optional[Tuple[mmap.mmap, int, Tuple]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+    
+    def _open(self, identity: Tuple) -> Tuple[mmap.mmap, int, Tuple]:
+        with open(self.path, "rb") as f:
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, count, _ = HEADER.unpack_from(mapping)
+        if magic != MAGIC:
+            mapping.close()
+            raise ValueError(f"{self.path} is not a snapshot file")
+        return mapping, count, identity
+    
+    def _current(self) -> Optional[Tuple[mmap.mmap, int, Tuple]]:
+        now = time.monotonic()
+        if self._mapped is not None and now - self._checked_at < self.config.SNAPSHOT_FILE_CHECK_SECONDS:
+            return self._mapped
+        
+        with self._lock:
+            if self._mapped is not None and now - self._checked_at < self.config.SNAPSHOT_FILE_CHECK_SECONDS:
+                return self._mapped
+            self._checked_at = now
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                return self._mapped
+            identity = (st.st_ino, st.st_mtime_ns, st.st_size)
+            if self._mapped is None or self._mapped[2] != identity:
+                self._previous, self._mapped = self._mapped, self._open(identity)
+                logger.debug(f"Mapped snapshot file {self.path} ({st.st_size} bytes)")
+        return self._mapped
+    
+    def available(self) -> bool:
+        """Whether a snapshot file has been published and mapped"""
+        return self._current() is not None
+    
+    def get(self, key: str) -> Optional[bytes]:
+        """Copy of a key's value, or None if absent or expired"""
+        mapped = self._current()
+        if mapped is None:
+            return None
+        target = key.encode("utf-8")
+        found, value = self._lookup(mapped, target)
+        previous = self._previous
+        if not found and previous is not None and key_version(key):
+            _, value = self._lookup(previous, target)
+        return value
+    
+    def views(self, prefix: str) -> List[memoryview]:
+        """
+        Values of every key starting with `prefix`, in key order
+        
+        The values are views into the mapping, not copies; they keep the
+        mapping alive while held.
+        """
+        mapped = self._current()
+        if mapped is None:
+            return []
+        mapping, count, _ = mapped
+        target = prefix.encode("utf-8")
+        views = []
+        for i in range(self._search(mapped, target), count):
+            key_pos, key_len, value_pos, value_len, _ = INDEX_ENTRY.unpack_from(
+                mapping, HEADER.size + i * INDEX_ENTRY.size
+            )
+            if not mapping[key_pos:key_pos + key_len].startswith(target):
+                break
+            views.append(memoryview(mapping)[value_pos:value_pos + value_len])
+        return views
+    
+    @staticmethod
+    def _search(mapped: Tuple[mmap.mmap, int, Tuple], target: bytes) -> int:
+        """Index position of the first key not below `target`"""
+        mapping, count, _ = mapped
+        lo, hi = 0, count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key_pos, key_len = struct.unpack_from("<QI", mapping, HEADER.size + mid * INDEX_ENTRY.size)
+            if mapping[key_pos:key_pos + key_len] < target:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+    
+    @classmethod
+    def _lookup(cls, mapped: Tuple[mmap.mmap, int, Tuple], target: bytes) -> Tuple[bool, Optional[bytes]]:
+        """(whether the key is in the file, its value unless expired)"""
+        mapping, count, _ = mapped
+        i = cls._search(mapped, target)
+        if i == count:
+            return False, None
+        key_pos, key_len, value_pos, value_len, expires_at = INDEX_ENTRY.unpack_from(
+            mapping, HEADER.size + i * INDEX_ENTRY.size
+        )
+        if mapping[key_pos:key_pos + key_len] != target:
+            return False, None
+        if expires_at and expires_at <= time.time():
+            return True, None
+        return True, mapping[value_pos:value_pos + value_len]
+
+
+class StreamChunk:
+    """
+    One indexed stream chunk, read in place from a view of the mapping
+    
+    Indexing yields (ms, seq) entry IDs, so bisect works on it directly;
+    only the entries returned by `entry` are copied and decoded.
+    """
+    
+    def __init__(self, view: memoryview):
+        self.view = view
+        (self.count,) = CHUNK_COUNT.unpack_from(view)
+        self._seq = CHUNK_COUNT.size + CHUNK_MS.size * self.count
+        self._offsets = self._seq + CHUNK_SEQ.size * self.count
+        self._payloads = self._offsets + CHUNK_SEQ.size * (self.count + 1)
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def __getitem__(self, i: int) -> Tuple[int, int]:
+        (ms,) = CHUNK_MS.unpack_from(self.view, CHUNK_COUNT.size + CHUNK_MS.size * i)
+        (seq,) = CHUNK_SEQ.unpack_from(self.view, self._seq + CHUNK_SEQ.size * i)
+        return ms, seq
+    
+    def entry(self, i: int) -> Tuple[str, Dict]:
+        """Entry i as XRANGE returns it: ("<ms>-<seq>", fields)"""
+        ms, seq = self[i]
+        start, end = CHUNK_SPAN.unpack_from(self.view, self._offsets + CHUNK_SEQ.size * i)
+        return f"{ms}-{seq}", json.loads(bytes(self.view[self._payloads + start:self._payloads + end]))
+    
+    def between(self, low: Tuple[int, int], low_exclusive: bool, high: Tuple[int, int], high_exclusive: bool) -> range:
+        """Positions of the entries within the bounds"""
+        first = (bisect_right if low_exclusive else bisect_left)(self, low)
+        last = (bisect_left if high_exclusive else bisect_right)(self, high)
+        return range(first, max(first, last))
+
+
+class SnapshotFileClient:
+    """
+    Read-only view of a SnapshotFile with the Redis commands RedisService reads with
+    
+    Stream commands read from `history_file` when one is given.
+    """
+    
+    def __init__(
+        self,
+        snapshot_file: SnapshotFile,
+        decode_responses: bool = True,
+        history_file: Optional[SnapshotFile] = None
+    ):
+        self.snapshot_file = snapshot_file
+        self.decode_responses = decode_responses
+        self.history_file = history_file or snapshot_file
+    
+    def _decode(self, value: Optional[bytes]):
+        if value is None or not self.decode_responses:
+            return value
+        return value.decode("utf-8")
+    
+    def ping(self) -> bool:
+        return self.snapshot_file.available()
+    
+    def get(self, key: str):
+        return self._decode(self.snapshot_file.get(key))
+    
+    def mget(self, keys: List[str]) -> List:
+        return [self.get(key) for key in keys]
+    
+    mget_nonatomic = mget
+    
+    @staticmethod
+    def _stream_bound(bound: str, default: Tuple[int, int]) -> Tuple[Tuple[int, int], bool]:
+        """Parse an XRANGE bound ("-", "+", "ms", "ms-seq", "(" for exclusive) into (id, exclusive)"""
+        if bound in ("-", "+"):
+            return default, False
+        exclusive = bound.startswith("(")
+        ms, _, seq = bound.lstrip("(").partition("-")
+        return (int(ms), int(seq) if seq else default[1]), exclusive
+    
+    def _stream_ranges(self, key: str, min: str, max: str) -> List[Tuple[StreamChunk, range]]:
+        """Each chunk of a stream with the positions of its entries between two bounds, oldest first"""
+        low, low_exclusive = self._stream_bound(min, (0, 0))
+        high, high_exclusive = self._stream_bound(max, (float("inf"), float("inf")))
+        ranges = []
+        for view in self.history_file.views(f"{key}:"):
+            chunk = StreamChunk(view)
+            positions = chunk.between(low, low_exclusive, high, high_exclusive)
+            if positions:
+                ranges.append((chunk, positions))
+        return ranges
+    
+    def xrange(self, key: str, min: str = "-", max: str = "+", count: Optional[int] = None) -> List[Tuple[str, Dict]]:
+        entries = []
+        for chunk, positions in self._stream_ranges(key, min, max):
+            for i in positions:
+                if count is not None and len(entries) >= count:
+                    return entries
+                entries.append(chunk.entry(i))
+        return entries
+    
+    def xrevrange(self, key: str, max: str = "+", min: str = "-", count: Optional[int] = None) -> List[Tuple[str, Dict]]:
+        entries = []
+        for chunk, positions in reversed(self._stream_ranges(key, min, max)):
+            for i in reversed(positions):
+                if count is not None and len(entries) >= count:
+                    return entries
+                entries.append(chunk.entry(i))
+        return entries
+    
+    def close(self):
+        pass
+
+
+class FileSnapshotService(RedisService):
+    """
+    RedisService reading from the worker's snapshot file instead of Redis
+    
+    Used for single-node deployments (STORAGE_BACKEND=file). Every read path
+    is RedisService's own; only the clients are swapped for views of the
+    mapped file, so responses are identical to the Redis backend. There is
+    no writable store: the rate limiter keeps its buckets in-process.
+    """
+    
+    def __init__(self, config: Config = None):
+        super().__init__(config)
+        self.snapshot_file = SnapshotFile(self.config.SNAPSHOT_FILE_PATH, self.config)
+        self.history_file = SnapshotFile(self.config.SNAPSHOT_HISTORY_FILE_PATH, self.config)
+    
+    @property
+    def client(self) -> SnapshotFileClient:
+        if self._client is None:
+            self._client = SnapshotFileClient(self.snapshot_file, history_file=self.history_file)
+        return self._client
+    
+    @property
+    def reader(self) -> SnapshotFileClient:
+        return self.client
+    
+    @property
+    def binary_reader(self) -> SnapshotFileClient:
+        if self._binary_reader is None:
+            self._binary_reader = SnapshotFileClient(
+                self.snapshot_file, decode_responses=False, history_file=self.history_file
+            )
+        return self._binary_reader
+    
+    def ping(self) -> bool:
+        """Check the worker has published a snapshot file"""
+        try:
+            return self.client.ping()
+        except Exception as e:
+            logger.error(f"Snapshot file unavailable: {e}")
+            return False
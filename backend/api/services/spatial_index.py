@@ -0,0 +1,143 @@
+"""
+Grid-based spatial index over station coordinates
+"""
+import math
+import heapq
+import logging
+from collections import defaultdict
+from typing import Optional, Dict, List, Tuple
+
+from ..config import Config
+from .station_catalog import StationCatalog
+
+logger = logging.getLogger(__name__)
+
+METERS_PER_DEGREE_LAT = 111_320.0
+
+
+class StationIndex:
+    """
+    Nearest-station lookups over the station catalog
+    
+    Stations are projected onto a local equirectangular plane (meters) and
+    bucketed into square cells of NEARBY_CELL_METERS. A query scans rings of
+    cells outwards from the query cell and stops as soon as the k-th best
+    distance is closer than the next ring can be, so it touches only a
+    handful of cells instead of every station.
+    """
+    
+    def __init__(self, station_catalog: StationCatalog, config: Config = None):
+        self.config = config or Config()
+        self.station_catalog = station_catalog
+        self.version: Optional[str] = None
+        self.stations: Dict[str, Dict] = {}
+        self._cells: Dict[Tuple[int, int], List[Tuple[float, float, str]]] = {}
+        self._meters_per_degree_lon = METERS_PER_DEGREE_LAT
+        self._max_ring = 0
+    
+    def refresh(self) -> bool:
+        """
+        Rebuild the index if the station catalog version changed
+        
+        Returns:
+            True if the index was rebuilt
+        """
+        self.station_catalog.refresh()
+        if self.station_catalog.version == self.version:
+            return False
+        
+        stations: Dict[str, Dict] = {}
+        for line, payload in self.station_catalog.lines().items():
+            for station in payload.get("stations", []):
+                entry = stations.setdefault(station["id"], {
+                    "station_id": station["id"],
+                    "name": station["name"],
+                    "lat": station["lat"],
+                    "lon": station["lon"],
+                    "lines": []
+                })
+                entry["lines"].append(line)
+        
+        self._build(stations)
+        self.version = self.station_catalog.version
+        logger.info(f"Built station index over {len(stations)} stations ({len(self._cells)} cells)")
+        return True
+    
+    def _build(self, stations: Dict[str, Dict]):
+        """Bucket stations into grid cells"""
+        cell = self.config.NEARBY_CELL_METERS
+        if stations:
+            mean_lat = sum(s["lat"] for s in stations.values()) / len(stations)
+            self._meters_per_degree_lon = METERS_PER_DEGREE_LAT * math.cos(math.radians(mean_lat))
+        
+        cells: Dict[Tuple[int, int], List[Tuple[float, float, str]]] = defaultdict(list)
+        for station_id, station in stations.items():
+            x, y = self._project(station["lat"], station["lon"])
+            cells[(int(x // cell), int(y // cell))].append((x, y, station_id))
+        
+        if cells:
+            xs = [key[0] for key in cells]
+            ys = [key[1] for key in cells]
+            self._max_ring = max(max(xs) - min(xs), max(ys) - min(ys)) + 1
+        
+        self.stations = stations
+        self._cells = dict(cells)
+    
+    def _project(self, lat: float, lon: float) -> Tuple[float, float]:
+        """Project coordinates to meters on the local plane"""
+        return lon * self._meters_per_degree_lon, lat * METERS_PER_DEGREE_LAT
+    
+    def nearest(self, lat: float, lon: float, k: int, radius_m: float) -> List[Tuple[float, str]]:
+        """
+        Find the k nearest stations within a radius
+        
+        Args:
+            lat: Query latitude
+            lon: Query longitude
+            k: Maximum number of stations to return
+            radius_m: Search radius in meters
+        
+        Returns:
+            List of (distance_m, station_id) sorted by distance
+        """
+        self.refresh()
+        if not self._cells or k <= 0:
+            return []
+        
+        cell = self.config.NEARBY_CELL_METERS
+        qx, qy = self._project(lat, lon)
+        cx, cy = int(qx // cell), int(qy // cell)
+        radius_sq = radius_m * radius_m
+        max_ring = min(self._max_ring, int(radius_m // cell) + 1)
+        
+        # Max-heap (negated) of the k best candidates so far
+        best: List[Tuple[float, str]] = []
+        for ring in range(max_ring + 1):
+            for key in self._ring_cells(cx, cy, ring):
+                for x, y, station_id in self._cells.get(key, ()):
+                    dist_sq = (x - qx) ** 2 + (y - qy) ** 2
+                    if dist_sq > radius_sq:
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-dist_sq, station_id))
+                    elif -best[0][0] > dist_sq:
+                        heapq.heapreplace(best, (-dist_sq, station_id))
+            
+            # Anything in rings further out is at least ring * cell away
+            if len(best) == k and -best[0][0] <= (ring * cell) ** 2:
+                break
+        
+        return sorted((math.sqrt(-neg_sq), station_id) for neg_sq, station_id in best)
+    
+    @staticmethod
+    def _ring_cells(cx: int, cy: int, ring: int):
+        """Yield the cell keys at Chebyshev distance `ring` from (cx, cy)"""
+        if ring == 0:
+            yield (cx, cy)
+            return
+        for dx in range(-ring, ring + 1):
+            yield (cx + dx, cy - ring)
+            yield (cx + dx, cy + ring)
+        for dy in range(-ring + 1, ring):
+            yield (cx - ring, cy + dy)
+            yield (cx + ring, cy + dy)
@@ -0,0 +1,72 @@
+"""
+In-process copy of the static station catalog
+"""
+import time
+import logging
+from typing import Optional, Dict, Tuple
+
+from ..config import Config
+from .redis_service import RedisService
+from .http_cache import content_etag
+
+logger = logging.getLogger(__name__)
+
+
+class StationCatalog:
+    """
+    Serves per-line station lists from memory
+    
+    The worker publishes `stations:{line}` keys and a `stations:version`
+    marker. This class checks the marker at most every
+    STATION_CATALOG_REFRESH_SECONDS and reloads all lines when it changes,
+    so a new static GTFS zip is picked up without restarting the API.
+    """
+    
+    def __init__(self, redis_service: RedisService, config: Config = None):
+        self.config = config or Config()
+        self.redis_service = redis_service
+        self.version: Optional[str] = None
+        self._lines: Dict[str, Tuple[Dict, str]] = {}
+        self._checked_at: float = 0.0
+    
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Reload the catalog from Redis if its version changed
+        
+        Args:
+            force: Check the version even if the refresh interval has not elapsed
+        
+        Returns:
+            True if a new version was loaded
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.config.STATION_CATALOG_REFRESH_SECONDS:
+            return False
+        self._checked_at = now
+        
+        version = self.redis_service.get_stations_version()
+        if not version or version == self.version:
+            return False
+        
+        catalog = self.redis_service.get_all_stations(self.config.SUPPORTED_LINES)
+        self._lines = {
+            line: (payload, content_etag(payload))
+            for line, payload in catalog.items()
+        }
+        self.version = version
+        logger.info(f"Loaded station catalog version {version} ({len(self._lines)} lines)")
+        return True
+    
+    def get(self, line: str) -> Optional[Tuple[Dict, str]]:
+        """
+        Get the station list for a line
+        
+        Returns:
+            Tuple of (payload, etag), or None if the line has no stations
+        """
+        self.refresh()
+        return self._lines.get(line)
+    
+    def lines(self) -> Dict[str, Dict]:
+        """Get the loaded station payloads for all lines"""
+        return {line: payload for line, (payload, _) in self._lines.items()}
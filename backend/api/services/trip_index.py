@@ -0,0 +1,90 @@
+"""
+In-process trip index for origin-to-destination lookups
+"""
+import time
+import logging
+from typing import Optional, Dict, List, Tuple
+
+from ..config import Config
+from .redis_service import RedisService
+
+logger = logging.getLogger(__name__)
+
+
+class LineTrips:
+    """One version of a line's active trips plus per-stop lookup tables"""
+    
+    def __init__(self, version: str, trips: Dict[str, Dict]):
+        self.version = version
+        self.trips = trips
+        # station_id -> {trip_id: position of the station in the trip}
+        self.by_stop: Dict[str, Dict[str, int]] = {}
+        for trip_id, trip in trips.items():
+            for position, station_id in enumerate(trip["stops"]):
+                self.by_stop.setdefault(station_id, {})[trip_id] = position
+    
+    def plan(self, from_station: str, to_station: str, after: float, limit: int) -> List[Tuple[str, int, int]]:
+        """
+        Find trips that call at from_station and later at to_station
+        
+        Args:
+            from_station: Boarding station ID
+            to_station: Alighting station ID
+            after: Only board at or after this epoch
+            limit: Maximum number of options
+        
+        Returns:
+            List of (trip_id, from_position, to_position), earliest boarding first
+        """
+        boarding = self.by_stop.get(from_station, {})
+        alighting = self.by_stop.get(to_station, {})
+        # Walk the shorter of the two per-stop lists
+        if len(alighting) < len(boarding):
+            pairs = ((trip_id, boarding.get(trip_id), to_pos) for trip_id, to_pos in alighting.items())
+        else:
+            pairs = ((trip_id, from_pos, alighting.get(trip_id)) for trip_id, from_pos in boarding.items())
+        
+        options = [
+            (trip_id, from_pos, to_pos)
+            for trip_id, from_pos, to_pos in pairs
+            if from_pos is not None and to_pos is not None and from_pos < to_pos
+            and self.trips[trip_id]["arrivals"][from_pos] >= after
+        ]
+        options.sort(key=lambda option: self.trips[option[0]]["arrivals"][option[1]])
+        return options[:limit]
+
+
+class TripIndex:
+    """
+    Caches each line's trip index in memory, keyed by the worker's version
+    
+    The line's version in the snapshot pointer is checked at most every
+    TRIP_INDEX_REFRESH_SECONDS; the full index is fetched and its per-stop
+    tables rebuilt only when the version moves.
+    """
+    
+    def __init__(self, redis_service: RedisService, config: Config = None):
+        self.config = config or Config()
+        self.redis_service = redis_service
+        self._lines: Dict[str, LineTrips] = {}
+        self._checked_at: Dict[str, float] = {}
+    
+    def get(self, line: str) -> Optional[LineTrips]:
+        """Get the current trip index for a line"""
+        now = time.monotonic()
+        cached = self._lines.get(line)
+        if cached and now - self._checked_at.get(line, 0.0) < self.config.TRIP_INDEX_REFRESH_SECONDS:
+            return cached
+        self._checked_at[line] = now
+        
+        version = self.redis_service.get_trip_index_version(line)
+        if not version:
+            return cached
+        if cached and cached.version == version:
+            return cached
+        
+        index = self.redis_service.get_trip_index(line, version)
+        if not index:
+            return cached
+        self._lines[line] = LineTrips(index["version"], index["trips"])
+        return self._lines[line]
@@ -0,0 +1,96 @@
+"""
+In-process view of the worker heartbeat for /health/feeds
+"""
+import time
+import logging
+from typing import Dict, Optional
+
+from ..config import Config
+from .redis_service import RedisService
+
+logger = logging.getLogger(__name__)
+
+
+class WorkerHealth:
+    """
+    Judges worker and feed freshness from the worker's heartbeat
+    
+    The heartbeat is one key, re-read at most every HEARTBEAT_CACHE_SECONDS,
+    so orchestrator probes against every API process cost one Redis GET
+    per process and interval. Ages are computed per call from the cached
+    document.
+    
+    A missing heartbeat or one older than WORKER_STALE_SECONDS means the
+    worker has stalled. A feed is failing after a failed attempt and stale
+    when its last success or its header timestamp is older than
+    LINE_STATUS_STALE_SECONDS.
+    """
+    
+    def __init__(self, redis_service: RedisService, config: Config = None):
+        self.config = config or Config()
+        self.redis_service = redis_service
+        self._heartbeat: Optional[Dict] = None
+        self._checked_at: float = 0.0
+    
+    def heartbeat(self) -> Optional[Dict]:
+        """The latest heartbeat, from the in-process copy when fresh enough"""
+        now = time.monotonic()
+        if self._checked_at and now - self._checked_at < self.config.HEARTBEAT_CACHE_SECONDS:
+            return self._heartbeat
+        self._checked_at = now
+        self._heartbeat = self.redis_service.get_heartbeat()
+        return self._heartbeat
+    
+    def _feed_status(self, stats: Dict, now: float) -> str:
+        if stats.get("failures"):
+            return "failing"
+        stale_before = now - self.config.LINE_STATUS_STALE_SECONDS
+        if (stats.get("last_success") or 0) < stale_before or (stats.get("header_timestamp") or 0) < stale_before:
+            return "stale"
+        return "ok"
+    
+    def report(self, now: Optional[float] = None) -> Dict:
+        """
+        Worker and per-feed health
+        
+        Returns:
+            Dictionary shaped like WorkerHealthResponse (without timestamp)
+        """
+        now = now or time.time()
+        heartbeat = self.heartbeat()
+        if not heartbeat:
+            return {"status": "stalled"}
+        
+        feeds = []
+        for feed, stats in sorted(heartbeat.get("feeds", {}).items()):
+            header_timestamp = stats.get("header_timestamp")
+            feeds.append({
+                "feed": feed,
+                "status": self._feed_status(stats, now),
+                "last_success": stats.get("last_success"),
+                "last_attempt": stats.get("last_attempt"),
+                "header_timestamp": header_timestamp,
+                "data_age_seconds": round(now - header_timestamp, 1) if header_timestamp else None,
+                "entities": stats.get("entities"),
+                "failures": stats.get("failures", 0),
+                "error": stats.get("error")
+            })
+        
+        heartbeat_age = now - heartbeat["updated_at"]
+        if heartbeat_age > self.config.WORKER_STALE_SECONDS:
+            status = "stalled"
+        elif any(feed["status"] != "ok" for feed in feeds):
+            status = "degraded"
+        else:
+            status = "healthy"
+        
+        return {
+            "status": status,
+            "heartbeat_age_seconds": round(heartbeat_age, 1),
+            "cycles": heartbeat.get("cycles"),
+            "cycle_seconds": heartbeat.get("cycle_seconds"),
+            "pipeline_seconds": heartbeat.get("pipeline_seconds"),
+            "poll_interval": heartbeat.get("poll_interval"),
+            "feeds": feeds,
+            "pipeline": heartbeat.get("pipeline", {})
+        }
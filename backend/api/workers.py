@@ -0,0 +1,14 @@
+"""
+Uvicorn worker class for gunicorn
+"""
+from uvicorn.workers import UvicornWorker
+
+
+class ProductionUvicornWorker(UvicornWorker):
+    """Uvicorn worker pinned to uvloop and httptools, with lifespan enabled"""
+    
+    CONFIG_KWARGS = {
+        "loop": "uvloop",
+        "http": "httptools",
+        "lifespan": "on",
+    }
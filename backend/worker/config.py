@@ -21,6 +21,17 @@ class WorkerConfig:
         "L": "https://api-endpoint.mta.info/Dataservice/mtagtfsfeeds/nyct%2Fgtfs-l",  # L line
     }
     
+    # Lines carried by each feed
+    FEED_LINES = {
+        "1234567S": ["1", "2", "3", "4", "5", "6", "7", "S"],
+        "ACE": ["A", "C", "E", "H"],
+        "BDFM": ["B", "D", "F", "M"],
+        "G": ["G"],
+        "JZ": ["J", "Z"],
+        "NQRW": ["N", "Q", "R", "W"],
+        "L": ["L"],
+    }
+    
     # Target lines - all 22 regular NYC subway lines (excluding shuttles)
     TARGET_LINES = ["1", "2", "3", "4", "5", "6", "7", "A", "B", "C", "D", "E", "F", "G", "J", "L", "M", "N", "Q", "R", "W", "Z"]
     
@@ -30,14 +41,86 @@ class WorkerConfig:
     REDIS_DB: int = int(os.getenv("REDIS_DB", "0"))
     REDIS_TIMEOUT: int = int(os.getenv("REDIS_TIMEOUT", "5"))
     REDIS_TTL_SECONDS: int = int(os.getenv("REDIS_TTL_SECONDS", "300"))  # 5 minutes
+    # Versions kept per line after a snapshot flip (readers pinned to the previous pointer can finish)
+    SNAPSHOT_KEEP_VERSIONS: int = int(os.getenv("SNAPSHOT_KEEP_VERSIONS", "2"))
+    # Topology: "standalone", "sentinel" or "cluster"
+    REDIS_MODE: str = os.getenv("REDIS_MODE", "standalone")
+    REDIS_SENTINELS: str = os.getenv("REDIS_SENTINELS", "")  # host:port,host:port
+    REDIS_SENTINEL_MASTER: str = os.getenv("REDIS_SENTINEL_MASTER", "mymaster")
+    REDIS_CLUSTER_NODES: str = os.getenv("REDIS_CLUSTER_NODES", "")  # seed nodes, host:port,...
     
-    # Kafka Configuration
+    # Storage backend: "redis", or "file" for single-node deployments without
+    # Redis (every cycle is published as one memory-mapped snapshot file)
+    STORAGE_BACKEND: str = os.getenv("STORAGE_BACKEND", "redis")
+    SNAPSHOT_FILE_PATH: str = os.getenv("SNAPSHOT_FILE_PATH", "/data/snapshot/eta.snap")
+    # History streams go to their own file so the snapshot file stays small
+    SNAPSHOT_HISTORY_FILE_PATH: str = os.getenv("SNAPSHOT_HISTORY_FILE_PATH", "/data/snapshot/history.snap")
+    # How often the history file is rewritten (seconds)
+    SNAPSHOT_HISTORY_WRITE_SECONDS: int = int(os.getenv("SNAPSHOT_HISTORY_WRITE_SECONDS", "60"))
+    
+    # Kafka Configuration (optional; the worker caches ETAs without it)
+    KAFKA_ENABLED: bool = os.getenv("KAFKA_ENABLED", "true").lower() == "true"
     KAFKA_BOOTSTRAP_SERVERS: str = os.getenv("KAFKA_BOOTSTRAP_SERVERS", "kafka:9092")
     KAFKA_TOPIC_ETA_PROCESSED: str = os.getenv("KAFKA_TOPIC_ETA_PROCESSED", "eta_processed")
+    # Log-compacted topic with the latest ETAs per line:station:direction
+    KAFKA_ETA_STATE_ENABLED: bool = os.getenv("KAFKA_ETA_STATE_ENABLED", "true").lower() == "true"
+    KAFKA_TOPIC_ETA_STATE: str = os.getenv("KAFKA_TOPIC_ETA_STATE", "eta_state")
+    KAFKA_ETA_STATE_PARTITIONS: int = int(os.getenv("KAFKA_ETA_STATE_PARTITIONS", "3"))
+    KAFKA_ETA_STATE_REPLICATION: int = int(os.getenv("KAFKA_ETA_STATE_REPLICATION", "1"))
+    
+    # GTFS static data (station catalog); drop a new zip here to reload it
+    GTFS_STATIC_PATH: str = os.getenv("GTFS_STATIC_PATH", "/data/gtfs/gtfs_subway.zip")
+    # Compiled static index (scripts/fetch_gtfs_stations.py); preferred over the zip when present
+    GTFS_STATIC_INDEX_PATH: str = os.getenv("GTFS_STATIC_INDEX_PATH", "/data/gtfs/gtfs_static.idx")
     
     # Worker Configuration
     POLL_INTERVAL: int = int(os.getenv("POLL_INTERVAL", "30"))  # seconds
     MAX_RETRIES: int = int(os.getenv("MAX_RETRIES", "3"))
     RETRY_DELAY: int = int(os.getenv("RETRY_DELAY", "5"))  # seconds
     REQUEST_TIMEOUT: int = int(os.getenv("REQUEST_TIMEOUT", "10"))  # seconds
-
+    
+    # Feed pipeline: fetch threads -> bounded queue -> parse/extract processes -> bounded queue -> cache writes
+    PIPELINE_FETCH_WORKERS: int = int(os.getenv("PIPELINE_FETCH_WORKERS", "4"))
+    PIPELINE_PARSE_WORKERS: int = int(os.getenv("PIPELINE_PARSE_WORKERS", str(min(4, os.cpu_count() or 1))))  # 0 = parse in-process
+    PIPELINE_QUEUE_SIZE: int = int(os.getenv("PIPELINE_QUEUE_SIZE", "4"))
+    
+    # Static schedule (needs the compiled static index): delay/status for
+    # realtime trips and scheduled ETAs while a feed is down
+    SCHEDULE_TIMEZONE: str = os.getenv("SCHEDULE_TIMEZONE", "America/New_York")
+    SCHEDULE_MATCH_WINDOW_SECONDS: int = int(os.getenv("SCHEDULE_MATCH_WINDOW_SECONDS", "3600"))
+    SCHEDULE_LATE_SECONDS: int = int(os.getenv("SCHEDULE_LATE_SECONDS", "300"))  # later than this is "delayed"
+    SCHEDULE_EARLY_SECONDS: int = int(os.getenv("SCHEDULE_EARLY_SECONDS", "60"))  # earlier than this is "early"
+    SCHEDULE_FALLBACK_ENABLED: bool = os.getenv("SCHEDULE_FALLBACK_ENABLED", "true").lower() == "true"
+    SCHEDULE_FALLBACK_AFTER_SECONDS: int = int(os.getenv("SCHEDULE_FALLBACK_AFTER_SECONDS", "90"))
+    SCHEDULE_FALLBACK_HORIZON_MINUTES: int = int(os.getenv("SCHEDULE_FALLBACK_HORIZON_MINUTES", "60"))
+    
+    # Live train positions from VehiclePosition entities (per-line packed snapshot)
+    POSITIONS_ENABLED: bool = os.getenv("POSITIONS_ENABLED", "true").lower() == "true"
+    
+    # Per-line filtered GTFS-RT payloads for downstream consumers (rebuilt
+    # only when a feed's header timestamp changes)
+    GTFS_EXPORT_ENABLED: bool = os.getenv("GTFS_EXPORT_ENABLED", "true").lower() == "true"
+    
+    # One compressed document with every line's ETAs per snapshot version
+    # (served by /eta/snapshot); zstd is added when zstandard is installed
+    SYSTEM_SNAPSHOT_ENABLED: bool = os.getenv("SYSTEM_SNAPSHOT_ENABLED", "true").lower() == "true"
+    SYSTEM_SNAPSHOT_GZIP_LEVEL: int = int(os.getenv("SYSTEM_SNAPSHOT_GZIP_LEVEL", "6"))
+    SYSTEM_SNAPSHOT_ZSTD_LEVEL: int = int(os.getenv("SYSTEM_SNAPSHOT_ZSTD_LEVEL", "10"))
+    
+    # Line status summaries
+    LINE_STATUS_KEY_STATIONS: int = int(os.getenv("LINE_STATUS_KEY_STATIONS", "3"))
+    LINE_STATUS_GAP_MINUTES: int = int(os.getenv("LINE_STATUS_GAP_MINUTES", "15"))  # headway that counts as a gap
+    
+    # Arrival history (Redis stream per line, bounded by count and age)
+    HISTORY_ENABLED: bool = os.getenv("HISTORY_ENABLED", "true").lower() == "true"
+    HISTORY_MAX_EVENTS_PER_LINE: int = int(os.getenv("HISTORY_MAX_EVENTS_PER_LINE", "200000"))
+    HISTORY_RETENTION_HOURS: int = int(os.getenv("HISTORY_RETENTION_HOURS", "48"))
+    # A prediction that vanishes more than this long before it was due is a cancellation
+    HISTORY_ARRIVAL_GRACE_SECONDS: int = int(os.getenv("HISTORY_ARRIVAL_GRACE_SECONDS", "60"))
+    
+    # Profiling (off unless PROFILE_CYCLES > 0 or the worker receives SIGUSR1)
+    PROFILE_CYCLES: int = int(os.getenv("PROFILE_CYCLES", "0"))
+    PROFILE_SIGNAL_CYCLES: int = int(os.getenv("PROFILE_SIGNAL_CYCLES", "3"))
+    PROFILE_MODE: str = os.getenv("PROFILE_MODE", "sample")  # "sample" (folded stacks) or "cprofile"
+    PROFILE_SAMPLE_INTERVAL_MS: int = int(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+    PROFILE_DIR: str = os.getenv("PROFILE_DIR", "/tmp/profiles")
@@ -6,10 +6,13 @@ import time
 import logging
 import signal
 import sys
-from typing import List
+from typing import Dict, List
 
 from config import WorkerConfig
-from services import MTAFetcher, GTFSParser, CacheService, KafkaService
+from services import (
+    MTAFetcher, CacheService, FileCacheService, KafkaService, StationCatalogLoader,
+    CycleProfiler, ArrivalTracker, ScheduleEngine, FeedPipeline
+)
 
 # Configure logging
 logging.basicConfig(
@@ -25,20 +28,210 @@ class WorkerService:
     def __init__(self):
         self.config = WorkerConfig()
         self.mta_fetcher = MTAFetcher(self.config)
-        self.gtfs_parser = GTFSParser(self.config)
-        self.cache_service = CacheService(self.config)
+        self.pipeline = FeedPipeline(self.mta_fetcher, self.config)
+        if self.config.STORAGE_BACKEND == "file":
+            self.cache_service = FileCacheService(self.config)
+        else:
+            self.cache_service = CacheService(self.config)
         self.kafka_service = KafkaService(self.config)
+        self.station_catalog = StationCatalogLoader(self.config)
+        self.profiler = CycleProfiler(self.config)
+        # Latest status summary per line; lines whose feed failed keep their last one
+        self.line_statuses = {}
+        self.arrival_tracker = ArrivalTracker(self.config)
+        self.schedule = None
+        # Epoch of each feed's last successful fetch + parse
+        self.feed_last_success = {}
+        # Per-feed outcome of the latest attempts, reported in the heartbeat
+        self.feed_stats = {}
+        self.started_at = time.time()
+        self.cycles = 0
         self.running = True
         
         # Setup signal handlers for graceful shutdown
         signal.signal(signal.SIGINT, self._signal_handler)
         signal.signal(signal.SIGTERM, self._signal_handler)
+        # `kill -USR1 <pid>` profiles the next PROFILE_SIGNAL_CYCLES cycles
+        signal.signal(signal.SIGUSR1, self.profiler.handle_signal)
     
     def _signal_handler(self, signum, frame):
         """Handle shutdown signals"""
         logger.info(f"Received signal {signum}, shutting down gracefully...")
         self.running = False
     
+    def refresh_station_catalog(self):
+        """Publish the station catalog when the static GTFS data is new or changed"""
+        catalog = self.station_catalog.load_if_changed()
+        if catalog:
+            self.cache_service.publish_stations(catalog)
+        
+        index = self.station_catalog.index
+        if index is not None and (self.schedule is None or self.schedule.index is not index):
+            self.schedule = ScheduleEngine(index, self.config)
+            self.pipeline.set_static_index(self.config.GTFS_STATIC_INDEX_PATH)
+            logger.info(f"Loaded static schedule ({len(index.sched_arrival)} scheduled arrivals)")
+    
+    def fill_from_schedule(self, feed_name: str, feed_lines: List[str]) -> List[str]:
+        """
+        Cache scheduled ETAs for a feed's lines while its realtime feed is down
+        
+        Only kicks in once the feed has failed for SCHEDULE_FALLBACK_AFTER_SECONDS,
+        so a single failed poll keeps the last realtime predictions.
+        
+        Returns:
+            Lines filled from the schedule
+        """
+        if self.schedule is None or not self.config.SCHEDULE_FALLBACK_ENABLED:
+            return []
+        now = time.time()
+        if now - self.feed_last_success.get(feed_name, 0) < self.config.SCHEDULE_FALLBACK_AFTER_SECONDS:
+            return []
+        
+        filled = []
+        for line in feed_lines:
+            etas_by_station = self.schedule.scheduled_etas(line, now)
+            # A failed write keeps the line on its previous version
+            if etas_by_station and self.cache_service.update_etas(line, etas_by_station):
+                line_version = self.cache_service.set_line_version(line)
+                self.kafka_service.publish_eta_state(line, etas_by_station, line_version)
+                filled.append(line)
+        
+        if filled:
+            logger.warning(f"Feed {feed_name} unavailable; serving scheduled ETAs for {', '.join(filled)}")
+        return filled
+    
+    def record_feed(self, result: Dict):
+        """Track a feed's fetch/parse outcome for the heartbeat"""
+        stats = self.feed_stats.setdefault(result["feed"], {
+            "last_success": None, "header_timestamp": None, "entities": None, "failures": 0, "error": None
+        })
+        stats["last_attempt"] = time.time()
+        if "error" in result:
+            stats["failures"] += 1
+            stats["error"] = result["error"]
+        else:
+            stats.update(
+                last_success=self.feed_last_success[result["feed"]],
+                header_timestamp=result["header_timestamp"],
+                entities=result["entities"],
+                failures=0,
+                error=None
+            )
+    
+    def heartbeat(self, cycle_started: float) -> Dict:
+        """
+        Compact worker heartbeat for the current cycle
+        
+        Returns:
+            Dictionary with updated_at, started_at, cycles, cycle_seconds,
+            pipeline_seconds, poll_interval, feeds ({feed: {last_success,
+            last_attempt, header_timestamp, entities, failures, error}}) and
+            pipeline (the FeedPipeline's per-stage metrics and queue depths)
+        """
+        now = time.time()
+        metrics = self.pipeline.metrics
+        return {
+            "updated_at": now,
+            "started_at": self.started_at,
+            "cycles": self.cycles,
+            "cycle_seconds": round(now - cycle_started, 3),
+            "pipeline_seconds": round(metrics.get("cycle_seconds", 0.0), 3),
+            "poll_interval": self.config.POLL_INTERVAL,
+            "feeds": self.feed_stats,
+            "pipeline": {
+                stage: {key: round(value, 3) for key, value in metrics[stage].items()}
+                for stage in ("fetch", "parse", "write", "queues")
+                if stage in metrics
+            }
+        }
+    
+    def run_cycle(self) -> List[str]:
+        """
+        Run one processing cycle over all feeds
+        
+        Returns:
+            Lines processed in this cycle
+        """
+        cycle_started = time.time()
+        self.cycles += 1
+        lines_processed_all_feeds = []
+        self.refresh_station_catalog()
+        self.cache_service.begin_snapshot()
+        
+        feeds = [
+            (feed_name, feed_url, [
+                line for line in self.config.TARGET_LINES
+                if line in self.config.FEED_LINES.get(feed_name, [])
+            ])
+            for feed_name, feed_url in self.config.MTA_FEEDS.items()
+        ]
+        
+        # Fetch and parse/extract run in the pipeline's threads and processes;
+        # this thread is the write stage and handles feeds as they complete
+        for result in self.pipeline.run(feeds, profile_mode=self.profiler.parse_mode):
+            feed_name = result["feed"]
+            self.profiler.label(feed=feed_name)
+            self.profiler.merge_parse(result.get("profile"))
+            
+            if "error" in result:
+                self.record_feed(result)
+                lines_processed_all_feeds.extend(self.fill_from_schedule(feed_name, result["lines"]))
+                continue
+            self.feed_last_success[feed_name] = time.time()
+            self.record_feed(result)
+            logger.debug(f"Parsed feed {feed_name}: {result['entities']} entities")
+            
+            # Write each target line from this feed
+            feed_lines = list(result["lines"])
+            for line, extracted in result["lines"].items():
+                self.profiler.label(feed=feed_name, line=line)
+                try:
+                    etas_by_station = extracted["etas"]
+                    self.line_statuses[line] = extracted["status"]
+                    if self.config.HISTORY_ENABLED:
+                        arrivals = self.arrival_tracker.observe(line, etas_by_station)
+                        self.cache_service.append_history(line, arrivals)
+                    
+                    if etas_by_station:
+                        # Update cache
+                        cached_count = self.cache_service.update_etas(line, etas_by_station)
+                        if cached_count:
+                            line_version = self.cache_service.set_line_version(line)
+                            self.cache_service.set_trip_index(line, extracted["trips"])
+                            self.kafka_service.publish_eta_state(line, etas_by_station, line_version)
+                            if extracted["positions"] is not None:
+                                self.cache_service.set_positions(line, extracted["positions"])
+                            logger.info(f"Line {line}: Cached ETAs for {cached_count} stations ({sum(len(v) for v in etas_by_station.values())} total trains)")
+                        else:
+                            # Keep the line on its previous version rather than
+                            # pointing it at one without ETA keys
+                            logger.warning(f"Line {line}: ETA write failed; keeping its previous version")
+                    # Per-trip keys, also clearing them when a line has no trips left
+                    self.cache_service.set_trips(line, extracted["trips"], extracted["positions"])
+                
+                except Exception as e:
+                    logger.error(f"Error processing line {line}: {e}", exc_info=True)
+            
+            # Filtered per-line GTFS-RT, present only when the header timestamp moved
+            if result.get("exports") and self.cache_service.set_feed_exports(result["header_timestamp"], result["exports"]):
+                self.pipeline.mark_exported(feed_name, result["header_timestamp"])
+            
+            lines_processed_all_feeds.extend(feed_lines)
+            
+            # Publish to Kafka
+            if feed_lines:
+                self.profiler.label(feed=feed_name, stage="kafka")
+                self.kafka_service.publish_eta_processed(feed_name, feed_lines)
+        
+        if self.line_statuses:
+            self.cache_service.set_line_statuses(self.line_statuses)
+        # Before the flip, so the file backend publishes it with this cycle
+        self.cache_service.set_heartbeat(self.heartbeat(cycle_started))
+        # Make this cycle's writes visible to readers in one step
+        self.cache_service.publish_snapshot()
+        
+        return lines_processed_all_feeds
+    
     def process_feeds(self):
         """Main processing loop: fetch feeds, process ETAs, update cache"""
         logger.info("Starting MTA feed processing worker")
@@ -47,69 +240,15 @@ class WorkerService:
         
         # Test connections
         if not self.cache_service.ping():
-            logger.error("Failed to connect to Redis. Check Redis service.")
+            logger.error(f"Cache storage unavailable (STORAGE_BACKEND={self.config.STORAGE_BACKEND}). Check Redis or the snapshot directory.")
             return
         
         logger.info("Worker initialized successfully")
         
         while self.running:
             try:
-                lines_processed_all_feeds = []
-                
-                # Process each feed
-                for feed_name, feed_url in self.config.MTA_FEEDS.items():
-                    logger.debug(f"Processing feed: {feed_name}")
-                    
-                    # Fetch feed
-                    feed_data_bytes = self.mta_fetcher.fetch_feed(feed_url)
-                    if not feed_data_bytes:
-                        continue
-                    
-                    # Parse feed
-                    try:
-                        feed = self.gtfs_parser.parse_feed(feed_data_bytes)
-                        logger.debug(f"Parsed feed {feed_name}: {len(feed.entity)} entities")
-                    except Exception as e:
-                        logger.error(f"Failed to parse GTFS feed {feed_name}: {e}", exc_info=True)
-                        continue
-                    
-                    # Process each target line from this feed
-                    # Map feed names to their respective lines
-                    feed_line_mapping = {
-                        "1234567S": ["1", "2", "3", "4", "5", "6", "7", "S"],
-                        "ACE": ["A", "C", "E", "H"],
-                        "BDFM": ["B", "D", "F", "M"],
-                        "G": ["G"],
-                        "JZ": ["J", "Z"],
-                        "NQRW": ["N", "Q", "R", "W"],
-                        "L": ["L"],
-                    }
-                    
-                    feed_lines = []
-                    if feed_name in feed_line_mapping:
-                        feed_lines = [
-                            line for line in self.config.TARGET_LINES 
-                            if line in feed_line_mapping[feed_name]
-                        ]
-                    
-                    for line in feed_lines:
-                        try:
-                            # Extract ETAs for this line
-                            etas_by_station = self.gtfs_parser.extract_etas(feed, line)
-                            
-                            if etas_by_station:
-                                # Update cache
-                                cached_count = self.cache_service.update_etas(line, etas_by_station)
-                                logger.info(f"Line {line}: Cached ETAs for {cached_count} stations ({sum(len(v) for v in etas_by_station.values())} total trains)")
-                        
-                        except Exception as e:
-                            logger.error(f"Error processing line {line}: {e}", exc_info=True)
-                    
-                    lines_processed_all_feeds.extend(feed_lines)
-                    
-                    # Publish to Kafka
-                    if feed_lines:
-                        self.kafka_service.publish_eta_processed(feed_name, feed_lines)
+                with self.profiler.cycle():
+                    lines_processed_all_feeds = self.run_cycle()
                 
                 if lines_processed_all_feeds:
                     logger.info(f"Completed processing cycle. Lines processed: {set(lines_processed_all_feeds)}")
@@ -130,6 +269,7 @@ class WorkerService:
     def shutdown(self):
         """Cleanup resources"""
         logger.info("Shutting down worker service...")
+        self.pipeline.close()
         self.cache_service.close()
         self.kafka_service.close()
         logger.info("Worker service shut down complete")
@@ -2,7 +2,21 @@
 from .mta_fetcher import MTAFetcher
 from .gtfs_parser import GTFSParser
 from .cache_service import CacheService
+from .snapshot_file import FileCacheService
 from .kafka_service import KafkaService
+from .station_catalog import StationCatalogLoader
+from .profiler import CycleProfiler
+from .line_status import LineStatusAggregator
+from .arrival_history import ArrivalTracker
+from .trip_index import TripIndexBuilder
+from .static_index import StaticIndex
+from .schedule import ScheduleEngine
+from .vehicle_positions import VehiclePositionExtractor
+from .pipeline import FeedPipeline
 
-__all__ = ["MTAFetcher", "GTFSParser", "CacheService", "KafkaService"]
+__all__ = [
+    "MTAFetcher", "GTFSParser", "CacheService", "FileCacheService", "KafkaService",
+    "StationCatalogLoader", "CycleProfiler", "LineStatusAggregator", "ArrivalTracker",
+    "TripIndexBuilder", "StaticIndex", "ScheduleEngine", "VehiclePositionExtractor", "FeedPipeline"
+]
 
@@ -0,0 +1,75 @@
+"""
+Service for turning successive predictions into observed arrival records
+"""
+import time
+import logging
+from datetime import datetime
+from typing import Dict, List, Tuple
+
+from ..config import WorkerConfig
+
+logger = logging.getLogger(__name__)
+
+
+class ArrivalTracker:
+    """
+    Infers observed arrivals from successive ETA predictions
+    
+    For every (trip, station, direction) the tracker remembers when it was
+    first predicted, the first predicted time and the latest predicted time.
+    When the pair drops out of the feed after it was due, the train has
+    arrived: the latest prediction is taken as the observed arrival and the
+    first prediction gives the prediction error at the longest lead time.
+    Pairs that vanish well before they were due (cancelled or rerouted
+    trips) are discarded.
+    """
+    
+    def __init__(self, config: WorkerConfig = None):
+        self.config = config or WorkerConfig()
+        # line -> (trip_id, station_id, direction) -> [first_seen, first_predicted, last_predicted]
+        self._pending: Dict[str, Dict[Tuple[str, str, str], List[float]]] = {}
+    
+    def observe(self, line: str, etas_by_station: Dict[str, List[Dict]]) -> List[Dict]:
+        """
+        Update tracked predictions for a line and return completed arrivals
+        
+        Args:
+            line: Subway line identifier
+            etas_by_station: Output of GTFSParser.extract_etas for the line
+        
+        Returns:
+            List of arrival records (station, direction, trip, arrival epoch,
+            first predicted epoch, lead seconds)
+        """
+        now = time.time()
+        pending = self._pending.setdefault(line, {})
+        current = set()
+        
+        for key, eta_list in etas_by_station.items():
+            station_id, direction = key.split(":")
+            for train in eta_list:
+                predicted = datetime.fromisoformat(train["arrival_time"]).timestamp()
+                pair = (train["train_id"], station_id, direction)
+                current.add(pair)
+                tracked = pending.get(pair)
+                if tracked is None:
+                    pending[pair] = [now, predicted, predicted]
+                else:
+                    tracked[2] = predicted
+        
+        arrivals = []
+        for pair in [pair for pair in pending if pair not in current]:
+            first_seen, first_predicted, last_predicted = pending.pop(pair)
+            if last_predicted > now + self.config.HISTORY_ARRIVAL_GRACE_SECONDS:
+                continue
+            trip_id, station_id, direction = pair
+            arrivals.append({
+                "station_id": station_id,
+                "direction": direction,
+                "trip_id": trip_id,
+                "arrival": round(last_predicted),
+                "predicted": round(first_predicted),
+                "lead": round(last_predicted - first_seen)
+            })
+        
+        return arrivals
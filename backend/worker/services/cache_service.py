@@ -2,12 +2,21 @@
 Service for updating Redis cache with processed ETA data
 """
 import json
+import time
+import hashlib
 import logging
 import redis
 from datetime import datetime
 from typing import Dict, List, Optional
 
 from ..config import WorkerConfig
+from .redis_keys import (
+    SNAPSHOT_KEY, LINE_STATUS_KEY, STATIONS_VERSION_KEY, HEARTBEAT_KEY,
+    eta_key, station_ids_key, trips_key, trip_key, positions_key, history_key, stations_key,
+    gtfsrt_key, gtfsrt_timestamp_key, system_snapshot_key
+)
+from .redis_topology import connect
+from .system_snapshot import SystemSnapshotBuilder
 
 logger = logging.getLogger(__name__)
 
@@ -18,20 +27,37 @@ class CacheService:
     def __init__(self, config: WorkerConfig = None):
         self.config = config or WorkerConfig()
         self._client: Optional[redis.Redis] = None
+        self._binary_client: Optional[redis.Redis] = None
+        # Open snapshot version, staged pointer entries (line -> version info)
+        # and the keys written per line and version, for garbage collection
+        self._version: Optional[str] = None
+        self._lines: Dict[str, Dict] = {}
+        self._version_keys: Dict[str, Dict[str, List[str]]] = {}
+        self._pointer_loaded = False
+        # Trip IDs with a per-trip key, per line, to delete departed trips
+        self._line_trips: Dict[str, set] = {}
+        # Latest ETAs of every line for the system-wide snapshot, and the
+        # versions written for it
+        self.system_snapshot = SystemSnapshotBuilder(self.config) if self.config.SYSTEM_SNAPSHOT_ENABLED else None
+        self._system_versions: List[str] = []
+        # Cluster pipelines cannot use MULTI; keys that must change together
+        # share a hash tag, so a plain pipeline still lands on one node
+        self._transactions = self.config.REDIS_MODE != "cluster"
     
     @property
     def client(self) -> redis.Redis:
-        """Lazy initialization of Redis client"""
+        """Lazy initialization of Redis client (primary for the configured topology)"""
         if self._client is None:
-            self._client = redis.Redis(
-                host=self.config.REDIS_HOST,
-                port=self.config.REDIS_PORT,
-                db=self.config.REDIS_DB,
-                decode_responses=True,
-                socket_connect_timeout=self.config.REDIS_TIMEOUT
-            )
+            self._client = connect(self.config)
         return self._client
     
+    @property
+    def binary_client(self) -> redis.Redis:
+        """Client without response decoding, for binary values"""
+        if self._binary_client is None:
+            self._binary_client = connect(self.config, decode_responses=False)
+        return self._binary_client
+    
     def ping(self) -> bool:
         """Check Redis connection"""
         try:
@@ -40,6 +66,19 @@ class CacheService:
             logger.error(f"Redis ping failed: {e}")
             return False
     
+    def begin_snapshot(self, version: Optional[str] = None) -> str:
+        """
+        Open a new snapshot version for this cycle's writes
+        
+        update_etas and set_trip_index write under this version; nothing is
+        visible to readers until publish_snapshot flips the pointer.
+        
+        Returns:
+            The snapshot version (epoch milliseconds)
+        """
+        self._version = version or str(int(time.time() * 1000))
+        return self._version
+    
     def update_etas(
         self,
         line: str,
@@ -47,7 +86,7 @@ class CacheService:
         station_names: Optional[Dict[str, str]] = None
     ) -> int:
         """
-        Update Redis cache with processed ETAs
+        Write a line's ETAs under the open snapshot version
         
         Args:
             line: Subway line identifier
@@ -57,16 +96,20 @@ class CacheService:
         Returns:
             Number of stations successfully cached
         """
-        cached_count = 0
         station_names = station_names or {}
+        version = self._version or self.begin_snapshot()
+        keys = []
+        cached_etas = {}
+        pipe = self.client.pipeline(transaction=False)
         
         for key, eta_list in etas_by_station.items():
             station_id, direction = key.split(":")
             
             # Sort by ETA and take top 3
             sorted_etas = sorted(eta_list, key=lambda x: x["eta_minutes"])[:3]
+            cached_etas[key] = sorted_etas
             
-            cache_key = f"eta:{line}:{station_id}:{direction}"
+            cache_key = eta_key(line, version, station_id, direction)
             cache_value = {
                 "line": line,
                 "station_id": station_id,
@@ -75,23 +118,387 @@ class CacheService:
                 "station_name": station_names.get(station_id),
                 "last_updated": datetime.utcnow().isoformat()
             }
-            
-            try:
-                self.client.setex(
-                    cache_key,
-                    self.config.REDIS_TTL_SECONDS,
-                    json.dumps(cache_value)
+            pipe.setex(cache_key, self.config.REDIS_TTL_SECONDS, json.dumps(cache_value))
+            keys.append(cache_key)
+        
+        # Stations this version has keys for; the API rejects unknown
+        # station IDs against it without a Redis lookup
+        station_ids = sorted({key.split(":")[0] for key in etas_by_station})
+        ids_key = station_ids_key(line, version)
+        pipe.setex(ids_key, self.config.REDIS_TTL_SECONDS, json.dumps(station_ids))
+        
+        try:
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to cache ETAs for line {line}: {e}")
+            return 0
+        
+        self._version_keys.setdefault(line, {}).setdefault(version, []).extend(keys + [ids_key])
+        if self.system_snapshot:
+            self.system_snapshot.set_line(line, cached_etas, station_names)
+        logger.debug(f"Cached {len(keys)} ETA keys for line {line} at version {version}")
+        return len(keys)
+    
+    def set_line_version(self, line: str, updated_at: Optional[float] = None) -> Dict:
+        """
+        Point a line at the open snapshot version once its data is written
+        
+        Takes effect with the next publish_snapshot. The API derives ETags
+        from the line's version and uses next_update_at to tell clients how
+        long a response stays fresh.
+        
+        Args:
+            line: Subway line identifier
+            updated_at: Epoch seconds of the update (defaults to now)
+        
+        Returns:
+            The line's entry: version, updated_at and next_update_at
+        """
+        updated_at = updated_at or time.time()
+        self._lines[line] = {
+            "version": self._version or self.begin_snapshot(),
+            "updated_at": updated_at,
+            "next_update_at": updated_at + self.config.POLL_INTERVAL
+        }
+        return self._lines[line]
+    
+    def set_trip_index(self, line: str, trips: Dict[str, Dict]) -> bool:
+        """
+        Write the line's active-trip index under the open snapshot version
+        
+        API processes compare the line's snapshot version with the one they
+        hold and only fetch the index when it moved.
+        
+        Args:
+            line: Subway line identifier
+            trips: Output of TripIndexBuilder.build
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        version = self._version or self.begin_snapshot()
+        cache_key = trips_key(line, version)
+        cache_value = {"line": line, "version": version, "trips": trips}
+        
+        try:
+            self.client.setex(cache_key, self.config.REDIS_TTL_SECONDS, json.dumps(cache_value, separators=(",", ":")))
+        except Exception as e:
+            logger.error(f"Failed to cache trip index for line {line}: {e}")
+            return False
+        
+        self._version_keys.setdefault(line, {}).setdefault(version, []).append(cache_key)
+        return True
+    
+    def set_trips(self, line: str, trips: Dict[str, Dict], positions: Optional[Dict] = None) -> int:
+        """
+        Write one key per active trip and delete trips that left the feed
+        
+        Unlike the versioned keys these are overwritten in place, so
+        /trips/{trip_id} needs a single GET. Trips that disappear from the
+        line are deleted; keys also expire after REDIS_TTL_SECONDS in case
+        the worker stops (or restarts and forgets what it wrote).
+        
+        Args:
+            line: Subway line identifier
+            trips: Output of TripIndexBuilder.build
+            positions: Output of VehiclePositionExtractor.extract, if any
+        
+        Returns:
+            Number of trips written
+        """
+        placed = {}
+        if positions:
+            fields = positions["fields"]
+            placed = {row[0]: dict(zip(fields[1:], row[1:])) for row in positions["trains"]}
+        
+        updated_at = time.time()
+        departed = self._line_trips.get(line, set()) - trips.keys()
+        pipe = self.client.pipeline(transaction=False)
+        for trip_id, trip in trips.items():
+            cache_value = {
+                "trip_id": trip_id,
+                "line": line,
+                **trip,
+                "position": placed.get(trip_id),
+                "updated_at": updated_at
+            }
+            pipe.setex(trip_key(trip_id), self.config.REDIS_TTL_SECONDS, json.dumps(cache_value, separators=(",", ":")))
+        for trip_id in departed:
+            pipe.unlink(trip_key(trip_id))
+        
+        try:
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to cache trips for line {line}: {e}")
+            return 0
+        
+        self._line_trips[line] = set(trips)
+        return len(trips)
+    
+    def set_positions(self, line: str, positions: Dict) -> bool:
+        """
+        Write the line's packed train positions under the open snapshot version
+        
+        Args:
+            line: Subway line identifier
+            positions: Output of VehiclePositionExtractor.extract
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        version = self._version or self.begin_snapshot()
+        cache_key = positions_key(line, version)
+        cache_value = {"line": line, "version": version, "updated_at": time.time(), **positions}
+        
+        try:
+            self.client.setex(cache_key, self.config.REDIS_TTL_SECONDS, json.dumps(cache_value, separators=(",", ":")))
+        except Exception as e:
+            logger.error(f"Failed to cache positions for line {line}: {e}")
+            return False
+        
+        self._version_keys.setdefault(line, {}).setdefault(version, []).append(cache_key)
+        return True
+    
+    def set_feed_exports(self, header_timestamp: int, exports: Dict[str, bytes]) -> bool:
+        """
+        Write per-line filtered GTFS-RT payloads of one feed
+        
+        Payloads are unversioned and replaced whenever the feed's header
+        timestamp moves; they expire after REDIS_TTL_SECONDS if it stops
+        moving.
+        
+        Args:
+            header_timestamp: Source FeedHeader.timestamp
+            exports: Output of FeedExporter.export
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            pipe = self.binary_client.pipeline(transaction=False)
+            for line, payload in exports.items():
+                pipe.setex(gtfsrt_key(line), self.config.REDIS_TTL_SECONDS, payload)
+                pipe.setex(gtfsrt_timestamp_key(line), self.config.REDIS_TTL_SECONDS, header_timestamp)
+            pipe.execute()
+            return True
+        except Exception as e:
+            logger.error(f"Failed to cache GTFS-RT exports for {', '.join(exports)}: {e}")
+            return False
+    
+    def publish_snapshot(self) -> Optional[str]:
+        """
+        Atomically flip the snapshot pointer and collect old versions
+        
+        The pointer maps every line to its current version; lines not
+        updated this cycle keep their previous version until its keys
+        expire. After the flip, each line keeps its SNAPSHOT_KEEP_VERSIONS
+        newest versions (so readers pinned to the previous pointer can
+        finish) and older ones are deleted.
+        
+        Returns:
+            The published snapshot version, or None on failure
+        """
+        if self._version is None:
+            return None
+        if not self._pointer_loaded:
+            self._adopt_pointer()
+        
+        now = time.time()
+        self._lines = {
+            line: entry for line, entry in self._lines.items()
+            if now - entry["updated_at"] < self.config.REDIS_TTL_SECONDS
+        }
+        pointer = {"version": self._version, "updated_at": now, "lines": self._lines}
+        if self.system_snapshot:
+            self._write_system_snapshot(pointer)
+        
+        try:
+            self.client.setex(SNAPSHOT_KEY, self.config.REDIS_TTL_SECONDS, json.dumps(pointer))
+        except Exception as e:
+            logger.error(f"Failed to publish snapshot {self._version}: {e}")
+            return None
+        
+        version, self._version = self._version, None
+        self._collect_garbage()
+        return version
+    
+    def _write_system_snapshot(self, pointer: Dict):
+        """
+        Write the compressed system-wide snapshot for a pointer before it is published
+        
+        Keeps the newest SNAPSHOT_KEEP_VERSIONS snapshots, like the per-line
+        versions, so readers of the previous pointer can still fetch theirs.
+        """
+        # Older snapshots beyond the ones kept alongside the new version
+        keep_previous = max(0, self.config.SNAPSHOT_KEEP_VERSIONS - 1)
+        stale = self._system_versions[:max(0, len(self._system_versions) - keep_previous)]
+        try:
+            encoded = self.system_snapshot.encode(pointer)
+            pipe = self.binary_client.pipeline(transaction=self._transactions)
+            for coding, data in encoded.items():
+                pipe.setex(system_snapshot_key(pointer["version"], coding), self.config.REDIS_TTL_SECONDS, data)
+            for version in stale:
+                for coding in self.system_snapshot.codings:
+                    pipe.unlink(system_snapshot_key(version, coding))
+            pipe.execute()
+        except Exception as e:
+            logger.error(f"Failed to write system snapshot {pointer['version']}: {e}")
+            return
+        
+        self._system_versions = self._system_versions[len(stale):] + [pointer["version"]]
+    
+    def _adopt_pointer(self):
+        """Carry over line versions from a pointer published before a restart"""
+        self._pointer_loaded = True
+        try:
+            cached = self.client.get(SNAPSHOT_KEY)
+        except Exception as e:
+            logger.error(f"Failed to read snapshot pointer: {e}")
+            return
+        if cached:
+            for line, entry in json.loads(cached).get("lines", {}).items():
+                self._lines.setdefault(line, entry)
+    
+    def _collect_garbage(self):
+        """Delete versions beyond the newest SNAPSHOT_KEEP_VERSIONS per line"""
+        stale_keys = []
+        for line, versions in self._version_keys.items():
+            current = self._lines.get(line, {}).get("version")
+            for version in sorted(versions, key=int)[:-self.config.SNAPSHOT_KEEP_VERSIONS]:
+                if version != current:
+                    stale_keys.extend(versions.pop(version))
+        
+        if not stale_keys:
+            return
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for key in stale_keys:
+                pipe.unlink(key)
+            pipe.execute()
+            logger.debug(f"Collected {len(stale_keys)} keys from old snapshot versions")
+        except Exception as e:
+            logger.error(f"Failed to collect old snapshot versions: {e}")
+    
+    def append_history(self, line: str, arrivals: List[Dict]) -> int:
+        """
+        Append observed arrivals to the line's history stream
+        
+        The stream `history:{line}` is capped at HISTORY_MAX_EVENTS_PER_LINE
+        entries and entries older than HISTORY_RETENTION_HOURS are trimmed,
+        so Redis memory stays bounded.
+        
+        Args:
+            line: Subway line identifier
+            arrivals: Records from ArrivalTracker.observe
+        
+        Returns:
+            Number of records appended
+        """
+        if not arrivals:
+            return 0
+        
+        stream_key = history_key(line)
+        min_id = int((time.time() - self.config.HISTORY_RETENTION_HOURS * 3600) * 1000)
+        try:
+            pipe = self.client.pipeline(transaction=False)
+            for arrival in arrivals:
+                pipe.xadd(
+                    stream_key,
+                    {
+                        "s": arrival["station_id"],
+                        "d": arrival["direction"],
+                        "t": arrival["trip_id"],
+                        "a": arrival["arrival"],
+                        "p": arrival["predicted"],
+                        "l": arrival["lead"]
+                    },
+                    maxlen=self.config.HISTORY_MAX_EVENTS_PER_LINE,
+                    approximate=True
                 )
-                cached_count += 1
-                logger.debug(f"Cached ETA: {cache_key} ({len(sorted_etas)} trains)")
-            except Exception as e:
-                logger.error(f"Failed to cache ETA for {cache_key}: {e}")
+            pipe.xtrim(stream_key, minid=min_id, approximate=True)
+            pipe.execute()
+            return len(arrivals)
+        except Exception as e:
+            logger.error(f"Failed to append history for line {line}: {e}")
+            return 0
+    
+    def set_line_statuses(self, line_statuses: Dict[str, Dict]) -> bool:
+        """
+        Write all per-line status summaries to one system-wide key
+        
+        Args:
+            line_statuses: Dictionary mapping line to its status summary
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        cache_value = {
+            "lines": line_statuses,
+            "updated_at": datetime.utcnow().isoformat()
+        }
+        
+        try:
+            self.client.setex(LINE_STATUS_KEY, self.config.REDIS_TTL_SECONDS, json.dumps(cache_value))
+            return True
+        except Exception as e:
+            logger.error(f"Failed to cache line status: {e}")
+            return False
+    
+    def set_heartbeat(self, heartbeat: Dict) -> bool:
+        """
+        Write the worker heartbeat (overwritten every cycle, no TTL)
         
-        return cached_count
+        Args:
+            heartbeat: Built by WorkerService.heartbeat
+        
+        Returns:
+            True if successful, False otherwise
+        """
+        try:
+            self.client.set(HEARTBEAT_KEY, json.dumps(heartbeat, separators=(",", ":")))
+            return True
+        except Exception as e:
+            logger.error(f"Failed to write worker heartbeat: {e}")
+            return False
+    
+    def publish_stations(self, catalog: Dict[str, List[Dict]]) -> Optional[str]:
+        """
+        Publish the static station catalog
+        
+        Writes one `stations:{line}` key per line (no TTL, the data is static)
+        and then bumps `stations:version` so API processes reload their copy.
+        
+        Args:
+            catalog: Dictionary mapping line to ordered station dictionaries
+        
+        Returns:
+            The new catalog version, or None on failure
+        """
+        payloads = {
+            stations_key(line): json.dumps({"line": line, "stations": stations})
+            for line, stations in catalog.items()
+        }
+        version = hashlib.sha1(
+            "".join(payloads[key] for key in sorted(payloads)).encode("utf-8")
+        ).hexdigest()[:16]
+        
+        try:
+            pipe = self.client.pipeline(transaction=self._transactions)
+            pipe.mset(payloads)
+            pipe.set(STATIONS_VERSION_KEY, version)
+            pipe.execute()
+            logger.info(f"Published station catalog version {version} ({len(payloads)} lines)")
+            return version
+        except Exception as e:
+            logger.error(f"Failed to publish station catalog: {e}")
+            return None
     
     def close(self):
-        """Close Redis connection"""
+        """Close Redis connections"""
         if self._client:
             self._client.close()
             self._client = None
+        if self._binary_client:
+            self._binary_client.close()
+            self._binary_client = None
 
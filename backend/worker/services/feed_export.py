@@ -0,0 +1,65 @@
+"""
+Service for re-exporting GTFS-RT feeds filtered to single lines
+"""
+import logging
+from typing import Dict, List
+
+from google.transit import gtfs_realtime_pb2
+
+from ..config import WorkerConfig
+
+logger = logging.getLogger(__name__)
+
+
+class FeedExporter:
+    """
+    Splits a parsed feed into one GTFS-RT FeedMessage per line
+    
+    Each payload keeps the source header and the trip updates, vehicle
+    positions and alerts that concern the line (by trip route_id, or an
+    alert's informed_entity route_id), with all extensions (e.g. NYCT trip
+    descriptors) intact. Consumers parse it exactly like an MTA feed.
+    
+    Entity IDs are prefixed with the line ("A:000012"): source IDs are only
+    unique within one feed, and the API serves several lines' payloads
+    concatenated into one message.
+    """
+    
+    def __init__(self, config: WorkerConfig = None):
+        self.config = config or WorkerConfig()
+    
+    @staticmethod
+    def _routes(entity) -> List[str]:
+        if entity.HasField('trip_update'):
+            return [entity.trip_update.trip.route_id]
+        if entity.HasField('vehicle'):
+            return [entity.vehicle.trip.route_id]
+        if entity.HasField('alert'):
+            return [informed.route_id for informed in entity.alert.informed_entity]
+        return []
+    
+    def export(self, feed, lines: List[str]) -> Dict[str, bytes]:
+        """
+        Build the filtered payload of each line
+        
+        Args:
+            feed: Parsed FeedMessage object
+            lines: Lines to export
+        
+        Returns:
+            Dictionary mapping line to serialized FeedMessage bytes
+        """
+        messages = {}
+        for line in lines:
+            message = gtfs_realtime_pb2.FeedMessage()
+            message.header.CopyFrom(feed.header)
+            messages[line] = message
+        
+        for entity in feed.entity:
+            for line in set(self._routes(entity)):
+                if line in messages:
+                    exported = messages[line].entity.add()
+                    exported.CopyFrom(entity)
+                    exported.id = f"{line}:{entity.id}"
+        
+        return {line: message.SerializeToString() for line, message in messages.items()}
@@ -17,6 +17,8 @@ class GTFSParser:
     
     def __init__(self, config: WorkerConfig = None):
         self.config = config or WorkerConfig()
+        # ScheduleEngine, set by the worker once the static index is loaded
+        self.schedule = None
     
     def parse_feed(self, feed_data: bytes):
         """
@@ -32,6 +34,21 @@ class GTFSParser:
         feed.ParseFromString(feed_data)
         return feed
     
+    @staticmethod
+    def split_stop_id(stop_id: str, default_direction: str = "N"):
+        """
+        Split an MTA platform stop ID into station ID and direction
+        
+        MTA feeds report platforms as the parent station ID plus an N/S
+        suffix (e.g. "101N"). The API and station catalog use the parent ID.
+        
+        Returns:
+            Tuple of (station_id, direction)
+        """
+        if len(stop_id) > 1 and stop_id[-1] in ("N", "S"):
+            return stop_id[:-1], stop_id[-1]
+        return stop_id, default_direction
+    
     def extract_etas(self, feed, line: Optional[str] = None) -> Dict[str, List[Dict]]:
         """
         Extract ETA information from parsed feed for specific line(s)
@@ -63,13 +80,13 @@ class GTFSParser:
                 continue
             
             # Determine direction
-            direction = "N"  # Default
+            trip_direction = "N"  # Default
             if trip.HasField('direction_id'):
-                direction = "S" if trip.direction_id == 1 else "N"
+                trip_direction = "S" if trip.direction_id == 1 else "N"
             
             # Process stop time updates
             for stop_time_update in trip_update.stop_time_update:
-                station_id = stop_time_update.stop_id
+                station_id, direction = self.split_stop_id(stop_time_update.stop_id, trip_direction)
                 
                 # Get arrival time
                 arrival_time = None
@@ -81,6 +98,16 @@ class GTFSParser:
                 if arrival_time and arrival_time > now:
                     eta_minutes = int((arrival_time - now).total_seconds() / 60)
                     
+                    # Delay against the static schedule, when it is loaded
+                    status, delay_seconds = "on_time", None
+                    if self.schedule is not None:
+                        scheduled = self.schedule.scheduled_arrival(
+                            trip.trip_id, stop_time_update.stop_id, stop_time_update.arrival.time
+                        )
+                        if scheduled is not None:
+                            delay_seconds = round(stop_time_update.arrival.time - scheduled)
+                        status = self.schedule.status(delay_seconds)
+                    
                     key = f"{station_id}:{direction}"
                     if key not in etas_by_station:
                         etas_by_station[key] = []
@@ -90,7 +117,8 @@ class GTFSParser:
                         "eta_minutes": eta_minutes,
                         "train_id": trip.trip_id,
                         "route_id": route_id,
-                        "status": "on_time"
+                        "status": status,
+                        "delay_seconds": delay_seconds
                     })
         
         return etas_by_station
@@ -3,10 +3,11 @@ Service for Kafka messaging
 """
 import json
 import logging
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, List, Set
 from datetime import datetime
 from kafka import KafkaProducer
-from kafka.errors import KafkaError
+from kafka.admin import KafkaAdminClient, NewTopic
+from kafka.errors import KafkaError, TopicAlreadyExistsError
 
 from ..config import WorkerConfig
 
@@ -14,24 +15,34 @@ logger = logging.getLogger(__name__)
 
 
 class KafkaService:
-    """Service for publishing messages to Kafka"""
+    """
+    Service for publishing messages to Kafka
+    
+    Besides the per-feed processed events, every line's ETAs go to the
+    log-compacted KAFKA_TOPIC_ETA_STATE topic as one record per
+    "line:station:direction" key, so replaying the topic yields the latest
+    ETAs for every station. Stations that drop out of a line's data get a
+    tombstone (null value) so compaction removes them.
+    """
     
     def __init__(self, config: WorkerConfig = None):
         self.config = config or WorkerConfig()
         self._producer: Optional[KafkaProducer] = None
+        self._state_topic_ready = False
+        # Keys last published per line, to tombstone the ones that disappear
+        self._state_keys: Dict[str, Set[str]] = {}
     
     @property
     def producer(self) -> Optional[KafkaProducer]:
-        """Lazy initialization of Kafka producer"""
-        if self._producer is None:
+        """Lazy initialization of Kafka producer (None when Kafka is disabled or unreachable)"""
+        if self._producer is None and self.config.KAFKA_ENABLED:
             try:
                 self._producer = KafkaProducer(
                     bootstrap_servers=self.config.KAFKA_BOOTSTRAP_SERVERS,
-                    value_serializer=lambda v: json.dumps(v).encode('utf-8'),
+                    value_serializer=lambda v: json.dumps(v).encode('utf-8') if v is not None else None,
                     key_serializer=lambda k: k.encode('utf-8') if k else None,
                     retries=3,
-                    max_in_flight_requests_per_connection=1,
-                    enable_idempotence=True
+                    max_in_flight_requests_per_connection=1
                 )
                 logger.info(f"Connected to Kafka at {self.config.KAFKA_BOOTSTRAP_SERVERS}")
             except Exception as e:
@@ -72,6 +83,97 @@ class KafkaService:
             logger.error(f"Failed to publish to Kafka: {e}")
             return False
     
+    def ensure_state_topic(self) -> bool:
+        """
+        Create the compacted ETA state topic if it does not exist
+        
+        Broker auto-creation would make a topic with the default delete
+        policy, so the worker creates it explicitly before publishing.
+        """
+        if self._state_topic_ready:
+            return True
+        try:
+            admin = KafkaAdminClient(bootstrap_servers=self.config.KAFKA_BOOTSTRAP_SERVERS)
+            try:
+                admin.create_topics([NewTopic(
+                    name=self.config.KAFKA_TOPIC_ETA_STATE,
+                    num_partitions=self.config.KAFKA_ETA_STATE_PARTITIONS,
+                    replication_factor=self.config.KAFKA_ETA_STATE_REPLICATION,
+                    topic_configs={
+                        "cleanup.policy": "compact",
+                        "min.cleanable.dirty.ratio": "0.1",
+                        "segment.ms": "600000"
+                    }
+                )])
+                logger.info(f"Created compacted topic {self.config.KAFKA_TOPIC_ETA_STATE}")
+            except TopicAlreadyExistsError:
+                pass
+            finally:
+                admin.close()
+        except Exception as e:
+            logger.error(f"Failed to create topic {self.config.KAFKA_TOPIC_ETA_STATE}: {e}")
+            return False
+        self._state_topic_ready = True
+        return True
+    
+    def publish_eta_state(
+        self,
+        line: str,
+        etas_by_station: Dict[str, List[Dict]],
+        line_version: Dict,
+        station_names: Optional[Dict[str, str]] = None
+    ) -> int:
+        """
+        Publish a line's ETAs to the compacted state topic
+        
+        Records are batched and sent by the producer's I/O thread; the
+        next publish_eta_processed flush waits for them. Each carries the
+        number of records in the line's cycle (`cycle_records`), so
+        consumers can tell when the cycle is complete.
+        
+        Args:
+            line: Subway line identifier
+            etas_by_station: Dictionary mapping "{station_id}:{direction}" to list of train ETAs
+            line_version: The line's entry from CacheService.set_line_version
+            station_names: Optional dictionary mapping station_id to station name
+        
+        Returns:
+            Number of records sent (tombstones included)
+        """
+        if not self.config.KAFKA_ETA_STATE_ENABLED or not self.producer or not self.ensure_state_topic():
+            return 0
+        
+        station_names = station_names or {}
+        keys = set()
+        try:
+            for key, eta_list in etas_by_station.items():
+                station_id, direction = key.split(":")
+                record_key = f"{line}:{key}"
+                self.producer.send(
+                    self.config.KAFKA_TOPIC_ETA_STATE,
+                    key=record_key,
+                    value={
+                        "line": line,
+                        "station_id": station_id,
+                        "direction": direction,
+                        "trains": sorted(eta_list, key=lambda x: x["eta_minutes"])[:3],
+                        "station_name": station_names.get(station_id),
+                        "cycle_records": len(etas_by_station),
+                        **line_version
+                    }
+                )
+                keys.add(record_key)
+            
+            stale = self._state_keys.get(line, set()) - keys
+            for record_key in stale:
+                self.producer.send(self.config.KAFKA_TOPIC_ETA_STATE, key=record_key, value=None)
+        except KafkaError as e:
+            logger.error(f"Failed to publish ETA state for line {line}: {e}")
+            return 0
+        
+        self._state_keys[line] = keys
+        return len(keys) + len(stale)
+    
     def close(self):
         """Close Kafka producer"""
         if self._producer:
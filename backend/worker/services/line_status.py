@@ -0,0 +1,88 @@
+"""
+Service for computing per-line service status summaries
+"""
+import logging
+import statistics
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from ..config import WorkerConfig
+
+logger = logging.getLogger(__name__)
+
+
+class LineStatusAggregator:
+    """Summarizes a line's service from the ETAs extracted in the same cycle"""
+    
+    def __init__(self, config: WorkerConfig = None):
+        self.config = config or WorkerConfig()
+    
+    def summarize(
+        self,
+        line: str,
+        etas_by_station: Dict[str, List[Dict]],
+        feed_timestamp: Optional[int] = None
+    ) -> Dict:
+        """
+        Build a compact status summary for a line
+        
+        Args:
+            line: Subway line identifier
+            etas_by_station: Output of GTFSParser.extract_etas for the line
+            feed_timestamp: FeedHeader.timestamp of the source feed
+        
+        Returns:
+            Dictionary with per-direction active trains and headways at the
+            line's key stations, plus feed freshness and an overall status
+        """
+        trains: Dict[str, set] = {"N": set(), "S": set()}
+        arrivals: Dict[str, Dict[str, List[datetime]]] = {"N": {}, "S": {}}
+        
+        for key, eta_list in etas_by_station.items():
+            station_id, direction = key.split(":")
+            if direction not in trains:
+                continue
+            for train in eta_list:
+                trains[direction].add(train["train_id"])
+            arrivals[direction][station_id] = sorted(
+                datetime.fromisoformat(train["arrival_time"]) for train in eta_list
+            )
+        
+        directions = []
+        for direction in ("N", "S"):
+            # Key stations: the ones with the most predicted arrivals (trunk stops)
+            key_stations = sorted(
+                (sid for sid, times in arrivals[direction].items() if len(times) > 1),
+                key=lambda sid: len(arrivals[direction][sid]),
+                reverse=True
+            )[:self.config.LINE_STATUS_KEY_STATIONS]
+            
+            headways = [
+                (later - earlier).total_seconds() / 60
+                for sid in key_stations
+                for earlier, later in zip(arrivals[direction][sid], arrivals[direction][sid][1:])
+            ]
+            directions.append({
+                "direction": direction,
+                "active_trains": len(trains[direction]),
+                "median_headway_minutes": round(statistics.median(headways), 1) if headways else None,
+                "max_headway_minutes": round(max(headways), 1) if headways else None,
+                "key_stations": key_stations
+            })
+        
+        return {
+            "line": line,
+            "status": self._status(directions),
+            "directions": directions,
+            "feed_timestamp": feed_timestamp or None,
+            "updated_at": datetime.utcnow().isoformat()
+        }
+    
+    def _status(self, directions: List[Dict]) -> str:
+        """Classify service from the per-direction summaries"""
+        if not any(d["active_trains"] for d in directions):
+            return "no_service"
+        max_gaps = [d["max_headway_minutes"] for d in directions if d["max_headway_minutes"] is not None]
+        if max_gaps and max(max_gaps) > self.config.LINE_STATUS_GAP_MINUTES:
+            return "gaps"
+        return "good_service"
@@ -0,0 +1,369 @@
+"""
+Staged feed pipeline: fetch -> parse/extract (process pool) -> cache writes
+"""
+import time
+import queue
+import logging
+import threading
+import multiprocessing
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from ..config import WorkerConfig
+from .mta_fetcher import MTAFetcher
+from .gtfs_parser import GTFSParser
+from .line_status import LineStatusAggregator
+from .trip_index import TripIndexBuilder
+from .static_index import StaticIndex
+from .schedule import ScheduleEngine
+from .vehicle_positions import VehiclePositionExtractor
+from .feed_export import FeedExporter
+from .profiler import profile_parse
+
+logger = logging.getLogger(__name__)
+
+# Per-process state of the parse stage, set up by _init_parse_stage
+_stage: Dict = {}
+
+# How often blocked stage threads check whether the cycle was abandoned
+_STOP_POLL_SECONDS = 0.2
+
+
+def _init_parse_stage(config: WorkerConfig, index_path: Optional[str]):
+    """Build the parser (with the static schedule, if any) in a parse process"""
+    parser = GTFSParser(config)
+    index = None
+    if index_path:
+        try:
+            index = StaticIndex.load(index_path)
+            parser.schedule = ScheduleEngine(index, config)
+        except (OSError, ValueError) as e:
+            logger.error(f"Parse stage running without static schedule: {e}")
+    _stage.update(
+        config=config,
+        parser=parser,
+        line_status=LineStatusAggregator(config),
+        trip_index=TripIndexBuilder(config),
+        positions=VehiclePositionExtractor(index, config) if config.POSITIONS_ENABLED else None,
+        export=FeedExporter(config) if config.GTFS_EXPORT_ENABLED else None
+    )
+
+
+def parse_and_extract(
+    feed_name: str,
+    feed_data: bytes,
+    lines: List[str],
+    exported_timestamp: Optional[int] = None,
+    profile_mode: Optional[str] = None
+) -> Dict:
+    """
+    Parse one feed and extract everything the write stage needs per line
+    
+    Runs in a parse process; everything returned is plain data so it pickles
+    cheaply back to the worker.
+    
+    Args:
+        exported_timestamp: Header timestamp of the feed's last written
+            per-line GTFS-RT export; the export is skipped while unchanged
+        profile_mode: CycleProfiler.parse_mode; profiles this job when set
+    
+    Returns:
+        Dictionary with feed, header_timestamp, entities, parse_seconds,
+        exports ({line: GTFS-RT bytes} or None),
+        lines: {line: {"etas", "status", "trips", "positions"}} and
+        profile (for CycleProfiler.merge_parse, None unless profiling)
+    """
+    interval = _stage["config"].PROFILE_SAMPLE_INTERVAL_MS / 1000
+    with profile_parse(profile_mode, f"feed={feed_name};stage=parse", interval) as profiled:
+        result = _parse_and_extract(feed_name, feed_data, lines, exported_timestamp)
+    result["profile"] = profiled["profile"]
+    return result
+
+
+def _parse_and_extract(
+    feed_name: str,
+    feed_data: bytes,
+    lines: List[str],
+    exported_timestamp: Optional[int]
+) -> Dict:
+    started = time.perf_counter()
+    parser = _stage["parser"]
+    feed = parser.parse_feed(feed_data)
+    header_timestamp = feed.header.timestamp
+    
+    extracted = {}
+    for line in lines:
+        try:
+            etas_by_station = parser.extract_etas(feed, line)
+            extracted[line] = {
+                "etas": etas_by_station,
+                "status": _stage["line_status"].summarize(line, etas_by_station, header_timestamp),
+                "trips": _stage["trip_index"].build(etas_by_station) if etas_by_station else {},
+                "positions": _stage["positions"].extract(feed, line) if _stage["positions"] else None
+            }
+        except Exception as e:
+            logger.error(f"Error extracting line {line} from {feed_name}: {e}", exc_info=True)
+    
+    exports = None
+    if _stage["export"] and header_timestamp != exported_timestamp:
+        try:
+            exports = _stage["export"].export(feed, lines)
+        except Exception as e:
+            logger.error(f"Error exporting GTFS-RT lines from {feed_name}: {e}", exc_info=True)
+    
+    return {
+        "feed": feed_name,
+        "header_timestamp": header_timestamp,
+        "exports": exports,
+        "entities": len(feed.entity),
+        "parse_seconds": time.perf_counter() - started,
+        "lines": extracted
+    }
+
+
+class FeedPipeline:
+    """
+    Runs one polling cycle as three overlapping stages
+    
+        fetch (PIPELINE_FETCH_WORKERS threads)
+          -> parse queue (PIPELINE_QUEUE_SIZE)
+          -> parse/extract (PIPELINE_PARSE_WORKERS processes)
+          -> write queue (PIPELINE_QUEUE_SIZE)
+          -> cache writes (the caller, iterating `run`)
+    
+    Both queues are bounded: a slow write stage stops the dispatcher from
+    handing out more parse jobs, which fills the parse queue and blocks the
+    fetchers. PIPELINE_PARSE_WORKERS=0 parses on the dispatcher thread
+    instead of a process pool.
+    
+    Every feed reaches the caller, as an error result if it could not be
+    fetched, submitted or parsed. A broken process pool is replaced before
+    the next submission. If the caller stops iterating early, the
+    dispatcher and fetch threads stop waiting on the queues.
+    
+    Per-stage item counts, busy and wait seconds and each queue's maximum
+    depth for the last cycle are kept in `metrics`.
+    """
+    
+    def __init__(self, fetcher: MTAFetcher, config: WorkerConfig = None):
+        self.fetcher = fetcher
+        self.config = config or WorkerConfig()
+        self.metrics: Dict = {}
+        self._fetch_pool = ThreadPoolExecutor(
+            max_workers=self.config.PIPELINE_FETCH_WORKERS,
+            thread_name_prefix="feed-fetch"
+        )
+        self._parse_pool: Optional[ProcessPoolExecutor] = None
+        self._index_path: Optional[str] = None
+        self._lock = threading.Lock()
+        # feed -> header timestamp of its last written GTFS-RT export
+        self._exported: Dict[str, int] = {}
+    
+    def set_static_index(self, index_path: Optional[str]):
+        """Reload parse processes with a new static index for schedule lookups"""
+        self._index_path = index_path
+        self._shutdown_parse_stage()
+    
+    def mark_exported(self, feed_name: str, header_timestamp: int):
+        """Record a written export so the feed is not re-exported until its header timestamp moves"""
+        self._exported[feed_name] = header_timestamp
+    
+    def _parse_pool_or_none(self) -> Optional[ProcessPoolExecutor]:
+        if self.config.PIPELINE_PARSE_WORKERS <= 0:
+            if not _stage:
+                _init_parse_stage(self.config, self._index_path)
+            return None
+        if self._parse_pool is None:
+            # spawn, not fork: the worker process already runs fetch and Kafka threads
+            self._parse_pool = ProcessPoolExecutor(
+                max_workers=self.config.PIPELINE_PARSE_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_parse_stage,
+                initargs=(self.config, self._index_path)
+            )
+        return self._parse_pool
+    
+    def _discard_parse_pool(self, pool: ProcessPoolExecutor):
+        """Drop a broken pool so the next submission starts a fresh one"""
+        with self._lock:
+            if self._parse_pool is not pool:
+                return
+            self._parse_pool = None
+        logger.error("Parse process pool broke; starting a new one")
+        # Not waiting: this can run on the pool's own callback thread
+        pool.shutdown(wait=False)
+    
+    def _shutdown_parse_stage(self):
+        _stage.clear()
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown(wait=True)
+            self._parse_pool = None
+    
+    def _record(self, stage: str, busy: float = 0.0, wait: float = 0.0, items: int = 0):
+        with self._lock:
+            stats = self.metrics[stage]
+            stats["items"] += items
+            stats["busy_seconds"] += busy
+            stats["wait_seconds"] += wait
+    
+    def _record_depth(self, name: str, depth: int):
+        with self._lock:
+            self.metrics["queues"][name] = max(self.metrics["queues"][name], depth)
+    
+    def run(self, feeds: List[Tuple[str, str, List[str]]], profile_mode: Optional[str] = None) -> Iterator[Dict]:
+        """
+        Fetch and parse feeds, yielding results as they become ready
+        
+        Args:
+            feeds: List of (feed_name, feed_url, lines)
+            profile_mode: CycleProfiler.parse_mode, passed to every parse job
+        
+        Yields:
+            The parse_and_extract result for each feed, or
+            {"feed", "lines", "error"} if it could not be fetched or parsed.
+            The next result is not awaited until the caller is done with
+            the current one, which is what bounds the write queue.
+        """
+        self.metrics = {
+            stage: {"items": 0, "busy_seconds": 0.0, "wait_seconds": 0.0}
+            for stage in ("fetch", "parse", "write")
+        }
+        self.metrics["queues"] = {"parse": 0, "write": 0}
+        started = time.perf_counter()
+        
+        parse_queue: queue.Queue = queue.Queue(maxsize=self.config.PIPELINE_QUEUE_SIZE)
+        write_queue: queue.Queue = queue.Queue()
+        # Parse jobs in flight plus results waiting for the write stage
+        write_slots = threading.BoundedSemaphore(self.config.PIPELINE_QUEUE_SIZE)
+        # Set when the caller stops iterating early, so blocked stages give up
+        stop = threading.Event()
+        
+        def put_parse(item: Tuple) -> bool:
+            while not stop.is_set():
+                try:
+                    parse_queue.put(item, timeout=_STOP_POLL_SECONDS)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+        
+        def next_parse() -> Optional[Tuple]:
+            while not stop.is_set():
+                try:
+                    return parse_queue.get(timeout=_STOP_POLL_SECONDS)
+                except queue.Empty:
+                    pass
+            return None
+        
+        def acquire_slot() -> bool:
+            while not stop.is_set():
+                if write_slots.acquire(timeout=_STOP_POLL_SECONDS):
+                    return True
+            return False
+        
+        def fetch(feed_name: str, feed_url: str, lines: List[str]):
+            fetch_started = time.perf_counter()
+            feed_data = None
+            try:
+                feed_data = self.fetcher.fetch_feed(feed_url)
+            finally:
+                fetched = time.perf_counter()
+                put_parse((feed_name, lines, feed_data))  # blocks while the parse stage is behind
+                self._record("fetch", busy=fetched - fetch_started, wait=time.perf_counter() - fetched, items=1)
+                self._record_depth("parse", parse_queue.qsize())
+        
+        def deliver(feed_name: str, lines: List[str], future: Future, pool: Optional[ProcessPoolExecutor] = None):
+            try:
+                result = future.result()
+                self._record("parse", busy=result["parse_seconds"], items=1)
+            except Exception as e:
+                logger.error(f"Failed to parse GTFS feed {feed_name}: {e}")
+                result = {"feed": feed_name, "lines": lines, "error": str(e)}
+                if pool is not None and isinstance(e, BrokenProcessPool):
+                    self._discard_parse_pool(pool)
+            write_queue.put(result)
+            self._record_depth("write", write_queue.qsize())
+        
+        def parse(feed_name: str, lines: List[str], feed_data: bytes):
+            exported_timestamp = self._exported.get(feed_name)
+            future: Future
+            pool = self._parse_pool_or_none()  # a new pool if the last one broke
+            if pool is not None:
+                try:
+                    future = pool.submit(
+                        parse_and_extract, feed_name, feed_data, lines, exported_timestamp, profile_mode
+                    )
+                except Exception as e:
+                    # BrokenProcessPool, or RuntimeError after a shutdown
+                    future = Future()
+                    future.set_exception(e)
+                    deliver(feed_name, lines, future, pool)
+                    return
+                future.add_done_callback(lambda f: deliver(feed_name, lines, f, pool))
+                return
+            future = Future()
+            try:
+                future.set_result(parse_and_extract(feed_name, feed_data, lines, exported_timestamp, profile_mode))
+            except Exception as e:
+                future.set_exception(e)
+            deliver(feed_name, lines, future)
+        
+        def dispatch():
+            for _ in feeds:
+                waited = time.perf_counter()
+                item = next_parse()
+                if item is None or not acquire_slot():  # blocks while the write stage is behind
+                    return
+                self._record("parse", wait=time.perf_counter() - waited)
+                
+                feed_name, lines, feed_data = item
+                if feed_data is None:
+                    write_queue.put({"feed": feed_name, "lines": lines, "error": "fetch failed"})
+                    continue
+                try:
+                    parse(feed_name, lines, feed_data)
+                except Exception as e:
+                    # Every feed must reach the write queue or the caller waits forever
+                    logger.error(f"Failed to dispatch GTFS feed {feed_name}: {e}", exc_info=True)
+                    write_queue.put({"feed": feed_name, "lines": lines, "error": str(e)})
+        
+        for feed_name, feed_url, lines in feeds:
+            self._fetch_pool.submit(fetch, feed_name, feed_url, lines)
+        dispatcher = threading.Thread(target=dispatch, name="feed-dispatch", daemon=True)
+        dispatcher.start()
+        
+        try:
+            for _ in feeds:
+                waited = time.perf_counter()
+                result = write_queue.get()
+                resumed = time.perf_counter()
+                try:
+                    yield result
+                finally:
+                    write_slots.release()
+                    self._record("write", busy=time.perf_counter() - resumed, wait=resumed - waited, items=1)
+        finally:
+            # Releases the dispatcher and fetch threads if the caller left early
+            stop.set()
+            dispatcher.join()
+        
+        self.metrics["cycle_seconds"] = time.perf_counter() - started
+        self._log_metrics()
+    
+    def _log_metrics(self):
+        stages = ", ".join(
+            f"{stage} {self.metrics[stage]['items']} items "
+            f"busy {self.metrics[stage]['busy_seconds']:.2f}s wait {self.metrics[stage]['wait_seconds']:.2f}s"
+            for stage in ("fetch", "parse", "write")
+        )
+        queues = self.metrics["queues"]
+        logger.info(
+            f"Pipeline cycle {self.metrics['cycle_seconds']:.2f}s: {stages}; "
+            f"max queue depth parse {queues['parse']}, write {queues['write']}"
+        )
+    
+    def close(self):
+        """Stop the fetch threads and parse processes"""
+        self._fetch_pool.shutdown(wait=True)
+        self._shutdown_parse_stage()
@@ -0,0 +1,225 @@
+"""
+On-demand profiling of worker processing cycles
+"""
+import os
+import sys
+import time
+import pstats
+import cProfile
+import logging
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional
+
+from ..config import WorkerConfig
+
+logger = logging.getLogger(__name__)
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack at a fixed interval
+    
+    Output is in folded-stack format ("frame;frame;frame count" per line),
+    which flamegraph.pl, speedscope and inferno read directly. The current
+    `label` (e.g. "feed=ACE;line=A") is prepended to every sample so one
+    flamegraph splits by feed and line.
+    """
+    
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.label = ""
+        self.counts: Dict[str, int] = defaultdict(int)
+        self._thread_id: Optional[int] = None
+        self._stop = threading.Event()
+        self._sampler: Optional[threading.Thread] = None
+    
+    def start(self, thread_id: Optional[int] = None):
+        """Start sampling the given thread (defaults to the calling thread)"""
+        self._thread_id = thread_id or threading.get_ident()
+        self._stop.clear()
+        self._sampler = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._sampler.start()
+    
+    def stop(self):
+        """Stop sampling"""
+        self._stop.set()
+        if self._sampler:
+            self._sampler.join()
+            self._sampler = None
+    
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            stack.reverse()
+            if self.label:
+                stack.insert(0, self.label)
+            self.counts[";".join(stack)] += 1
+    
+    def merge(self, counts: Dict[str, int]):
+        """Add samples taken elsewhere (e.g. by a parse process)"""
+        for stack, count in counts.items():
+            self.counts[stack] += count
+    
+    def write(self, path: str):
+        """Write samples in folded-stack format"""
+        with open(path, "w") as f:
+            for stack, count in sorted(self.counts.items()):
+                f.write(f"{stack} {count}\n")
+
+
+class _CollectedStats:
+    """cProfile stats from another process, in the shape pstats.Stats.add loads"""
+    
+    def __init__(self, stats: Dict):
+        self.stats = stats
+    
+    def create_stats(self):
+        pass
+
+
+@contextmanager
+def profile_parse(mode: Optional[str], label: str, interval: float) -> Iterator[Dict]:
+    """
+    Profile the calling thread for one parse job
+    
+    Used inside parse_and_extract, which runs in the parse processes (or on
+    the dispatcher thread with PIPELINE_PARSE_WORKERS=0) where the cycle
+    profiler cannot see. The yielded dictionary gets "profile" set on exit:
+    folded-stack counts (mode "sample") or raw cProfile stats ("cprofile"),
+    plain data that pickles back to the worker for CycleProfiler.merge_parse.
+    With mode None nothing is profiled.
+    """
+    collected: Dict = {"profile": None}
+    if mode == "cprofile":
+        profile = cProfile.Profile()
+        profile.enable()
+        try:
+            yield collected
+        finally:
+            profile.disable()
+            profile.create_stats()
+            collected["profile"] = profile.stats
+    elif mode == "sample":
+        sampler = StackSampler(interval)
+        sampler.label = label
+        sampler.start()
+        try:
+            yield collected
+        finally:
+            sampler.stop()
+            collected["profile"] = dict(sampler.counts)
+    else:
+        yield collected
+
+
+class CycleProfiler:
+    """
+    Profiles the next N calls to `process_feeds`' cycle body
+    
+    Armed at start-up by PROFILE_CYCLES or at runtime by SIGUSR1
+    (PROFILE_SIGNAL_CYCLES cycles). While disarmed, `cycle()` and `label()`
+    only check an integer, so the cost of leaving it in the loop is nil.
+    Each profiled cycle writes a folded-stack file (PROFILE_MODE=sample) or a
+    cProfile .prof file (PROFILE_MODE=cprofile) to PROFILE_DIR.
+    
+    The cycle thread only writes; parsing runs elsewhere. While a cycle is
+    profiled, `parse_mode` tells the pipeline to profile each parse job
+    (see profile_parse), and merge_parse folds those profiles into the
+    cycle's file.
+    """
+    
+    def __init__(self, config: WorkerConfig = None):
+        self.config = config or WorkerConfig()
+        self.remaining = self.config.PROFILE_CYCLES
+        self._cycle_number = 0
+        self._sampler: Optional[StackSampler] = None
+        self._parse_stats: Optional[pstats.Stats] = None
+        self._profiling = False
+    
+    @property
+    def parse_mode(self) -> Optional[str]:
+        """PROFILE_MODE while a cycle is being profiled, else None"""
+        return self.config.PROFILE_MODE if self._profiling else None
+    
+    def merge_parse(self, profile):
+        """Add a parse job's profile (from profile_parse) to the current cycle's"""
+        if not profile or not self._profiling:
+            return
+        if self._sampler is not None:
+            self._sampler.merge(profile)
+        elif self._parse_stats is None:
+            self._parse_stats = pstats.Stats(_CollectedStats(profile))
+        else:
+            self._parse_stats.add(_CollectedStats(profile))
+    
+    def arm(self, cycles: Optional[int] = None):
+        """Profile the next `cycles` cycles"""
+        self.remaining = cycles or self.config.PROFILE_SIGNAL_CYCLES
+        logger.info(f"Profiling armed for the next {self.remaining} cycles ({self.config.PROFILE_MODE})")
+    
+    def handle_signal(self, signum, frame):
+        """Signal handler that arms the profiler"""
+        self.arm()
+    
+    def label(self, **labels: str):
+        """Tag subsequent samples (e.g. feed="ACE", line="A")"""
+        if self._sampler is not None:
+            self._sampler.label = ";".join(f"{key}={value}" for key, value in labels.items())
+    
+    @contextmanager
+    def cycle(self):
+        """Context manager wrapping one processing cycle"""
+        self._cycle_number += 1
+        if self.remaining <= 0:
+            yield
+            return
+        
+        os.makedirs(self.config.PROFILE_DIR, exist_ok=True)
+        stem = os.path.join(
+            self.config.PROFILE_DIR,
+            f"worker-cycle{self._cycle_number}-{time.strftime('%Y%m%dT%H%M%S')}"
+        )
+        started = time.perf_counter()
+        self._profiling = True
+        
+        if self.config.PROFILE_MODE == "cprofile":
+            profile = cProfile.Profile()
+            profile.enable()
+            try:
+                yield
+            finally:
+                profile.disable()
+                stats = pstats.Stats(profile)
+                if self._parse_stats is not None:
+                    stats.add(self._parse_stats)
+                stats.dump_stats(f"{stem}.prof")
+                self._parse_stats = None
+                self._finish(f"{stem}.prof", started)
+            return
+        
+        self._sampler = StackSampler(self.config.PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        self._sampler.start()
+        try:
+            yield
+        finally:
+            self._sampler.stop()
+            self._sampler.write(f"{stem}.folded")
+            self._sampler = None
+            self._finish(f"{stem}.folded", started)
+    
+    def _finish(self, path: str, started: float):
+        self._profiling = False
+        self.remaining -= 1
+        logger.info(
+            f"Wrote cycle profile {path} ({time.perf_counter() - started:.2f}s cycle, "
+            f"{self.remaining} profiled cycles left)"
+        )
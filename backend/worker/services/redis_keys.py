@@ -0,0 +1,91 @@
+"""
+Redis key names shared by the worker and the API (keep the copies in
+backend/worker/services and backend/api/services identical)
+
+Per-line keys carry the line as a hash tag (e.g. "eta:{A}:A02:N") so all of
+a line's keys map to one Redis Cluster slot and multi-key operations on a
+line stay on one node. The station catalog keys share the "{stations}" tag
+for the same reason. Outside Cluster mode the braces are ordinary
+characters.
+
+ETA, station-id, trip-index and position keys are versioned: the worker writes each line's data
+under a new version and then flips SNAPSHOT_KEY, which maps every line to
+its current version, so readers that resolve versions from one read of the
+pointer see a consistent snapshot. Per-trip keys are the exception: one
+key per trip (tagged by trip ID), overwritten each cycle and deleted when
+the trip leaves the feed, so a trip is found with a single GET.
+"""
+import re
+from typing import Optional, Tuple
+
+SNAPSHOT_KEY = "eta:current"
+LINE_STATUS_KEY = "line_status"
+STATIONS_VERSION_KEY = "stations:{stations}:version"
+# Worker heartbeat: per-feed freshness and the last cycle's timings (no TTL,
+# so a dead worker's last heartbeat stays readable)
+HEARTBEAT_KEY = "worker:heartbeat"
+
+# "<prefix>:{<tag>}:v<version>[:...]": the hash tag is the line, or "system"
+# for the system-wide snapshot
+_VERSIONED_KEY = re.compile(r"^[^{]*\{([^}]*)\}:v(\d+)(?::|$)")
+
+
+def eta_key(line: str, version: str, station_id: str, direction: str) -> str:
+    """Key holding the next trains for one station and direction in a line version"""
+    return f"eta:{{{line}}}:v{version}:{station_id}:{direction}"
+
+
+def station_ids_key(line: str, version: str) -> str:
+    """Key listing the stations with ETA keys in a line version"""
+    return f"station_ids:{{{line}}}:v{version}"
+
+
+def trips_key(line: str, version: str) -> str:
+    """Key holding a line's active-trip index in a line version"""
+    return f"trips:{{{line}}}:v{version}"
+
+
+def trip_key(trip_id: str) -> str:
+    """Key holding one active trip's remaining stops (unversioned, expiring)"""
+    return f"trip:{{{trip_id}}}"
+
+
+def positions_key(line: str, version: str) -> str:
+    """Key holding a line's packed train positions in a line version"""
+    return f"positions:{{{line}}}:v{version}"
+
+
+def gtfsrt_key(line: str) -> str:
+    """Key holding a line's filtered GTFS-RT FeedMessage (binary)"""
+    return f"gtfsrt:{{{line}}}"
+
+
+def gtfsrt_timestamp_key(line: str) -> str:
+    """Key holding the source header timestamp of a line's GTFS-RT export"""
+    return f"gtfsrt:{{{line}}}:timestamp"
+
+
+def system_snapshot_key(version: str, coding: str) -> str:
+    """Key holding the compressed system-wide ETA snapshot of a version (binary)"""
+    return f"snapshot:{{system}}:v{version}:{coding}"
+
+
+def history_key(line: str) -> str:
+    """Stream of observed arrivals for a line"""
+    return f"history:{{{line}}}"
+
+
+def stations_key(line: str) -> str:
+    """Key holding a line's ordered stations"""
+    return f"stations:{{stations}}:{line}"
+
+
+def rate_limit_key(subject: str) -> str:
+    """Hash holding the request token bucket for a JWT subject"""
+    return f"ratelimit:{{{subject}}}"
+
+
+def key_version(key: str) -> Optional[Tuple[str, str]]:
+    """(hash tag, version) of a versioned key, or None for unversioned keys"""
+    match = _VERSIONED_KEY.match(key)
+    return (match.group(1), match.group(2)) if match else None
@@ -0,0 +1,59 @@
+"""
+Redis client construction for standalone, Sentinel and Cluster deployments
+"""
+import logging
+from typing import List, Tuple
+
+import redis
+from redis.cluster import RedisCluster, ClusterNode
+from redis.sentinel import Sentinel
+
+logger = logging.getLogger(__name__)
+
+
+def parse_nodes(value: str) -> List[Tuple[str, int]]:
+    """Parse "host:port,host:port" into (host, port) pairs"""
+    nodes = []
+    for item in value.split(","):
+        item = item.strip()
+        if item:
+            host, _, port = item.partition(":")
+            nodes.append((host, int(port or 6379)))
+    return nodes
+
+
+def connect(config, decode_responses: bool = True) -> redis.Redis:
+    """
+    Create a client for the Redis primary of the configured REDIS_MODE
+    
+    - standalone: REDIS_HOST:REDIS_PORT
+    - sentinel: the primary of REDIS_SENTINEL_MASTER discovered through
+      REDIS_SENTINELS (follows failovers)
+    - cluster: a RedisCluster seeded from REDIS_CLUSTER_NODES (default
+      REDIS_HOST:REDIS_PORT)
+    
+    decode_responses=False returns raw bytes, for binary values.
+    
+    Returns:
+        Redis client (RedisCluster in cluster mode)
+    """
+    options = {
+        "decode_responses": decode_responses,
+        "socket_connect_timeout": config.REDIS_TIMEOUT
+    }
+    
+    if config.REDIS_MODE == "cluster":
+        nodes = parse_nodes(config.REDIS_CLUSTER_NODES) or [(config.REDIS_HOST, config.REDIS_PORT)]
+        return RedisCluster(
+            startup_nodes=[ClusterNode(host, port) for host, port in nodes],
+            **options
+        )
+    
+    if config.REDIS_MODE == "sentinel":
+        sentinel = Sentinel(parse_nodes(config.REDIS_SENTINELS), socket_timeout=config.REDIS_TIMEOUT)
+        return sentinel.master_for(config.REDIS_SENTINEL_MASTER, db=config.REDIS_DB, **options)
+    
+    if config.REDIS_MODE != "standalone":
+        raise ValueError(f"Unknown REDIS_MODE {config.REDIS_MODE!r} (standalone, sentinel or cluster)")
+    
+    return redis.Redis(host=config.REDIS_HOST, port=config.REDIS_PORT, db=config.REDIS_DB, **options)
@@ -0,0 +1,248 @@
+"""
+Service for answering scheduled-service queries from the static GTFS index
+"""
+import logging
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, datetime, timedelta
+from typing import Dict, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from ..config import WorkerConfig
+from .gtfs_parser import GTFSParser
+from .static_index import StaticIndex
+
+logger = logging.getLogger(__name__)
+
+
+class ScheduleEngine:
+    """
+    Scheduled arrivals per stop from the compiled static index
+    
+    The index stores each stop's scheduled arrivals as one sorted slice
+    (seconds since the start of the service day), so "next arrivals at stop
+    X after T" is a bisect into that slice for each candidate service day
+    (yesterday's trips run past midnight as 24:xx:xx) plus a short forward
+    scan that skips services not running that day.
+    
+    For matching realtime trips, the same arrivals are regrouped per trip
+    at load (a CSR layout over compact arrays, ordered by stop within each
+    trip), so a trip's arrival at a stop is a bisect over that trip's few
+    dozen stops rather than a scan of every arrival at the stop.
+    
+    Used to fill ETAs when a realtime feed is down (trains marked
+    "scheduled") and to compute delay and status for realtime trips.
+    """
+    
+    def __init__(self, index: StaticIndex, config: WorkerConfig = None):
+        self.index = index
+        self.config = config or WorkerConfig()
+        self.tz = ZoneInfo(self.config.SCHEDULE_TIMEZONE)
+        self._active: Dict[date, Set[int]] = {}
+        self._starts: Dict[date, float] = {}
+        self._route_index = {route_id: i for i, route_id in enumerate(index.route_ids)}
+        
+        # Realtime trip IDs are the static IDs without the schedule prefix
+        # ("AFA23GEN-1092-Weekday-00_000600_1..S03R" -> "000600_1..S03R")
+        self._trip_keys: Dict[str, List[int]] = {}
+        for trip_idx, trip_id in enumerate(index.trip_ids):
+            self._trip_keys.setdefault(trip_id, []).append(trip_idx)
+            suffix = trip_id.split("_", 1)[-1]
+            if suffix != trip_id:
+                self._trip_keys.setdefault(suffix, []).append(trip_idx)
+        
+        self._build_trip_stops()
+        
+        self._children: Dict[int, List[int]] = {}
+        for stop_idx, parent in enumerate(index.stop_parents):
+            if parent >= 0:
+                self._children.setdefault(parent, []).append(stop_idx)
+    
+    def _build_trip_stops(self):
+        """Regroup the per-stop arrivals by trip (counting sort, stop order kept)"""
+        sched_trip, sched_arrival, offsets = self.index.sched_trip, self.index.sched_arrival, self.index.sched_offsets
+        trip_offsets = array("I", [0] * (len(self.index.trip_ids) + 1))
+        for trip_idx in sched_trip:
+            trip_offsets[trip_idx + 1] += 1
+        for trip_idx in range(len(self.index.trip_ids)):
+            trip_offsets[trip_idx + 1] += trip_offsets[trip_idx]
+        
+        fill = array("I", trip_offsets)
+        self._trip_stop = array("I", [0]) * len(sched_trip)
+        self._trip_arrival = array("I", [0]) * len(sched_trip)
+        # Arrivals are sorted by stop, so each trip's slice comes out ordered by stop
+        for stop_idx in range(len(offsets) - 1):
+            for i in range(offsets[stop_idx], offsets[stop_idx + 1]):
+                position = fill[sched_trip[i]]
+                fill[sched_trip[i]] = position + 1
+                self._trip_stop[position] = stop_idx
+                self._trip_arrival[position] = sched_arrival[i]
+        self._trip_offsets = trip_offsets
+    
+    def service_day_start(self, day: date) -> float:
+        """Epoch of a service day's time origin (noon minus 12h, per GTFS)"""
+        start = self._starts.get(day)
+        if start is None:
+            noon = datetime(day.year, day.month, day.day, 12, tzinfo=self.tz)
+            start = self._starts[day] = (noon - timedelta(hours=12)).timestamp()
+        return start
+    
+    def active_services(self, day: date) -> Set[int]:
+        """Indexes of the services that run on a date"""
+        active = self._active.get(day)
+        if active is not None:
+            return active
+        
+        stamp = day.strftime("%Y%m%d")
+        active = set()
+        for service_idx, rules in enumerate(self.index.service_rules):
+            if stamp in rules["removed"]:
+                continue
+            if stamp in rules["added"] or (
+                rules["days"][day.weekday()] and rules["start"] <= stamp <= rules["end"]
+            ):
+                active.add(service_idx)
+        
+        if len(self._active) > 8:
+            self._active.clear()
+            self._starts.clear()
+        self._active[day] = active
+        return active
+    
+    def _service_days(self, at: float) -> List[date]:
+        today = datetime.fromtimestamp(at, self.tz).date()
+        return [today - timedelta(days=1), today, today + timedelta(days=1)]
+    
+    def next_arrivals(
+        self,
+        stop_id: str,
+        after: float,
+        limit: int = 3,
+        route_id: Optional[str] = None,
+        before: Optional[float] = None
+    ) -> List[Tuple[float, int]]:
+        """
+        Next scheduled arrivals at a platform stop
+        
+        Args:
+            stop_id: Platform stop ID (e.g. "101N")
+            after: Epoch seconds to search from
+            limit: Maximum arrivals to return
+            route_id: Only trips on this route
+            before: Optional epoch upper bound
+        
+        Returns:
+            Sorted list of (arrival epoch, trip index)
+        """
+        stop_idx = self.index.stop_index.get(stop_id)
+        if stop_idx is None:
+            return []
+        route_idx = self._route_index.get(route_id) if route_id else None
+        if route_id and route_idx is None:
+            return []
+        
+        arrivals, trips = self.index.sched_arrival, self.index.sched_trip
+        lo, hi = self.index.sched_offsets[stop_idx], self.index.sched_offsets[stop_idx + 1]
+        results = []
+        for day in self._service_days(after):
+            start = self.service_day_start(day)
+            active = self.active_services(day)
+            end = hi if before is None else bisect_right(arrivals, before - start, lo, hi)
+            found = 0
+            for i in range(bisect_left(arrivals, after - start, lo, hi), end):
+                trip_idx = trips[i]
+                if self.index.trip_service[trip_idx] not in active:
+                    continue
+                if route_idx is not None and self.index.trip_route[trip_idx] != route_idx:
+                    continue
+                results.append((start + arrivals[i], trip_idx))
+                found += 1
+                if found >= limit:
+                    break
+        
+        results.sort()
+        return results[:limit]
+    
+    def scheduled_arrival(self, trip_id: str, stop_id: str, predicted: float) -> Optional[float]:
+        """
+        Scheduled arrival of a realtime trip at a platform stop
+        
+        Looks the stop up in each static counterpart's own stops and keeps
+        the service day whose arrival is closest to the predicted time,
+        within SCHEDULE_MATCH_WINDOW_SECONDS.
+        
+        Returns:
+            Scheduled arrival epoch, or None if the trip or stop is not in
+            the static schedule
+        """
+        candidates = self._trip_keys.get(trip_id)
+        stop_idx = self.index.stop_index.get(stop_id)
+        if not candidates or stop_idx is None:
+            return None
+        
+        offsets, stops, arrivals = self._trip_offsets, self._trip_stop, self._trip_arrival
+        window = self.config.SCHEDULE_MATCH_WINDOW_SECONDS
+        days = [
+            (self.service_day_start(day), self.active_services(day))
+            for day in self._service_days(predicted)
+        ]
+        best = None
+        for trip_idx in candidates:
+            lo, hi = offsets[trip_idx], offsets[trip_idx + 1]
+            i = bisect_left(stops, stop_idx, lo, hi)
+            # A trip can call at a stop more than once (loops)
+            scheduled = []
+            while i < hi and stops[i] == stop_idx:
+                scheduled.append(arrivals[i])
+                i += 1
+            if not scheduled:
+                continue
+            service = self.index.trip_service[trip_idx]
+            for start, active in days:
+                if service not in active:
+                    continue
+                for arrival in scheduled:
+                    gap = abs(start + arrival - predicted)
+                    if gap <= window and (best is None or gap < best[0]):
+                        best = (gap, start + arrival)
+        
+        return best[1] if best else None
+    
+    def status(self, delay_seconds: Optional[float]) -> str:
+        """Classify a delay as on_time / delayed / early (unscheduled if unknown)"""
+        if delay_seconds is None:
+            return "unscheduled"
+        if delay_seconds > self.config.SCHEDULE_LATE_SECONDS:
+            return "delayed"
+        if delay_seconds < -self.config.SCHEDULE_EARLY_SECONDS:
+            return "early"
+        return "on_time"
+    
+    def scheduled_etas(self, line: str, now: float) -> Dict[str, List[Dict]]:
+        """
+        Scheduled ETAs for every station on a line, for feed outages
+        
+        Returns:
+            Same shape as GTFSParser.extract_etas, with status "scheduled"
+        """
+        etas_by_station: Dict[str, List[Dict]] = {}
+        horizon = now + self.config.SCHEDULE_FALLBACK_HORIZON_MINUTES * 60
+        
+        for station_id in self.index.lines.get(line, []):
+            station_idx = self.index.stop_index.get(station_id)
+            if station_idx is None:
+                continue
+            for stop_idx in self._children.get(station_idx, [station_idx]):
+                stop_id = self.index.stop_ids[stop_idx]
+                station, direction = GTFSParser.split_stop_id(stop_id)
+                for arrival, trip_idx in self.next_arrivals(stop_id, now, 3, line, horizon):
+                    etas_by_station.setdefault(f"{station}:{direction}", []).append({
+                        "arrival_time": datetime.fromtimestamp(arrival).isoformat(),
+                        "eta_minutes": int((arrival - now) / 60),
+                        "train_id": self.index.trip_ids[trip_idx],
+                        "route_id": line,
+                        "status": "scheduled",
+                        "delay_seconds": None
+                    })
+        
+        return etas_by_station
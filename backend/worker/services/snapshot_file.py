@@ -0,0 +1,401 @@
+"""
+Redis-free storage: the worker's keyspace published as one memory-mapped snapshot file
+
+Single-node deployments (STORAGE_BACKEND=file) run without Redis. The worker
+keeps the keys CacheService would write in memory and, at every
+publish_snapshot, writes the published snapshot's keys to SNAPSHOT_FILE_PATH
+and renames the file into place; API processes mmap it and binary-search its
+index in place. History streams go to SNAPSHOT_HISTORY_FILE_PATH, in the same
+format, at most every SNAPSHOT_HISTORY_WRITE_SECONDS.
+
+File layout (little-endian; keep in sync with backend/api/services/snapshot_file.py):
+    header   MAGIC (8 bytes), entry count (u32), written_at (f64 epoch seconds)
+    index    one entry per key, sorted by key bytes:
+             key offset (u64), key length (u32), value offset (u64),
+             value length (u32), expires_at (f64 epoch seconds, 0 = never)
+    keys     the UTF-8 keys, back to back
+    values   the values, back to back
+
+Keys and values are exactly what CacheService writes to Redis (same key
+names, JSON documents and binary payloads), except history streams. Those
+are stored in chunks of up to STREAM_CHUNK_ENTRIES entries, one key per
+chunk ("<stream key>:<first ms, 13 digits>-<first seq, 6 digits>", so a
+stream's chunks sort together and oldest first). A chunk value is indexed:
+    count    u32
+    ms       u64 per entry  } entry IDs, ascending
+    seq      u32 per entry  }
+    offsets  u32 per entry + 1, into the payloads
+    payloads the entries' fields as JSON objects, back to back
+so a reader bisects the ID columns and decodes only the entries it returns.
+"""
+import os
+import json
+import time
+import struct
+import logging
+from collections import deque
+from typing import Callable, Dict, Iterator, List, Optional, Tuple
+
+from ..config import WorkerConfig
+from .cache_service import CacheService
+from .redis_keys import key_version
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"NYCETA\x00\x01"
+HEADER = struct.Struct("<8sId")
+INDEX_ENTRY = struct.Struct("<QIQId")
+
+# Stream entries appended to one chunk before a new one is started; trimming
+# drops whole chunks, like Redis trims whole nodes with `~`
+STREAM_CHUNK_ENTRIES = 1000
+CHUNK_COUNT = struct.Struct("<I")
+
+
+def write_snapshot_file(path: str, entries: List[Tuple[bytes, bytes, float]]) -> int:
+    """
+    Write (key, value, expires_at) entries as a snapshot file and rename it into place
+    
+    Readers that still map the previous file keep reading it until they
+    remap; the rename swaps the file atomically for new readers.
+    
+    Returns:
+        Size of the file in bytes
+    """
+    entries = sorted(entries, key=lambda entry: entry[0])
+    keys_offset = HEADER.size + INDEX_ENTRY.size * len(entries)
+    values_offset = keys_offset + sum(len(key) for key, _, _ in entries)
+    
+    index = bytearray(HEADER.pack(MAGIC, len(entries), time.time()))
+    key_pos, value_pos = keys_offset, values_offset
+    for key, value, expires_at in entries:
+        index += INDEX_ENTRY.pack(key_pos, len(key), value_pos, len(value), expires_at)
+        key_pos += len(key)
+        value_pos += len(value)
+    
+    tmp_path = f"{path}.tmp.{os.getpid()}"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(index)
+            for key, _, _ in entries:
+                f.write(key)
+            for _, value, _ in entries:
+                f.write(value)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+    return value_pos
+
+
+def read_snapshot_file(path: str) -> Iterator[Tuple[bytes, bytes, float]]:
+    """Entries of a snapshot file as (key, value, expires_at)"""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, count, _ = HEADER.unpack_from(data)
+    if magic != MAGIC:
+        raise ValueError(f"{path} is not a snapshot file")
+    for i in range(count):
+        key_pos, key_len, value_pos, value_len, expires_at = INDEX_ENTRY.unpack_from(
+            data, HEADER.size + i * INDEX_ENTRY.size
+        )
+        yield data[key_pos:key_pos + key_len], data[value_pos:value_pos + value_len], expires_at
+
+
+def stream_chunk_key(stream_key: str, first_id: Tuple[int, int]) -> str:
+    """Key of the history file entry holding a stream chunk"""
+    return f"{stream_key}:{first_id[0]:013d}-{first_id[1]:06d}"
+
+
+class _StreamChunk:
+    """Entries of one stream chunk, with its encoding cached once written"""
+    
+    __slots__ = ("ids", "payloads", "encoded")
+    
+    def __init__(self):
+        self.ids: List[Tuple[int, int]] = []
+        self.payloads: List[bytes] = []
+        self.encoded: Optional[bytes] = None
+    
+    def append(self, entry_id: Tuple[int, int], payload: bytes):
+        self.ids.append(entry_id)
+        self.payloads.append(payload)
+        self.encoded = None
+    
+    def encode(self) -> bytes:
+        """The chunk in the indexed layout (see the module docstring)"""
+        if self.encoded is None:
+            count = len(self.ids)
+            offsets = [0]
+            for payload in self.payloads:
+                offsets.append(offsets[-1] + len(payload))
+            self.encoded = b"".join((
+                CHUNK_COUNT.pack(count),
+                struct.pack(f"<{count}Q", *(ms for ms, _ in self.ids)),
+                struct.pack(f"<{count}I", *(seq for _, seq in self.ids)),
+                struct.pack(f"<{count + 1}I", *offsets),
+                *self.payloads
+            ))
+        return self.encoded
+    
+    @classmethod
+    def decode(cls, value: bytes) -> "_StreamChunk":
+        chunk = cls()
+        (count,) = CHUNK_COUNT.unpack_from(value)
+        position = CHUNK_COUNT.size
+        ms = struct.unpack_from(f"<{count}Q", value, position)
+        position += 8 * count
+        seq = struct.unpack_from(f"<{count}I", value, position)
+        position += 4 * count
+        offsets = struct.unpack_from(f"<{count + 1}I", value, position)
+        position += 4 * (count + 1)
+        chunk.ids = list(zip(ms, seq))
+        chunk.payloads = [value[position + start:position + end] for start, end in zip(offsets, offsets[1:])]
+        chunk.encoded = value
+        return chunk
+
+
+def _to_bytes(value) -> bytes:
+    """Encode a value the way redis-py does"""
+    if isinstance(value, bytes):
+        return value
+    if isinstance(value, str):
+        return value.encode("utf-8")
+    return str(value).encode("utf-8")
+
+
+class _StorePipeline:
+    """Queues commands and applies them to the store on execute"""
+    
+    def __init__(self, store: "SnapshotStore"):
+        self._store = store
+        self._commands: List[Tuple[str, tuple, dict]] = []
+    
+    def __getattr__(self, name: str):
+        def queue(*args, **kwargs):
+            self._commands.append((name, args, kwargs))
+            return self
+        return queue
+    
+    def execute(self) -> List:
+        commands, self._commands = self._commands, []
+        return [getattr(self._store, name)(*args, **kwargs) for name, args, kwargs in commands]
+
+
+class SnapshotStore:
+    """
+    In-memory keyspace with the Redis commands CacheService uses
+    
+    Stands in for the Redis clients of FileCacheService; `entries` and
+    `stream_entries` are what get written to the snapshot and history
+    files. Expired keys are dropped on read and on write-out.
+    """
+    
+    def __init__(self):
+        self._values: Dict[str, bytes] = {}
+        self._expires: Dict[str, float] = {}
+        # stream key -> chunks, oldest first
+        self._streams: Dict[str, deque] = {}
+        self._last_id: Tuple[int, int] = (0, 0)
+    
+    def load(self, path: str) -> int:
+        """Adopt the keys (or stream chunks) of a previously published file"""
+        now = time.time()
+        loaded = 0
+        for key, value, expires_at in read_snapshot_file(path):
+            if expires_at and expires_at <= now:
+                continue
+            key = key.decode("utf-8")
+            if key.startswith("history:"):
+                # Chunk keys sort oldest first within their stream
+                stream_key = key.rsplit(":", 1)[0]
+                chunk = _StreamChunk.decode(value)
+                self._streams.setdefault(stream_key, deque()).append(chunk)
+                self._last_id = max(self._last_id, chunk.ids[-1])
+            else:
+                self._values[key] = value
+                if expires_at:
+                    self._expires[key] = expires_at
+            loaded += 1
+        return loaded
+    
+    def _live(self, key: str) -> bool:
+        expires_at = self._expires.get(key)
+        if expires_at is not None and expires_at <= time.time():
+            self._values.pop(key, None)
+            del self._expires[key]
+            return False
+        return key in self._values
+    
+    def pipeline(self, transaction: bool = True) -> _StorePipeline:
+        return _StorePipeline(self)
+    
+    def ping(self) -> bool:
+        return True
+    
+    def get(self, key: str) -> Optional[bytes]:
+        return self._values[key] if self._live(key) else None
+    
+    def set(self, key: str, value) -> bool:
+        self._values[key] = _to_bytes(value)
+        self._expires.pop(key, None)
+        return True
+    
+    def setex(self, key: str, seconds: int, value) -> bool:
+        self._values[key] = _to_bytes(value)
+        self._expires[key] = time.time() + seconds
+        return True
+    
+    def mset(self, mapping: Dict) -> bool:
+        for key, value in mapping.items():
+            self.set(key, value)
+        return True
+    
+    def unlink(self, *keys: str) -> int:
+        removed = 0
+        for key in keys:
+            removed += (self._values.pop(key, None) is not None) + (self._streams.pop(key, None) is not None)
+            self._expires.pop(key, None)
+        return removed
+    
+    def xadd(self, key: str, fields: Dict, maxlen: Optional[int] = None, approximate: bool = True) -> str:
+        ms = int(time.time() * 1000)
+        if ms <= self._last_id[0]:
+            ms, seq = self._last_id[0], self._last_id[1] + 1
+        else:
+            seq = 0
+        self._last_id = (ms, seq)
+        payload = json.dumps({k: str(v) for k, v in fields.items()}, separators=(",", ":")).encode("utf-8")
+        
+        chunks = self._streams.setdefault(key, deque())
+        if not chunks or len(chunks[-1].ids) >= STREAM_CHUNK_ENTRIES:
+            chunks.append(_StreamChunk())
+        chunks[-1].append((ms, seq), payload)
+        
+        if maxlen is not None:
+            total = sum(len(c.ids) for c in chunks)
+            while len(chunks) > 1 and total - len(chunks[0].ids) >= maxlen:
+                total -= len(chunks.popleft().ids)
+        return f"{ms}-{seq}"
+    
+    def xtrim(self, key: str, minid: int, approximate: bool = True) -> int:
+        chunks = self._streams.get(key)
+        trimmed = 0
+        while chunks and chunks[0].ids[-1][0] < int(minid):
+            trimmed += len(chunks.popleft().ids)
+        return trimmed
+    
+    def entries(self, include: Optional[Callable[[str], bool]] = None) -> List[Tuple[bytes, bytes, float]]:
+        """Live keys (those `include` accepts, if given) as (key, value, expires_at) for write_snapshot_file"""
+        now = time.time()
+        entries = []
+        for key, value in self._values.items():
+            if include is not None and not include(key):
+                continue
+            expires_at = self._expires.get(key, 0.0)
+            if not expires_at or expires_at > now:
+                entries.append((key.encode("utf-8"), value, expires_at))
+        return entries
+    
+    def stream_entries(self) -> List[Tuple[bytes, bytes, float]]:
+        """
+        Every stream chunk as (chunk key, indexed chunk, 0) for write_snapshot_file
+        
+        Full chunks never change, so only each stream's newest chunk is
+        encoded again.
+        """
+        return [
+            (stream_chunk_key(key, chunk.ids[0]).encode("utf-8"), chunk.encode(), 0.0)
+            for key, chunks in self._streams.items()
+            for chunk in chunks
+        ]
+    
+    def close(self):
+        pass
+
+
+class FileCacheService(CacheService):
+    """
+    CacheService that publishes to a snapshot file instead of Redis
+    
+    Every write lands in an in-memory SnapshotStore through the same code as
+    the Redis backend (same keys, versions and garbage collection). After
+    the pointer flip, publish_snapshot writes only the unversioned keys and
+    the versions the new pointer names to SNAPSHOT_FILE_PATH; older
+    versions stay in memory until collected, and API processes find the
+    previous pointer's versions in the file they mapped before. History
+    streams are written to SNAPSHOT_HISTORY_FILE_PATH at most every
+    SNAPSHOT_HISTORY_WRITE_SECONDS rather than every cycle.
+    
+    On start the previous files, if any, are loaded back, so lines keep
+    their last version and history across a restart just as with Redis.
+    """
+    
+    def __init__(self, config: WorkerConfig = None):
+        super().__init__(config)
+        self.path = self.config.SNAPSHOT_FILE_PATH
+        self.history_path = self.config.SNAPSHOT_HISTORY_FILE_PATH
+        self.store = SnapshotStore()
+        self._history_written_at = time.monotonic()
+        for path in (self.path, self.history_path):
+            if os.path.exists(path):
+                try:
+                    logger.info(f"Loaded {self.store.load(path)} keys from {path}")
+                except Exception as e:
+                    logger.error(f"Ignoring unreadable snapshot file {path}: {e}")
+    
+    @property
+    def client(self) -> SnapshotStore:
+        return self.store
+    
+    @property
+    def binary_client(self) -> SnapshotStore:
+        return self.store
+    
+    def ping(self) -> bool:
+        """Check the snapshot directory is writable"""
+        directory = os.path.dirname(self.path) or "."
+        if os.access(directory, os.W_OK):
+            return True
+        logger.error(f"Snapshot directory {directory} is not writable")
+        return False
+    
+    def publish_snapshot(self) -> Optional[str]:
+        """Flip the snapshot pointer, then write and rename the snapshot file"""
+        version = super().publish_snapshot()
+        if version is None:
+            return None
+        
+        # Versions the new pointer names: per line, and the system snapshot's
+        published = {line: entry["version"] for line, entry in self._lines.items()}
+        published["system"] = version
+        
+        def in_snapshot(key: str) -> bool:
+            tagged = key_version(key)
+            return tagged is None or published.get(tagged[0]) == tagged[1]
+        
+        try:
+            size = write_snapshot_file(self.path, self.store.entries(in_snapshot))
+        except Exception as e:
+            logger.error(f"Failed to write snapshot file {self.path}: {e}")
+            return None
+        logger.debug(f"Wrote snapshot {version} to {self.path} ({size} bytes)")
+        
+        if time.monotonic() - self._history_written_at >= self.config.SNAPSHOT_HISTORY_WRITE_SECONDS:
+            self.write_history()
+        return version
+    
+    def write_history(self):
+        """Write the history streams to the history file"""
+        self._history_written_at = time.monotonic()
+        try:
+            size = write_snapshot_file(self.history_path, self.store.stream_entries())
+        except Exception as e:
+            logger.error(f"Failed to write history file {self.history_path}: {e}")
+            return
+        logger.debug(f"Wrote history to {self.history_path} ({size} bytes)")
+    
+    def close(self):
+        """Write the history one last time; the last published files stay in place"""
+        self.write_history()
@@ -0,0 +1,109 @@
+"""
+Reader for the compiled GTFS static index (scripts/fetch_gtfs_stations.py)
+"""
+import sys
+import json
+import struct
+import logging
+from array import array
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+INDEX_MAGIC = b"NYCSIDX1"
+INDEX_FORMAT_VERSION = 1
+
+
+class StaticIndex:
+    """
+    Columnar GTFS static data loaded straight from the compiled index file
+    
+    Small tables (stops, routes, per-route station order, service calendars,
+    trip IDs) come from the JSON header; trip attributes and the scheduled
+    arrivals per stop are array.array columns read with frombytes, so
+    loading is a single read plus a few memcpys (and a byteswap per column
+    on big-endian hosts; the file is little-endian).
+    
+    Scheduled arrivals are sorted by (stop, arrival seconds); the arrivals
+    for stop index i are sched_arrival[sched_offsets[i]:sched_offsets[i + 1]],
+    with the matching trip indexes in sched_trip.
+    """
+    
+    def __init__(self, header: Dict, columns: Dict[str, array]):
+        self.stop_ids: List[str] = header["stops"]["id"]
+        self.stop_names: List[str] = header["stops"]["name"]
+        self.stop_lats: List[float] = header["stops"]["lat"]
+        self.stop_lons: List[float] = header["stops"]["lon"]
+        self.stop_parents: List[int] = header["stops"]["parent"]
+        self.route_ids: List[str] = header["routes"]["id"]
+        self.route_lines: List[str] = header["routes"]["line"]
+        self.lines: Dict[str, List[str]] = header["lines"]
+        self.service_ids: List[str] = header["services"]["id"]
+        self.service_rules: List[Dict] = header["services"]["rules"]
+        self.trip_ids: List[str] = header["trips"]
+        
+        self.trip_route = columns["trip_route"]
+        self.trip_service = columns["trip_service"]
+        self.trip_direction = columns["trip_direction"]
+        self.sched_offsets = columns["sched_offsets"]
+        self.sched_arrival = columns["sched_arrival"]
+        self.sched_trip = columns["sched_trip"]
+        
+        self.stop_index: Dict[str, int] = {stop_id: i for i, stop_id in enumerate(self.stop_ids)}
+    
+    @classmethod
+    def load(cls, path: str) -> "StaticIndex":
+        """
+        Load an index file
+        
+        Raises:
+            ValueError: If the file is not a static index of a known version
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        
+        if data[:len(INDEX_MAGIC)] != INDEX_MAGIC:
+            raise ValueError(f"{path} is not a GTFS static index")
+        (header_len,) = struct.unpack_from("<I", data, len(INDEX_MAGIC))
+        body_start = len(INDEX_MAGIC) + 4
+        header = json.loads(data[body_start:body_start + header_len])
+        if header.get("format_version") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"Unsupported static index version {header.get('format_version')}")
+        
+        blob = memoryview(data)[body_start + header_len:]
+        columns = {}
+        for name, meta in header["columns"].items():
+            column = array(meta["type"])
+            start = meta["offset"]
+            column.frombytes(blob[start:start + meta["length"] * column.itemsize])
+            if sys.byteorder == "big":
+                column.byteswap()
+            columns[name] = column
+        
+        return cls(header, columns)
+    
+    def station_catalog(self, lines: List[str]) -> Dict[str, List[Dict]]:
+        """
+        Build the per-line station catalog for the given route IDs
+        
+        Returns:
+            Dictionary mapping line to list of station dictionaries
+            (id, name, lat, lon, order), as StationCatalogLoader.compile does
+        """
+        catalog = {}
+        for line in lines:
+            stations = []
+            for station_id in self.lines.get(line, []):
+                i = self.stop_index.get(station_id)
+                if i is None:
+                    continue
+                stations.append({
+                    "id": station_id,
+                    "name": self.stop_names[i],
+                    "lat": self.stop_lats[i],
+                    "lon": self.stop_lons[i],
+                    "order": len(stations) + 1
+                })
+            if stations:
+                catalog[line] = stations
+        return catalog
@@ -0,0 +1,206 @@
+"""
+Service for compiling the per-line station catalog from GTFS static data
+"""
+import csv
+import io
+import os
+import logging
+import zipfile
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from ..config import WorkerConfig
+from .static_index import StaticIndex
+
+logger = logging.getLogger(__name__)
+
+
+class StationCatalogLoader:
+    """
+    Compiles ordered stop lists per line from GTFS static data
+    
+    Prefers the compiled static index (GTFS_STATIC_INDEX_PATH, written by
+    scripts/fetch_gtfs_stations.py), which loads in milliseconds and is kept
+    on `index` for schedule lookups. A GTFS zip newer than the index is
+    streamed instead, so a dropped-in zip takes effect before the index is
+    rebuilt from it.
+    """
+    
+    def __init__(self, config: WorkerConfig = None):
+        self.config = config or WorkerConfig()
+        self.index: Optional[StaticIndex] = None
+        # (index mtime, zip mtime) of the last load; None for a missing file
+        self._loaded: Optional[Tuple[Optional[float], Optional[float]]] = None
+    
+    @staticmethod
+    def _mtime(path: str) -> Optional[float]:
+        try:
+            return os.path.getmtime(path)
+        except OSError:
+            return None
+    
+    def load_if_changed(self) -> Optional[Dict[str, List[Dict]]]:
+        """
+        Load the catalog if the static index or GTFS zip is new or has changed
+        
+        Returns:
+            Dictionary mapping line to its ordered stations, or None if no
+            static data is present or it is unchanged since the last load
+        """
+        index_mtime = self._mtime(self.config.GTFS_STATIC_INDEX_PATH)
+        zip_mtime = self._mtime(self.config.GTFS_STATIC_PATH)
+        if index_mtime is None and zip_mtime is None:
+            if self._loaded is None:
+                logger.debug(f"GTFS static data not found at {self.config.GTFS_STATIC_INDEX_PATH} or {self.config.GTFS_STATIC_PATH}")
+            return None
+        
+        mtimes = (index_mtime, zip_mtime)
+        if mtimes == self._loaded:
+            return None
+        
+        use_index = index_mtime is not None and (zip_mtime is None or index_mtime >= zip_mtime)
+        path = self.config.GTFS_STATIC_INDEX_PATH if use_index else self.config.GTFS_STATIC_PATH
+        try:
+            if use_index:
+                self.index = StaticIndex.load(path)
+                catalog = self.index.station_catalog(self.config.TARGET_LINES)
+            else:
+                catalog = self.compile(path)
+        except (OSError, ValueError, zipfile.BadZipFile, KeyError, csv.Error) as e:
+            logger.error(f"Failed to load station catalog from {path}: {e}")
+            return None
+        
+        if not use_index and index_mtime is not None:
+            logger.warning(
+                f"{path} is newer than {self.config.GTFS_STATIC_INDEX_PATH}; schedule lookups keep any "
+                f"previously loaded index until it is rebuilt (scripts/fetch_gtfs_stations.py)"
+            )
+        self._loaded = mtimes
+        logger.info(f"Loaded station catalog for {len(catalog)} lines from {path}")
+        return catalog
+    
+    def compile(self, gtfs_path: str) -> Dict[str, List[Dict]]:
+        """
+        Compile ordered stations for every target line
+        
+        Args:
+            gtfs_path: Path to GTFS static zip
+        
+        Returns:
+            Dictionary mapping line to list of station dictionaries
+            (id, name, lat, lon, order)
+        """
+        with zipfile.ZipFile(gtfs_path, 'r') as zip_ref:
+            stations, parents = self._read_stops(zip_ref)
+            trip_routes = self._read_trips(zip_ref)
+            patterns = self._read_stop_patterns(zip_ref, trip_routes, parents)
+        
+        catalog = {}
+        for line, line_patterns in patterns.items():
+            ordered = self._merge_patterns(line_patterns)
+            catalog[line] = [
+                {
+                    "id": station_id,
+                    "name": stations[station_id]["name"],
+                    "lat": stations[station_id]["lat"],
+                    "lon": stations[station_id]["lon"],
+                    "order": order
+                }
+                for order, station_id in enumerate(ordered, start=1)
+                if station_id in stations
+            ]
+        return catalog
+    
+    @staticmethod
+    def _open_csv(zip_ref: zipfile.ZipFile, member: str) -> csv.DictReader:
+        """Stream a zip member as CSV rows without reading it into memory"""
+        return csv.DictReader(io.TextIOWrapper(zip_ref.open(member), encoding='utf-8-sig'))
+    
+    def _read_stops(self, zip_ref: zipfile.ZipFile) -> Tuple[Dict[str, Dict], Dict[str, str]]:
+        """Read stations and the platform -> parent station mapping"""
+        stations: Dict[str, Dict] = {}
+        parents: Dict[str, str] = {}
+        
+        for row in self._open_csv(zip_ref, 'stops.txt'):
+            stop_id = row.get('stop_id', '').strip()
+            parent = row.get('parent_station', '').strip()
+            if parent:
+                parents[stop_id] = parent
+                continue
+            try:
+                stations[stop_id] = {
+                    "name": row.get('stop_name', '').strip(),
+                    "lat": float(row['stop_lat']),
+                    "lon": float(row['stop_lon'])
+                }
+            except (KeyError, ValueError):
+                continue
+        
+        return stations, parents
+    
+    def _read_trips(self, zip_ref: zipfile.ZipFile) -> Dict[str, str]:
+        """Map trip_id to route for northbound (direction 0) trips on target lines"""
+        trip_routes: Dict[str, str] = {}
+        
+        for row in self._open_csv(zip_ref, 'trips.txt'):
+            route_id = row.get('route_id', '').strip()
+            if route_id not in self.config.TARGET_LINES:
+                continue
+            if row.get('direction_id', '0').strip() not in ('', '0'):
+                continue
+            trip_routes[row['trip_id'].strip()] = route_id
+        
+        return trip_routes
+    
+    def _read_stop_patterns(
+        self,
+        zip_ref: zipfile.ZipFile,
+        trip_routes: Dict[str, str],
+        parents: Dict[str, str]
+    ) -> Dict[str, set]:
+        """Collect the distinct stop patterns served by each line"""
+        trip_stops: Dict[str, List[Tuple[int, str]]] = defaultdict(list)
+        
+        for row in self._open_csv(zip_ref, 'stop_times.txt'):
+            trip_id = row.get('trip_id', '').strip()
+            if trip_id not in trip_routes:
+                continue
+            stop_id = row.get('stop_id', '').strip()
+            try:
+                sequence = int(row.get('stop_sequence', ''))
+            except ValueError:
+                continue
+            trip_stops[trip_id].append((sequence, parents.get(stop_id, stop_id)))
+        
+        patterns: Dict[str, set] = defaultdict(set)
+        for trip_id, stops in trip_stops.items():
+            stops.sort()
+            patterns[trip_routes[trip_id]].add(tuple(stop_id for _, stop_id in stops))
+        
+        return patterns
+    
+    @staticmethod
+    def _merge_patterns(patterns: set) -> List[str]:
+        """
+        Merge stop patterns into one ordered list
+        
+        Starts from the longest pattern and splices in branch stops from the
+        others right after the stop that precedes them.
+        """
+        ordered_patterns = sorted(patterns, key=len, reverse=True)
+        if not ordered_patterns:
+            return []
+        
+        ordered = list(ordered_patterns[0])
+        seen = set(ordered)
+        for pattern in ordered_patterns[1:]:
+            insert_at = 0
+            for stop_id in pattern:
+                if stop_id in seen:
+                    insert_at = ordered.index(stop_id) + 1
+                    continue
+                ordered.insert(insert_at, stop_id)
+                seen.add(stop_id)
+                insert_at += 1
+        
+        return ordered
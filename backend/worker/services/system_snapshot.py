@@ -0,0 +1,80 @@
+"""
+Service for building the compressed system-wide ETA snapshot
+"""
+import gzip
+import json
+import logging
+from typing import Dict, List
+
+from ..config import WorkerConfig
+
+try:
+    import zstandard
+except ImportError:  # zstd is optional; gzip is always produced
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+
+class SystemSnapshotBuilder:
+    """
+    Keeps each line's latest ETAs and encodes them as one document
+    
+    Document layout (compact JSON):
+        {"version", "updated_at",
+         "lines": {line: {"version", "updated_at", "next_update_at",
+                          "stations": {station_id: {"name", "N": [...], "S": [...]}}}}}
+    
+    Each line appears at the version the snapshot pointer maps it to, so the
+    document matches what per-station reads of the same pointer return.
+    """
+    
+    def __init__(self, config: WorkerConfig = None):
+        self.config = config or WorkerConfig()
+        # line -> station_id -> {"name", direction: trains}
+        self._stations: Dict[str, Dict[str, Dict]] = {}
+        self._zstd = zstandard.ZstdCompressor(level=self.config.SYSTEM_SNAPSHOT_ZSTD_LEVEL) if zstandard else None
+    
+    @property
+    def codings(self) -> List[str]:
+        """Content codings produced by encode"""
+        return ["gzip", "zstd"] if self._zstd else ["gzip"]
+    
+    def set_line(self, line: str, etas_by_station: Dict[str, List[Dict]], station_names: Dict[str, str]):
+        """Replace a line's stations with the ETAs just cached for it"""
+        stations: Dict[str, Dict] = {}
+        for key, trains in etas_by_station.items():
+            station_id, direction = key.split(":")
+            station = stations.setdefault(station_id, {"name": station_names.get(station_id)})
+            station[direction] = trains
+        self._stations[line] = stations
+    
+    def encode(self, pointer: Dict) -> Dict[str, bytes]:
+        """
+        Encode the snapshot for a pointer
+        
+        Args:
+            pointer: Snapshot pointer about to be published (version,
+                updated_at and the per-line version entries)
+        
+        Returns:
+            Dictionary mapping content coding ("gzip", "zstd") to bytes
+        """
+        document = {
+            "version": pointer["version"],
+            "updated_at": pointer["updated_at"],
+            "lines": {
+                line: {**entry, "stations": self._stations[line]}
+                for line, entry in pointer["lines"].items()
+                if line in self._stations
+            }
+        }
+        body = json.dumps(document, separators=(",", ":")).encode("utf-8")
+        encoded = {"gzip": gzip.compress(body, compresslevel=self.config.SYSTEM_SNAPSHOT_GZIP_LEVEL, mtime=0)}
+        if self._zstd:
+            encoded["zstd"] = self._zstd.compress(body)
+        logger.debug(
+            f"System snapshot {pointer['version']}: {len(body)} bytes, "
+            + ", ".join(f"{coding} {len(data)}" for coding, data in encoded.items())
+        )
+        return encoded
@@ -0,0 +1,47 @@
+"""
+Service for building the per-line index of active trips
+"""
+import logging
+from datetime import datetime
+from typing import Dict, List
+
+from ..config import WorkerConfig
+
+logger = logging.getLogger(__name__)
+
+
+class TripIndexBuilder:
+    """Regroups extracted ETAs by trip into remaining stop sequences"""
+    
+    def __init__(self, config: WorkerConfig = None):
+        self.config = config or WorkerConfig()
+    
+    def build(self, etas_by_station: Dict[str, List[Dict]]) -> Dict[str, Dict]:
+        """
+        Build each active trip's remaining stops with arrival epochs
+        
+        Args:
+            etas_by_station: Output of GTFSParser.extract_etas for one line
+        
+        Returns:
+            Dictionary mapping trip_id to {"direction", "stops", "arrivals"},
+            where stops and arrivals are parallel lists in travel order
+        """
+        trips: Dict[str, Dict] = {}
+        
+        for key, eta_list in etas_by_station.items():
+            station_id, direction = key.split(":")
+            for train in eta_list:
+                trip = trips.setdefault(train["train_id"], {"direction": direction, "calls": []})
+                arrival = int(datetime.fromisoformat(train["arrival_time"]).timestamp())
+                trip["calls"].append((arrival, station_id))
+        
+        index = {}
+        for trip_id, trip in trips.items():
+            calls = sorted(trip["calls"])
+            index[trip_id] = {
+                "direction": trip["direction"],
+                "stops": [station_id for _, station_id in calls],
+                "arrivals": [arrival for arrival, _ in calls]
+            }
+        return index
@@ -0,0 +1,112 @@
+"""
+WorkerService.run_cycle against a fake pipeline and cache
+"""
+import importlib
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+# main.py imports `config` and `services` as top-level modules (it runs from
+# backend/worker); point those names at the worker package
+sys.modules.setdefault("config", importlib.import_module("worker.config"))
+sys.modules.setdefault("services", importlib.import_module("worker.services"))
+main = importlib.import_module("worker.main")
+
+
+class FakePipeline:
+    """Yields canned results and fills `metrics` like FeedPipeline.run"""
+    
+    def __init__(self, results):
+        self.results = results
+        self.metrics = {}
+        self.exported = {}
+    
+    def run(self, feeds, profile_mode=None):
+        self.metrics = {
+            stage: {"items": len(self.results), "busy_seconds": 0.01, "wait_seconds": 0.0}
+            for stage in ("fetch", "parse", "write")
+        }
+        self.metrics["queues"] = {"parse": 1, "write": 0}
+        yield from self.results
+        self.metrics["cycle_seconds"] = 0.1234
+    
+    def mark_exported(self, feed_name, header_timestamp):
+        self.exported[feed_name] = header_timestamp
+
+
+class FakeCache:
+    """Records every CacheService call; `returns` overrides a call's result"""
+    
+    def __init__(self, **returns):
+        self.calls = []
+        self.returns = {"set_line_version": {"version": "1"}, "update_etas": 1, **returns}
+    
+    def __getattr__(self, name):
+        def record(*args, **kwargs):
+            self.calls.append((name, args))
+            return self.returns.get(name, True)
+        return record
+    
+    def names(self):
+        return [name for name, _ in self.calls]
+
+
+class FakeKafka(FakeCache):
+    pass
+
+
+class FakeStations:
+    index = None
+    
+    def load_if_changed(self):
+        return None
+
+
+def make_worker(results, cache=None):
+    worker = main.WorkerService()
+    worker.pipeline = FakePipeline(results)
+    worker.cache_service = cache or FakeCache()
+    worker.kafka_service = FakeKafka()
+    worker.station_catalog = FakeStations()
+    worker.config.HISTORY_ENABLED = False
+    return worker
+
+
+TRAINS = [{"eta_minutes": 3, "train_id": "t1"}]
+G_RESULT = {
+    "feed": "G",
+    "header_timestamp": 1700000000,
+    "entities": 42,
+    "exports": None,
+    "lines": {"G": {"etas": {"G22:N": TRAINS}, "status": {"line": "G"}, "trips": {}, "positions": None}}
+}
+
+
+def test_run_cycle_writes_heartbeat_and_publishes():
+    worker = make_worker([G_RESULT, {"feed": "L", "lines": ["L"], "error": "fetch failed"}])
+    
+    worker.run_cycle()
+    
+    names = worker.cache_service.names()
+    assert "publish_snapshot" in names
+    assert names.index("set_heartbeat") < names.index("publish_snapshot")
+    
+    heartbeat = next(args[0] for name, args in worker.cache_service.calls if name == "set_heartbeat")
+    assert heartbeat["pipeline_seconds"] == 0.123
+    assert set(heartbeat["pipeline"]) == {"fetch", "parse", "write", "queues"}
+    assert heartbeat["feeds"]["G"]["entities"] == 42
+    assert heartbeat["feeds"]["L"]["failures"] == 1
+
+
+def test_failed_eta_write_keeps_the_previous_line_version():
+    worker = make_worker([G_RESULT], FakeCache(update_etas=0))
+    
+    worker.run_cycle()
+    
+    names = worker.cache_service.names()
+    assert "update_etas" in names
+    assert "set_line_version" not in names
+    assert "set_trip_index" not in names
+    assert "publish_eta_state" not in worker.kafka_service.names()
+    assert "publish_snapshot" in names
@@ -0,0 +1,86 @@
+"""
+FeedPipeline failure handling: broken parse pools and abandoned cycles
+"""
+import sys
+import threading
+from concurrent.futures import Future
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from worker.config import WorkerConfig
+from worker.services import pipeline
+
+
+class FakeFetcher:
+    def fetch_feed(self, url):
+        return url.encode()
+
+
+def fake_parse(feed_name, feed_data, lines, exported_timestamp=None, profile_mode=None):
+    return {"feed": feed_name, "lines": {}, "parse_seconds": 0.0}
+
+
+class FakePool:
+    """Stands in for ProcessPoolExecutor; the first one built is broken"""
+    
+    built = []
+    
+    def __init__(self, **kwargs):
+        self.broken = not FakePool.built
+        self.shut_down = False
+        FakePool.built.append(self)
+    
+    def submit(self, fn, *args):
+        if self.broken:
+            raise BrokenProcessPool("a parse process died")
+        future = Future()
+        future.set_result(fn(*args))
+        return future
+    
+    def shutdown(self, wait=True):
+        self.shut_down = True
+
+
+def make_config(parse_workers, queue_size=2):
+    config = WorkerConfig()
+    config.PIPELINE_FETCH_WORKERS = 4
+    config.PIPELINE_PARSE_WORKERS = parse_workers
+    config.PIPELINE_QUEUE_SIZE = queue_size
+    return config
+
+
+def make_feeds(count):
+    return [(f"feed{i}", f"url{i}", ["L"]) for i in range(count)]
+
+
+def test_broken_pool_yields_errors_and_is_replaced(monkeypatch):
+    FakePool.built = []
+    monkeypatch.setattr(pipeline, "ProcessPoolExecutor", FakePool)
+    monkeypatch.setattr(pipeline, "parse_and_extract", fake_parse)
+    feed_pipeline = pipeline.FeedPipeline(FakeFetcher(), make_config(parse_workers=2))
+    
+    results = list(feed_pipeline.run(make_feeds(4)))
+    
+    assert sorted(result["feed"] for result in results) == ["feed0", "feed1", "feed2", "feed3"]
+    assert sum("error" in result for result in results) == 1
+    assert len(FakePool.built) == 2
+    assert FakePool.built[0].shut_down
+    assert feed_pipeline._parse_pool is FakePool.built[1]
+    feed_pipeline.close()
+
+
+def test_leaving_early_releases_stage_threads(monkeypatch):
+    monkeypatch.setattr(pipeline, "parse_and_extract", fake_parse)
+    feed_pipeline = pipeline.FeedPipeline(FakeFetcher(), make_config(parse_workers=0, queue_size=1))
+    
+    results = feed_pipeline.run(make_feeds(8))
+    next(results)
+    results.close()
+    
+    assert not any(thread.name == "feed-dispatch" for thread in threading.enumerate())
+    closer = threading.Thread(target=feed_pipeline.close)
+    closer.start()
+    closer.join(timeout=5)
+    assert not closer.is_alive()
@@ -0,0 +1,69 @@
+"""
+CycleProfiler: parse jobs profiled elsewhere are merged into the cycle's file
+"""
+import pstats
+import sys
+import time
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from worker.config import WorkerConfig
+from worker.services.profiler import CycleProfiler, profile_parse
+
+
+def busy(seconds):
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        pass
+
+
+def make_profiler(tmp_path, mode):
+    config = WorkerConfig()
+    config.PROFILE_DIR = str(tmp_path)
+    config.PROFILE_MODE = mode
+    config.PROFILE_SAMPLE_INTERVAL_MS = 1
+    profiler = CycleProfiler(config)
+    profiler.arm(1)
+    return profiler
+
+
+def test_sampled_parse_jobs_land_in_the_cycle_file(tmp_path):
+    profiler = make_profiler(tmp_path, "sample")
+    assert profiler.parse_mode is None
+    
+    with profiler.cycle():
+        with profile_parse(profiler.parse_mode, "feed=ACE;stage=parse", 0.001) as profiled:
+            busy(0.05)
+        profiler.merge_parse(profiled["profile"])
+    
+    assert profiler.parse_mode is None
+    folded = next(tmp_path.glob("*.folded")).read_text()
+    assert any(line.startswith("feed=ACE;stage=parse;") and "busy" in line for line in folded.splitlines())
+
+
+def test_cprofile_parse_jobs_land_in_the_cycle_file(tmp_path):
+    profiler = make_profiler(tmp_path, "cprofile")
+    collected = {}
+    
+    def parse_job(mode):
+        # Another thread, out of sight of the cycle's own cProfile
+        with profile_parse(mode, "feed=ACE;stage=parse", 0.001) as profiled:
+            busy(0.01)
+        collected.update(profiled)
+    
+    with profiler.cycle():
+        job = threading.Thread(target=parse_job, args=(profiler.parse_mode,))
+        job.start()
+        job.join()
+        profiler.merge_parse(collected["profile"])
+    
+    stats = pstats.Stats(str(next(tmp_path.glob("*.prof"))))
+    assert any(func[2] == "busy" for func in stats.stats)
+
+
+def test_unprofiled_parse_jobs_return_no_profile():
+    with profile_parse(None, "feed=ACE;stage=parse", 0.001) as profiled:
+        busy(0.001)
+    assert profiled["profile"] is None
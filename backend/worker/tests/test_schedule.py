@@ -0,0 +1,79 @@
+"""
+ScheduleEngine.scheduled_arrival against a brute-force search of a small index
+"""
+import random
+import sys
+from array import array
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from worker.config import WorkerConfig
+from worker.services.schedule import ScheduleEngine
+from worker.services.static_index import StaticIndex
+
+STOPS = [f"{station}{direction}" for station in ("101", "102", "103", "104") for direction in ("N", "S")]
+
+
+def make_index(seed=7):
+    rng = random.Random(seed)
+    trip_ids = [f"AFA23GEN-1092-Weekday-00_{i:06d}_1..N" for i in range(40)]
+    rows = []
+    for trip_idx in range(len(trip_ids)):
+        start = rng.randrange(0, 26 * 3600)
+        for order, stop_idx in enumerate(rng.sample(range(len(STOPS)), 5)):
+            rows.append((stop_idx, start + order * 120, trip_idx))
+    rows.sort()
+    offsets = [0] * (len(STOPS) + 1)
+    for stop_idx, _, _ in rows:
+        offsets[stop_idx + 1] += 1
+    for i in range(len(STOPS)):
+        offsets[i + 1] += offsets[i]
+    
+    header = {
+        "stops": {"id": STOPS, "name": STOPS, "lat": [0.0] * len(STOPS), "lon": [0.0] * len(STOPS), "parent": [-1] * len(STOPS)},
+        "routes": {"id": ["1"], "line": ["1"]},
+        "lines": {"1": []},
+        "services": {"id": ["Weekday"], "rules": [{"removed": [], "added": [], "days": [1] * 7, "start": "20000101", "end": "29991231"}]},
+        "trips": trip_ids
+    }
+    columns = {
+        "trip_route": array("H", [0] * len(trip_ids)),
+        "trip_service": array("H", [0] * len(trip_ids)),
+        "trip_direction": array("B", [0] * len(trip_ids)),
+        "sched_offsets": array("I", offsets),
+        "sched_arrival": array("I", (arrival for _, arrival, _ in rows)),
+        "sched_trip": array("I", (trip for _, _, trip in rows))
+    }
+    return StaticIndex(header, columns), rows
+
+
+def brute_force(engine, rows, trip_idx, stop_idx, predicted):
+    best = None
+    for day in engine._service_days(predicted):
+        start = engine.service_day_start(day)
+        for row_stop, arrival, row_trip in rows:
+            gap = abs(start + arrival - predicted)
+            if row_trip == trip_idx and row_stop == stop_idx and gap <= engine.config.SCHEDULE_MATCH_WINDOW_SECONDS:
+                if best is None or gap < best[0]:
+                    best = (gap, start + arrival)
+    return best[1] if best else None
+
+
+def test_scheduled_arrival_matches_brute_force():
+    index, rows = make_index()
+    engine = ScheduleEngine(index, WorkerConfig())
+    rng = random.Random(3)
+    midnight = datetime(2026, 3, 4, tzinfo=engine.tz).timestamp()
+    matched = 0
+    for _ in range(300):
+        stop_idx, arrival, trip_idx = rng.choice(rows)
+        predicted = midnight + arrival + rng.randrange(-5400, 5400) + rng.choice((0, -86400, 86400))
+        expected = brute_force(engine, rows, trip_idx, stop_idx, predicted)
+        # Realtime feeds use the ID without the schedule prefix
+        realtime_id = index.trip_ids[trip_idx].split("_", 1)[1]
+        assert engine.scheduled_arrival(realtime_id, STOPS[stop_idx], predicted) == expected
+        matched += expected is not None
+    assert matched > 100
+    assert engine.scheduled_arrival("unknown", STOPS[0], midnight) is None
@@ -0,0 +1,31 @@
+"""
+SnapshotStore history: streams are written as indexed chunks and load back unchanged
+"""
+import sys
+import json
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from worker.services import snapshot_file
+from worker.services.snapshot_file import SnapshotStore, read_snapshot_file, write_snapshot_file
+
+
+def test_history_chunks_round_trip(tmp_path, monkeypatch):
+    monkeypatch.setattr(snapshot_file, "STREAM_CHUNK_ENTRIES", 4)
+    store = SnapshotStore()
+    ids = [store.xadd("history:{L}", {"t": str(i), "a": i}) for i in range(10)]
+    path = str(tmp_path / "history.snap")
+    write_snapshot_file(path, store.stream_entries())
+    
+    keys = [key for key, _, _ in read_snapshot_file(path)]
+    assert keys == sorted(keys)
+    assert len(keys) == 3
+    
+    loaded = SnapshotStore()
+    assert loaded.load(path) == 3
+    chunks = loaded._streams["history:{L}"]
+    assert [chunk.ids for chunk in chunks] == [chunk.ids for chunk in store._streams["history:{L}"]]
+    assert json.loads(chunks[-1].payloads[-1]) == {"t": "9", "a": "9"}
+    last_id = tuple(map(int, ids[-1].split("-")))
+    assert tuple(map(int, loaded.xadd("history:{L}", {"t": "10"}).split("-"))) > last_id
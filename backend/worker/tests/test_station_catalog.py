@@ -0,0 +1,46 @@
+"""
+StationCatalogLoader: a GTFS zip newer than the static index takes precedence
+"""
+import os
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+
+from worker.config import WorkerConfig
+from worker.services import station_catalog
+from worker.services.station_catalog import StationCatalogLoader
+
+
+class FakeIndex:
+    def station_catalog(self, lines):
+        return {"G": [{"id": "G22", "source": "index"}]}
+
+
+def make_loader(tmp_path, monkeypatch):
+    config = WorkerConfig()
+    config.GTFS_STATIC_INDEX_PATH = str(tmp_path / "gtfs_static.idx")
+    config.GTFS_STATIC_PATH = str(tmp_path / "gtfs_subway.zip")
+    loader = StationCatalogLoader(config)
+    monkeypatch.setattr(station_catalog.StaticIndex, "load", classmethod(lambda cls, path: FakeIndex()))
+    monkeypatch.setattr(loader, "compile", lambda path: {"G": [{"id": "G22", "source": "zip"}]})
+    return loader
+
+
+def touch(path, mtime):
+    path.write_bytes(b"")
+    os.utime(path, (mtime, mtime))
+
+
+def test_newer_zip_is_compiled_over_the_index(tmp_path, monkeypatch):
+    loader = make_loader(tmp_path, monkeypatch)
+    touch(tmp_path / "gtfs_static.idx", 1000)
+    touch(tmp_path / "gtfs_subway.zip", 900)
+    assert loader.load_if_changed()["G"][0]["source"] == "index"
+    assert loader.load_if_changed() is None
+    
+    touch(tmp_path / "gtfs_subway.zip", 2000)
+    assert loader.load_if_changed()["G"][0]["source"] == "zip"
+    
+    touch(tmp_path / "gtfs_static.idx", 3000)
+    assert loader.load_if_changed()["G"][0]["source"] == "index"
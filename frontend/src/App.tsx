@@ -137,7 +137,7 @@ function AppContent() {
       try {
         const API_BASE = import.meta.env.VITE_API_URL || '/api'
         const response = await axios.get(
-          `${API_BASE}/stations/${selectedLine}`,
+          `${API_BASE}/eta/stations/${selectedLine}`,
           {
             headers: { Authorization: `Bearer ${authToken}` },
           }
@@ -245,6 +245,7 @@ function AppContent() {
                 line={selectedLine}
                 stations={allStations}
                 userLocation={userLocation}
+                authToken={authToken}
               />
             </div>
           </div>
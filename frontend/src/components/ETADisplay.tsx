@@ -88,6 +88,8 @@ export default function ETADisplay({
         return 'bg-red-100 text-red-800'
       case 'early':
         return 'bg-blue-100 text-blue-800'
+      case 'scheduled':
+        return 'bg-yellow-100 text-yellow-800'
       default:
         return 'bg-gray-100 text-gray-800'
     }
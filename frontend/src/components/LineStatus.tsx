@@ -1,5 +1,8 @@
 import { useQuery } from 'react-query'
 import axios from 'axios'
+import { LineStatusResponse, LineStatusSummary } from '../types'
+
+const API_BASE = import.meta.env.VITE_API_URL || '/api'
 
 interface LineStatusProps {
   lines: string[]
@@ -7,9 +10,29 @@ interface LineStatusProps {
 }
 
 export default function LineStatus({ lines, authToken }: LineStatusProps) {
-  // This is a simplified status component
-  // In production, you'd fetch line status from an API endpoint
-  
+  // Summaries are precomputed by the worker; one request covers every line
+  const { data } = useQuery(
+    ['lineStatus'],
+    async () => {
+      const response = await axios.get<LineStatusResponse>(`${API_BASE}/lines/status`, {
+        headers: { Authorization: `Bearer ${authToken}` },
+      })
+      return response.data
+    },
+    { enabled: !!authToken, refetchInterval: 30000 }
+  )
+  const statusByLine: Record<string, LineStatusSummary> = {}
+  data?.lines.forEach((summary) => {
+    statusByLine[summary.line] = summary
+  })
+
+  const statusDot: Record<string, string> = {
+    good_service: 'bg-green-500',
+    gaps: 'bg-yellow-500',
+    stale: 'bg-gray-400',
+    no_service: 'bg-red-500',
+  }
+
   const lineColors: Record<string, string> = {
     '1': '#EE352E', // Red
     '2': '#EE352E', // Red
@@ -57,7 +80,17 @@ export default function LineStatus({ lines, authToken }: LineStatusProps) {
               {line}
             </div>
             <span className="text-sm font-semibold text-gray-700">Line {line}</span>
-            <span className="w-2 h-2 rounded-full bg-green-500 animate-pulse"></span>
+            {statusByLine[line] && (
+              <span className="text-xs text-gray-500">
+                {statusByLine[line].directions.reduce((n, d) => n + d.active_trains, 0)} trains
+              </span>
+            )}
+            <span
+              className={`w-2 h-2 rounded-full animate-pulse ${
+                statusDot[statusByLine[line]?.status] || 'bg-green-500'
+              }`}
+              title={statusByLine[line]?.status.replace('_', ' ')}
+            ></span>
           </div>
         ))}
       </div>
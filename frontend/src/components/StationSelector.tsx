@@ -57,7 +57,7 @@ export default function StationSelector({
       try {
         const API_BASE = import.meta.env.VITE_API_URL || '/api'
         const response = await axios.get(
-          `${API_BASE}/stations/${selectedLine}`,
+          `${API_BASE}/eta/stations/${selectedLine}`,
           {
             headers: { Authorization: `Bearer ${authToken}` },
           }
@@ -1,26 +1,15 @@
 import { useEffect, useMemo, useState } from 'react'
-import { MapContainer, TileLayer, Marker, Popup, useMap, Polyline } from 'react-leaflet'
+import { MapContainer, TileLayer, Marker, Popup, useMap, Polyline, CircleMarker } from 'react-leaflet'
 import L from 'leaflet'
 import 'leaflet/dist/leaflet.css'
+import { useQuery } from 'react-query'
+import axios from 'axios'
+import { PositionsResponse, StationManifest } from '../types'
+import { useStationShards } from '../hooks/useStationShards'
 
-// Import accurate station coordinates from GTFS data
-import stationData from '../data/station_coords.json'
+const API_BASE = import.meta.env.VITE_API_URL || '/api'
 
-// Convert the loaded data to our format
-const ACCURATE_STATION_COORDS: Record<string, { lat: number; lon: number; line: string; name: string; order: number }> = {}
-
-if (stationData && (stationData as any).stations) {
-  Object.entries((stationData as any).stations).forEach(([id, station]: [string, any]) => {
-    ACCURATE_STATION_COORDS[id] = {
-      lat: station.lat,
-      lon: station.lon,
-      line: station.line,
-      name: station.name,
-      order: station.order
-    }
-  })
-  console.log(`Loaded ${Object.keys(ACCURATE_STATION_COORDS).length} accurate station coordinates from GTFS data`)
-}
+type StationCoords = Record<string, { lat: number; lon: number; line: string; name: string; order: number }>
 
 // Fix for default marker icons in React-Leaflet
 import icon from 'leaflet/dist/images/marker-icon.png'
@@ -57,29 +46,20 @@ interface SubwayMapProps {
     lat: number
     lon: number
   } | null
+  authToken?: string
 }
 
-// Use accurate coordinates if available, otherwise empty
-const STATION_COORDS = ACCURATE_STATION_COORDS
-
-// Calculate bounds from all stations
-function calculateBounds() {
-  const allCoords = Object.values(STATION_COORDS)
-  if (allCoords.length === 0) {
-    // Default to NYC area if no stations
+// Bounds of the whole system, from the station manifest
+function calculateBounds(manifest?: StationManifest) {
+  if (!manifest?.bounds) {
+    // Default to NYC area until the manifest loads
     return L.latLngBounds(
       [40.5, -74.3],
       [41.0, -73.7]
     )
   }
 
-  const lats = allCoords.map(c => c.lat)
-  const lons = allCoords.map(c => c.lon)
-  
-  return L.latLngBounds(
-    [Math.min(...lats), Math.min(...lons)],
-    [Math.max(...lats), Math.max(...lons)]
-  )
+  return L.latLngBounds(manifest.bounds[0], manifest.bounds[1])
 }
 
 function MapBounds({ bounds }: { bounds: L.LatLngBounds | null }) {
@@ -97,7 +77,7 @@ function MapBounds({ bounds }: { bounds: L.LatLngBounds | null }) {
   return null
 }
 
-function MapUpdater({ selectedStation }: { selectedStation?: SubwayMapProps['selectedStation'] }) {
+function MapUpdater({ selectedStation, stationCoords }: { selectedStation?: SubwayMapProps['selectedStation']; stationCoords: StationCoords }) {
   const map = useMap()
   
   useEffect(() => {
@@ -107,7 +87,7 @@ function MapUpdater({ selectedStation }: { selectedStation?: SubwayMapProps['sel
         duration: 0.8
       })
     } else if (selectedStation?.id) {
-      const station = STATION_COORDS[selectedStation.id]
+      const station = stationCoords[selectedStation.id]
       if (station) {
         map.setView([station.lat, station.lon], 15, {
           animate: true,
@@ -115,7 +95,7 @@ function MapUpdater({ selectedStation }: { selectedStation?: SubwayMapProps['sel
         })
       }
     }
-  }, [selectedStation, map])
+  }, [selectedStation, stationCoords, map])
   
   return null
 }
@@ -180,9 +160,39 @@ const createSubwayMarker = (line: string, lineColor: string, isSelected: boolean
   })
 }
 
-export default function SubwayMap({ selectedStation, line, stations, userLocation }: SubwayMapProps) {
+export default function SubwayMap({ selectedStation, line, stations, userLocation, authToken }: SubwayMapProps) {
   const [isFullscreen, setIsFullscreen] = useState(false)
   
+  // Station coordinates come from the per-line shards, fetched only for
+  // the selected line (keyed line + stop ID, e.g. "1101")
+  const { manifest, stations: shardStations } = useStationShards(line ? [line] : [])
+  const STATION_COORDS = useMemo(() => {
+    const coords: StationCoords = {}
+    shardStations.forEach(station => {
+      coords[`${station.line}${station.stopId}`] = {
+        lat: station.lat,
+        lon: station.lon,
+        line: station.line,
+        name: station.name,
+        order: station.order
+      }
+    })
+    return coords
+  }, [shardStations])
+  
+  // Live train positions for the selected line; the API answers 304 while
+  // the worker has not published a new snapshot
+  const { data: positions } = useQuery(
+    ['positions', line],
+    async () => {
+      const response = await axios.get<PositionsResponse>(`${API_BASE}/positions/${line}`, {
+        headers: { Authorization: `Bearer ${authToken}` },
+      })
+      return response.data
+    },
+    { enabled: !!line && !!authToken, refetchInterval: 15000 }
+  )
+  
   const lineColors: Record<string, string> = {
     '1': '#EE352E', // Red
     '2': '#EE352E', // Red
@@ -208,8 +218,8 @@ export default function SubwayMap({ selectedStation, line, stations, userLocatio
     'M': '#FF6319', // Orange (also Brown when running on J/Z)
   }
 
-  // Calculate bounds from all stations
-  const bounds = useMemo(() => calculateBounds(), [])
+  // Fit the whole system once the manifest is in
+  const bounds = useMemo(() => calculateBounds(manifest), [manifest])
   
   // Get center point for initial view
   const center: [number, number] = [40.7589, -73.9851] // NYC center
@@ -240,7 +250,7 @@ export default function SubwayMap({ selectedStation, line, stations, userLocatio
     })
     
     return routeCoords
-  }, [])
+  }, [STATION_COORDS])
 
   const toggleFullscreen = () => {
     setIsFullscreen(!isFullscreen)
@@ -309,7 +319,7 @@ export default function SubwayMap({ selectedStation, line, stations, userLocatio
         />
         
         <MapBounds bounds={bounds} />
-        <MapUpdater selectedStation={selectedStation} />
+        <MapUpdater selectedStation={selectedStation} stationCoords={STATION_COORDS} />
         
         {/* Show user location marker */}
         {userLocation && (
@@ -366,7 +376,7 @@ export default function SubwayMap({ selectedStation, line, stations, userLocatio
           </Marker>
         )}
         
-        {/* Draw route lines for all lines - properly ordered */}
+        {/* Draw route lines for the loaded lines - properly ordered */}
         {Object.entries(routeLines).map(([lineKey, points]) => {
           if (points.length < 2) return null
           const lineColor = lineColors[lineKey] || '#666'
@@ -423,6 +433,26 @@ export default function SubwayMap({ selectedStation, line, stations, userLocatio
             </Marker>
           )
         })}
+        {/* Live train positions on the selected line */}
+        {positions?.trains.map(([tripId, direction, trainStatus, currentStop, nextStop, , lat, lon]) => (
+          <CircleMarker
+            key={tripId}
+            center={[lat, lon]}
+            radius={6}
+            pathOptions={{ color: 'white', weight: 2, fillColor: lineColors[positions.line] || '#666', fillOpacity: 1 }}
+          >
+            <Popup>
+              <div className="text-center">
+                <div className="font-bold">{positions.line} train {direction === 'N' ? 'Northbound' : 'Southbound'}</div>
+                <div className="text-xs text-gray-600 mt-1">
+                  {trainStatus === 'stopped_at'
+                    ? `At ${STATION_COORDS[`${positions.line}${currentStop}`]?.name || currentStop}`
+                    : `To ${STATION_COORDS[`${positions.line}${nextStop}`]?.name || nextStop}`}
+                </div>
+              </div>
+            </Popup>
+          </CircleMarker>
+        ))}
       </MapContainer>
       
       {/* Map legend */}
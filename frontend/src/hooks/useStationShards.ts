@@ -0,0 +1,50 @@
+import { useMemo } from 'react'
+import { useQueries, useQuery, UseQueryResult } from 'react-query'
+import axios from 'axios'
+import { StationManifest, StationShard } from '../types'
+
+const SHARD_BASE = '/stations'
+
+export interface ShardStation {
+  stopId: string
+  lat: number
+  lon: number
+  line: string
+  name: string
+  order: number
+}
+
+// Loads the station manifest and the shards of the requested lines only.
+// Shard files are content-addressed, so once fetched they never change
+// and never need refetching.
+export function useStationShards(lines: string[]) {
+  const { data: manifest } = useQuery(
+    ['station-manifest'],
+    async () => (await axios.get<StationManifest>(`${SHARD_BASE}/manifest.json`)).data,
+    { staleTime: Infinity }
+  )
+
+  const files = manifest ? lines.map(line => manifest.lines[line]?.file).filter((file): file is string => !!file) : []
+  const shards = useQueries(
+    files.map(file => ({
+      queryKey: ['station-shard', file],
+      queryFn: async () => (await axios.get<StationShard>(`${SHARD_BASE}/${file}`)).data,
+      staleTime: Infinity,
+      cacheTime: Infinity,
+    }))
+  ) as UseQueryResult<StationShard>[]
+
+  const loadedAt = shards.map(shard => shard.dataUpdatedAt).join(',')
+  const stations = useMemo(() => {
+    const loaded: ShardStation[] = []
+    shards.forEach(({ data }) => {
+      data?.stations.forEach(([stopId, name, lat, lon, order]) => {
+        loaded.push({ stopId, lat, lon, line: data.line, name, order })
+      })
+    })
+    return loaded
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [loadedAt])
+
+  return { manifest, stations }
+}
@@ -3,7 +3,8 @@ export interface Train {
   eta_minutes: number
   train_id: string
   route_id: string
-  status: 'on_time' | 'delayed' | 'early'
+  status: 'on_time' | 'delayed' | 'early' | 'unscheduled' | 'scheduled'
+  delay_seconds?: number | null
 }
 
 export interface DirectionETA {
@@ -19,3 +20,54 @@ export interface ETAResponse {
   last_updated?: string
 }
 
+export interface DirectionStatus {
+  direction: string
+  active_trains: number
+  median_headway_minutes?: number
+  max_headway_minutes?: number
+  key_stations: string[]
+}
+
+export interface LineStatusSummary {
+  line: string
+  status: 'good_service' | 'gaps' | 'no_service' | 'stale'
+  directions: DirectionStatus[]
+  feed_timestamp?: number
+  feed_age_seconds?: number
+  updated_at?: string
+}
+
+export interface LineStatusResponse {
+  lines: LineStatusSummary[]
+  updated_at?: string
+}
+
+// Packed per-line train positions: one array per train in `fields` order
+// (trip_id, direction, status, current_stop, next_stop, progress, lat, lon, timestamp)
+export type TrainPositionRow = [string, string, string, string | null, string | null, number, number, number, number | null]
+
+export interface PositionsResponse {
+  line: string
+  version: string
+  updated_at: number
+  fields: string[]
+  trains: TrainPositionRow[]
+}
+
+// Per-line station shards written by scripts/fetch_gtfs_stations.py to
+// public/stations/ (manifest.json plus <line>.<hash>.json)
+export type StationShardRow = [string, string, number, number, number] // stop_id, name, lat, lon, order
+
+export interface StationShard {
+  line: string
+  fields: string[]
+  stations: StationShardRow[]
+}
+
+export interface StationManifest {
+  version: string
+  generated_from: string
+  fields: string[]
+  bounds: [[number, number], [number, number]] | null
+  lines: Record<string, { file: string; stations: number; bytes: number }>
+}
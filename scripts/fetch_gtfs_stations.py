@@ -1,131 +1,275 @@
 #!/usr/bin/env python3
-"""Parse MTA GTFS static data to extract accurate station coordinates"""
+"""Parse MTA GTFS static data to extract accurate station coordinates
+
+Streams every zip member through io.TextIOWrapper (stop_times.txt is read
+exactly once) and writes three outputs:
+
+- frontend/src/data/station_coords.json: station coordinates and ordering
+  for the frontend map (unchanged format)
+- frontend/public/stations/: the same stations as minified per-line shards
+  named by content hash (<line>.<hash>.json, one packed row per station)
+  plus manifest.json mapping each line to its shard, so the map fetches
+  only the lines it shows and the shards can be cached as immutable
+- scripts/gtfs_static.idx: a compact columnar index of stops, parent
+  stations, routes, per-line ordered stops, trips, calendars and scheduled
+  arrivals per stop, which the worker loads in milliseconds
+
+Index file layout (little-endian):
+    b"NYCSIDX1" | u32 header length | header JSON | column bytes
+The header holds small tables (stops, routes, lines, services, trips) and,
+under "columns", the typecode/offset/length of each array.array column
+relative to the start of the column bytes. Scheduled arrivals are sorted by
+(stop, arrival) with a CSR offset column per stop, so "next arrivals at stop
+X after time T" is a bisect over one contiguous slice.
+"""
+import io
+import sys
+import csv
 import json
+import struct
+import hashlib
 import zipfile
-import csv
+from array import array
 from pathlib import Path
 from collections import defaultdict
+from typing import Dict, List, Tuple
+
+INDEX_MAGIC = b"NYCSIDX1"
+INDEX_FORMAT_VERSION = 1
+
+# Column order of each station row in a per-line shard
+SHARD_FIELDS = ["stop_id", "name", "lat", "lon", "order"]
+SHARD_HASH_LENGTH = 8
+
+
+def open_csv(zip_ref: zipfile.ZipFile, member: str) -> csv.DictReader:
+    """Stream a zip member as CSV rows without reading it into memory"""
+    return csv.DictReader(io.TextIOWrapper(zip_ref.open(member), encoding='utf-8-sig'))
 
-def parse_gtfs_stops(gtfs_path: str) -> dict:
-    """Parse stops.txt to get station coordinates"""
+
+def parse_time(value: str) -> int:
+    """Parse a GTFS HH:MM:SS time (may exceed 24:00:00) into seconds"""
+    hours, minutes, seconds = value.split(':')
+    return int(hours) * 3600 + int(minutes) * 60 + int(seconds)
+
+
+def parse_gtfs_stops(zip_ref: zipfile.ZipFile) -> Dict[str, Dict]:
+    """Parse stops.txt to get station coordinates and parent stations"""
     stops = {}
     
-    with zipfile.ZipFile(gtfs_path, 'r') as zip_ref:
-        if 'stops.txt' not in zip_ref.namelist():
-            print("Error: stops.txt not found in GTFS data")
-            return stops
+    if 'stops.txt' not in zip_ref.namelist():
+        print("Error: stops.txt not found in GTFS data")
+        return stops
+    
+    for row in open_csv(zip_ref, 'stops.txt'):
+        stop_id = row.get('stop_id', '').strip()
+        stop_lat = row.get('stop_lat', '').strip()
+        stop_lon = row.get('stop_lon', '').strip()
+        location_type = row.get('location_type', '').strip() or '0'
         
-        with zip_ref.open('stops.txt') as f:
-            reader = csv.DictReader(f.read().decode('utf-8').splitlines())
-            for row in reader:
-                stop_id = row.get('stop_id', '').strip()
-                stop_name = row.get('stop_name', '').strip()
-                stop_lat = row.get('stop_lat', '').strip()
-                stop_lon = row.get('stop_lon', '').strip()
-                location_type = row.get('location_type', '0').strip()
-                
-                # Only process stations (location_type 0 or 1)
-                if location_type in ['0', '1'] and stop_lat and stop_lon:
-                    try:
-                        stops[stop_id] = {
-                            'id': stop_id,
-                            'name': stop_name,
-                            'lat': float(stop_lat),
-                            'lon': float(stop_lon),
-                            'location_type': int(location_type)
-                        }
-                    except ValueError:
-                        continue
+        # Only process stations (location_type 0 or 1)
+        if location_type in ['0', '1'] and stop_lat and stop_lon:
+            try:
+                stops[stop_id] = {
+                    'id': stop_id,
+                    'name': row.get('stop_name', '').strip(),
+                    'lat': float(stop_lat),
+                    'lon': float(stop_lon),
+                    'location_type': int(location_type),
+                    'parent': row.get('parent_station', '').strip()
+                }
+            except ValueError:
+                continue
     
     print(f"Parsed {len(stops)} stops")
     return stops
 
-def parse_gtfs_routes(gtfs_path: str) -> Dict[str, str]:
+
+def parse_gtfs_routes(zip_ref: zipfile.ZipFile) -> Dict[str, str]:
     """Parse routes.txt to map route IDs to line identifiers"""
     routes = {}
     
-    with zipfile.ZipFile(gtfs_path, 'r') as zip_ref:
-        if 'routes.txt' not in zip_ref.namelist():
-            print("Warning: routes.txt not found")
-            return routes
-        
-        with zip_ref.open('routes.txt') as f:
-            reader = csv.DictReader(f.read().decode('utf-8').splitlines())
-            for row in reader:
-                route_id = row.get('route_id', '').strip()
-                route_short_name = row.get('route_short_name', '').strip()
-                route_long_name = row.get('route_long_name', '').strip()
-                
-                if route_id and route_short_name:
-                    routes[route_id] = route_short_name
+    if 'routes.txt' not in zip_ref.namelist():
+        print("Warning: routes.txt not found")
+        return routes
+    
+    for row in open_csv(zip_ref, 'routes.txt'):
+        route_id = row.get('route_id', '').strip()
+        route_short_name = row.get('route_short_name', '').strip()
+        if route_id and route_short_name:
+            routes[route_id] = route_short_name
     
     print(f"Parsed {len(routes)} routes")
     return routes
 
-def parse_gtfs_stop_times(gtfs_path: str, routes: Dict[str, str], stops: Dict) -> Dict[str, List[Tuple[str, int]]]:
-    """Parse stop_times.txt and trips.txt to get station ordering per line"""
-    # Map: line -> [(stop_id, order), ...]
-    line_stations = defaultdict(list)
-    
-    # First, get trip to route mapping
-    trip_to_route = {}
-    with zipfile.ZipFile(gtfs_path, 'r') as zip_ref:
-        if 'trips.txt' in zip_ref.namelist():
-            with zip_ref.open('trips.txt') as f:
-                reader = csv.DictReader(f.read().decode('utf-8').splitlines())
-                for row in reader:
-                    trip_id = row.get('trip_id', '').strip()
-                    route_id = row.get('route_id', '').strip()
-                    if trip_id and route_id:
-                        trip_to_route[trip_id] = route_id
-        
-        # Then parse stop_times to get ordering
-        # Use a single representative trip per route for consistent ordering
-        route_trips = defaultdict(list)
-        if 'stop_times.txt' in zip_ref.namelist():
-            with zip_ref.open('stop_times.txt') as f:
-                reader = csv.DictReader(f.read().decode('utf-8').splitlines())
-                for row in reader:
-                    trip_id = row.get('trip_id', '').strip()
-                    route_id = trip_to_route.get(trip_id)
-                    if route_id and route_id in routes:
-                        if trip_id not in route_trips[route_id]:
-                            route_trips[route_id].append(trip_id)
-        
-        # Now get stations for one representative trip per route
-        if 'stop_times.txt' in zip_ref.namelist():
-            with zip_ref.open('stop_times.txt') as f:
-                reader = csv.DictReader(f.read().decode('utf-8').splitlines())
-                trip_stations = defaultdict(list)  # trip_id -> [(stop_id, sequence)]
-                
-                for row in reader:
-                    trip_id = row.get('trip_id', '').strip()
-                    stop_id = row.get('stop_id', '').strip()
-                    sequence = row.get('stop_sequence', '').strip()
-                    
-                    if not trip_id or not stop_id or not sequence:
-                        continue
-                    
-                    try:
-                        seq = int(sequence)
-                        trip_stations[trip_id].append((stop_id, seq))
-                    except ValueError:
-                        continue
-                
-                # For each route, use the first trip and sort by sequence
-                for route_id, trip_ids in route_trips.items():
-                    if not trip_ids:
-                        continue
-                    line = routes[route_id]
-                    # Use first trip for this route
-                    representative_trip = trip_ids[0]
-                    if representative_trip in trip_stations:
-                        stations = trip_stations[representative_trip]
-                        stations.sort(key=lambda x: x[1])  # Sort by sequence
-                        line_stations[line] = stations
+
+def parse_gtfs_trips(zip_ref: zipfile.ZipFile, routes: Dict[str, str]) -> Dict[str, Tuple[str, str, int]]:
+    """Parse trips.txt to map trip IDs to (route_id, service_id, direction_id)"""
+    trips = {}
+    
+    if 'trips.txt' not in zip_ref.namelist():
+        print("Warning: trips.txt not found")
+        return trips
+    
+    for row in open_csv(zip_ref, 'trips.txt'):
+        trip_id = row.get('trip_id', '').strip()
+        route_id = row.get('route_id', '').strip()
+        if trip_id and route_id in routes:
+            direction = row.get('direction_id', '').strip()
+            trips[trip_id] = (route_id, row.get('service_id', '').strip(), int(direction) if direction else 0)
+    
+    print(f"Parsed {len(trips)} trips")
+    return trips
+
+
+def parse_gtfs_calendar(zip_ref: zipfile.ZipFile) -> Dict[str, Dict]:
+    """Parse calendar.txt and calendar_dates.txt into per-service rules"""
+    services: Dict[str, Dict] = defaultdict(lambda: {
+        'days': [0] * 7, 'start': '', 'end': '', 'added': [], 'removed': []
+    })
+    weekdays = ['monday', 'tuesday', 'wednesday', 'thursday', 'friday', 'saturday', 'sunday']
+    
+    if 'calendar.txt' in zip_ref.namelist():
+        for row in open_csv(zip_ref, 'calendar.txt'):
+            service = services[row['service_id'].strip()]
+            service['days'] = [int(row.get(day, '0') or 0) for day in weekdays]
+            service['start'] = row.get('start_date', '').strip()
+            service['end'] = row.get('end_date', '').strip()
+    
+    if 'calendar_dates.txt' in zip_ref.namelist():
+        for row in open_csv(zip_ref, 'calendar_dates.txt'):
+            service = services[row['service_id'].strip()]
+            bucket = 'added' if row.get('exception_type', '').strip() == '1' else 'removed'
+            service[bucket].append(row.get('date', '').strip())
     
+    print(f"Parsed {len(services)} service calendars")
+    return dict(services)
+
+
+def resolve_station(stop_id: str, stops: Dict[str, Dict]) -> str:
+    """Map a platform stop ID to its station ID with dict lookups only"""
+    stop = stops.get(stop_id)
+    if stop and stop['parent'] in stops:
+        return stop['parent']
+    base_stop_id = stop_id.rstrip('NS')
+    if base_stop_id in stops:
+        return base_stop_id
+    return stop_id if stop else ''
+
+
+def parse_gtfs_stop_times(
+    zip_ref: zipfile.ZipFile,
+    trips: Dict[str, Tuple[str, str, int]],
+    stop_index: Dict[str, int]
+) -> Dict:
+    """
+    Single streaming pass over stop_times.txt
+    
+    Collects, in one read:
+    - the first trip seen per route (representative trip for the map JSON)
+    - each trip's stop sequence (for per-line stop patterns)
+    - scheduled arrival rows (stop, arrival seconds, trip) for the index
+    """
+    first_trip: Dict[str, str] = {}
+    trip_calls: Dict[str, List[Tuple[int, int]]] = defaultdict(list)
+    trip_order: Dict[str, int] = {}
+    sched_stop = array('I')
+    sched_arrival = array('I')
+    sched_trip = array('I')
+    
+    if 'stop_times.txt' not in zip_ref.namelist():
+        print("Warning: stop_times.txt not found")
+    else:
+        for row in open_csv(zip_ref, 'stop_times.txt'):
+            trip_id = row.get('trip_id', '').strip()
+            trip = trips.get(trip_id)
+            stop_idx = stop_index.get(row.get('stop_id', '').strip())
+            if trip is None or stop_idx is None:
+                continue
+            try:
+                sequence = int(row.get('stop_sequence', ''))
+            except ValueError:
+                continue
+            
+            route_id = trip[0]
+            if route_id not in first_trip:
+                first_trip[route_id] = trip_id
+            if trip_id not in trip_order:
+                trip_order[trip_id] = len(trip_order)
+            trip_calls[trip_id].append((sequence, stop_idx))
+            
+            arrival = (row.get('arrival_time') or row.get('departure_time') or '').strip()
+            if arrival:
+                sched_stop.append(stop_idx)
+                sched_arrival.append(parse_time(arrival))
+                sched_trip.append(trip_order[trip_id])
+    
+    for calls in trip_calls.values():
+        calls.sort()
+    
+    print(f"Parsed stop times for {len(trip_calls)} trips ({len(sched_arrival)} scheduled arrivals)")
+    return {
+        'first_trip': first_trip,
+        'trip_calls': trip_calls,
+        'trip_order': trip_order,
+        'sched_stop': sched_stop,
+        'sched_arrival': sched_arrival,
+        'sched_trip': sched_trip
+    }
+
+
+def merge_patterns(patterns: set) -> List[str]:
+    """Merge stop patterns into one ordered list, splicing in branch stops"""
+    ordered_patterns = sorted(patterns, key=len, reverse=True)
+    if not ordered_patterns:
+        return []
+    
+    ordered = list(ordered_patterns[0])
+    seen = set(ordered)
+    for pattern in ordered_patterns[1:]:
+        insert_at = 0
+        for stop_id in pattern:
+            if stop_id in seen:
+                insert_at = ordered.index(stop_id) + 1
+                continue
+            ordered.insert(insert_at, stop_id)
+            seen.add(stop_id)
+            insert_at += 1
+    
+    return ordered
+
+
+def build_line_stations(
+    stops: Dict[str, Dict],
+    stop_ids: List[str],
+    routes: Dict[str, str],
+    trips: Dict[str, Tuple[str, str, int]],
+    stop_times: Dict
+) -> Tuple[Dict[str, List[Tuple[str, int]]], Dict[str, List[str]]]:
+    """
+    Derive per-line stop orderings
+    
+    Returns:
+        (line -> representative trip's [(stop_id, sequence)] for the map,
+         route_id -> merged station order over all direction-0 patterns)
+    """
+    line_stations = {}
+    for route_id, trip_id in stop_times['first_trip'].items():
+        line_stations[routes[route_id]] = [
+            (stop_ids[stop_idx], sequence) for sequence, stop_idx in stop_times['trip_calls'][trip_id]
+        ]
+    
+    patterns: Dict[str, set] = defaultdict(set)
+    for trip_id, calls in stop_times['trip_calls'].items():
+        route_id, _, direction = trips[trip_id]
+        if direction != 0:
+            continue
+        patterns[route_id].add(tuple(resolve_station(stop_ids[stop_idx], stops) for _, stop_idx in calls))
+    
+    line_order = {line: merge_patterns(line_patterns) for line, line_patterns in patterns.items()}
     print(f"Parsed stop sequences for {len(line_stations)} lines")
-    return line_stations
+    return line_stations, line_order
+
 
 def generate_station_coords(stops: dict, line_stations: dict) -> dict:
     """Generate final station coordinates JSON structure"""
@@ -134,19 +278,7 @@ def generate_station_coords(stops: dict, line_stations: dict) -> dict:
     for line, stations in line_stations.items():
         seen_stops = set()  # Track stops we've added for this line
         for order, (stop_id_with_dir, seq) in enumerate(stations, start=1):
-            # Remove direction suffix (N/S) from stop_id
-            base_stop_id = stop_id_with_dir.rstrip('NS')
-            
-            # Try to find matching stop
-            matching_stop_id = None
-            if base_stop_id in stops:
-                matching_stop_id = base_stop_id
-            else:
-                # Try variations (sometimes stops have different IDs)
-                for stop_id in stops.keys():
-                    if stop_id.startswith(base_stop_id) or base_stop_id.startswith(stop_id):
-                        matching_stop_id = stop_id
-                        break
+            matching_stop_id = resolve_station(stop_id_with_dir, stops)
             
             if matching_stop_id and matching_stop_id not in seen_stops:
                 stop = stops[matching_stop_id]
@@ -164,6 +296,128 @@ def generate_station_coords(stops: dict, line_stations: dict) -> dict:
     
     return result
 
+
+def write_station_shards(station_coords: dict, shard_dir: Path, source: str):
+    """
+    Write minified per-line station shards and their manifest
+    
+    Shard names carry a hash of their content, so a shard URL never changes
+    meaning and can be cached forever; only manifest.json (small, revalidated)
+    changes when stations do. Shards no longer listed are removed.
+    """
+    shard_dir.mkdir(parents=True, exist_ok=True)
+    by_line = defaultdict(list)
+    for station in station_coords.values():
+        by_line[station['line']].append(station)
+    
+    lines = {}
+    for line in sorted(by_line):
+        stations = sorted(by_line[line], key=lambda s: s['order'])
+        payload = json.dumps(
+            {"line": line, "fields": SHARD_FIELDS, "stations": [[s[f] for f in SHARD_FIELDS] for s in stations]},
+            separators=(',', ':'), ensure_ascii=False
+        ).encode('utf-8')
+        digest = hashlib.sha256(payload).hexdigest()[:SHARD_HASH_LENGTH]
+        filename = f"{line}.{digest}.json"
+        (shard_dir / filename).write_bytes(payload)
+        lines[line] = {"file": filename, "stations": len(stations), "bytes": len(payload)}
+    
+    lats = [s['lat'] for s in station_coords.values()]
+    lons = [s['lon'] for s in station_coords.values()]
+    manifest = {
+        "version": hashlib.sha256(
+            "".join(lines[line]["file"] for line in lines).encode('utf-8')
+        ).hexdigest()[:SHARD_HASH_LENGTH],
+        "generated_from": source,
+        "fields": SHARD_FIELDS,
+        "bounds": [[min(lats), min(lons)], [max(lats), max(lons)]] if lats else None,
+        "lines": lines
+    }
+    with open(shard_dir / 'manifest.json', 'w') as f:
+        json.dump(manifest, f, separators=(',', ':'))
+    
+    current = {entry["file"] for entry in lines.values()} | {'manifest.json'}
+    for stale in shard_dir.glob('*.json'):
+        if stale.name not in current:
+            stale.unlink()
+    
+    total = sum(entry["bytes"] for entry in lines.values())
+    print(f"✓ Generated {len(lines)} station shards in {shard_dir} ({total / 1e3:.1f} KB)")
+
+
+def write_static_index(
+    path: Path,
+    stops: Dict[str, Dict],
+    stop_ids: List[str],
+    routes: Dict[str, str],
+    trips: Dict[str, Tuple[str, str, int]],
+    services: Dict[str, Dict],
+    line_order: Dict[str, List[str]],
+    stop_times: Dict
+):
+    """Write the columnar static index (see module docstring for the layout)"""
+    route_ids = sorted(routes)
+    route_pos = {route_id: i for i, route_id in enumerate(route_ids)}
+    service_ids = sorted(services)
+    service_pos = {service_id: i for i, service_id in enumerate(service_ids)}
+    trip_ids = sorted(stop_times['trip_order'], key=stop_times['trip_order'].get)
+    stop_pos = {stop_id: i for i, stop_id in enumerate(stop_ids)}
+    
+    columns = {
+        'trip_route': array('H', (route_pos[trips[t][0]] for t in trip_ids)),
+        'trip_service': array('H', (service_pos.get(trips[t][1], 0) for t in trip_ids)),
+        'trip_direction': array('B', (trips[t][2] for t in trip_ids)),
+    }
+    
+    # Sort scheduled arrivals by (stop, arrival) and build CSR offsets per stop
+    sched_stop, sched_arrival, sched_trip = stop_times['sched_stop'], stop_times['sched_arrival'], stop_times['sched_trip']
+    order = sorted(range(len(sched_arrival)), key=lambda i: (sched_stop[i], sched_arrival[i]))
+    columns['sched_arrival'] = array('I', (sched_arrival[i] for i in order))
+    columns['sched_trip'] = array('I', (sched_trip[i] for i in order))
+    offsets = array('I', [0] * (len(stop_ids) + 1))
+    for i in order:
+        offsets[sched_stop[i] + 1] += 1
+    for i in range(len(stop_ids)):
+        offsets[i + 1] += offsets[i]
+    columns['sched_offsets'] = offsets
+    
+    blob = bytearray()
+    column_meta = {}
+    for name, column in columns.items():
+        if sys.byteorder == 'big':
+            # The layout is little-endian on every host
+            column = array(column.typecode, column)
+            column.byteswap()
+        data = column.tobytes()
+        column_meta[name] = {'type': column.typecode, 'offset': len(blob), 'length': len(column)}
+        blob.extend(data)
+    
+    header = {
+        'format_version': INDEX_FORMAT_VERSION,
+        'stops': {
+            'id': stop_ids,
+            'name': [stops[s]['name'] for s in stop_ids],
+            'lat': [stops[s]['lat'] for s in stop_ids],
+            'lon': [stops[s]['lon'] for s in stop_ids],
+            'parent': [stop_pos.get(stops[s]['parent'], -1) for s in stop_ids]
+        },
+        'routes': {'id': route_ids, 'line': [routes[r] for r in route_ids]},
+        'lines': line_order,
+        'services': {'id': service_ids, 'rules': [services[s] for s in service_ids]},
+        'trips': trip_ids,
+        'columns': column_meta
+    }
+    header_bytes = json.dumps(header, separators=(',', ':')).encode('utf-8')
+    
+    with open(path, 'wb') as f:
+        f.write(INDEX_MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        f.write(blob)
+    
+    print(f"✓ Generated {path} ({(len(header_bytes) + len(blob)) / 1e6:.1f} MB, {len(sched_arrival)} scheduled arrivals)")
+
+
 def main():
     """Main function to process GTFS data"""
     script_dir = Path(__file__).parent
@@ -176,6 +430,15 @@ def main():
     if not gtfs_zip.exists():
         gtfs_zip = script_dir / 'gtfs_static.zip'
     output_file = output_dir / 'station_coords.json'
+    shard_dir = project_root / 'frontend' / 'public' / 'stations'
+    index_file = script_dir / 'gtfs_static.idx'
+    
+    # Re-shard the existing station_coords.json without the GTFS zip
+    if '--shards-only' in sys.argv[1:]:
+        with open(output_file) as f:
+            existing = json.load(f)
+        write_station_shards(existing["stations"], shard_dir, existing.get("generated_from", "MTA GTFS Static Data"))
+        return
     
     if not gtfs_zip.exists():
         print(f"Error: {gtfs_zip} not found")
@@ -185,9 +448,16 @@ def main():
     
     print(f"Parsing {gtfs_zip}...")
     try:
-        stops = parse_gtfs_stops(str(gtfs_zip))
-        routes = parse_gtfs_routes(str(gtfs_zip))
-        line_stations = parse_gtfs_stop_times(str(gtfs_zip), routes, stops)
+        with zipfile.ZipFile(gtfs_zip, 'r') as zip_ref:
+            stops = parse_gtfs_stops(zip_ref)
+            routes = parse_gtfs_routes(zip_ref)
+            trips = parse_gtfs_trips(zip_ref, routes)
+            services = parse_gtfs_calendar(zip_ref)
+            stop_ids = list(stops)
+            stop_index = {stop_id: i for i, stop_id in enumerate(stop_ids)}
+            stop_times = parse_gtfs_stop_times(zip_ref, trips, stop_index)
+        
+        line_stations, line_order = build_line_stations(stops, stop_ids, routes, trips, stop_times)
         station_coords = generate_station_coords(stops, line_stations)
         
         result = {
@@ -202,6 +472,9 @@ def main():
         
         print(f"✓ Generated {output_file}")
         print(f"  Stations: {len(station_coords)}, Lines: {len(result['lines'])}")
+        
+        write_station_shards(station_coords, shard_dir, result["generated_from"])
+        write_static_index(index_file, stops, stop_ids, routes, trips, services, line_order, stop_times)
     except Exception as e:
         print(f"Error: {e}")
         import traceback
@@ -209,4 +482,3 @@ def main():
 
 if __name__ == '__main__':
     main()
-
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Encoding benchmark for the negotiable API responses
+
+Builds /eta and /eta/stations/{line} payloads for every station in
+frontend/src/data/station_coords.json and measures, per encoding (JSON,
+MessagePack, Protobuf), the body size and the CPU time per request for a
+cold encode versus a hit in ResponseEncoder's per-version body cache.
+Needs no Redis or running API.
+
+Usage:
+  python scripts/testing/encoding_benchmark.py --rounds 5 \
+    --output encoding_$(git rev-parse --short HEAD).json
+
+Results are written as JSON (sorted keys) so runs from different commits can
+be diffed directly.
+"""
+import argparse
+import json
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Callable, Dict, List
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+STATION_COORDS = PROJECT_ROOT / "frontend" / "src" / "data" / "station_coords.json"
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+from api.config import Config  # noqa: E402
+from api.services.encoding import JSON, MSGPACK, PROTOBUF, ResponseEncoder, representation_etag  # noqa: E402
+from api.services.http_cache import make_etag  # noqa: E402
+
+ENCODINGS = {"json": JSON, "msgpack": MSGPACK, "protobuf": PROTOBUF}
+
+
+def build_payloads(lines: List[str]) -> Dict[str, List[Dict]]:
+    """ETAResponse payloads for every station and StationsResponse payloads for every line"""
+    with open(STATION_COORDS) as f:
+        data = json.load(f)
+    
+    now = datetime.utcnow()
+    stations = sorted(
+        (s for s in data["stations"].values() if s["line"] in lines),
+        key=lambda s: (s["line"], s["order"])
+    )
+    catalog: Dict[str, List[Dict]] = defaultdict(list)
+    etas = []
+    for station in stations:
+        line, station_id = station["line"], station["stop_id"]
+        catalog[line].append({
+            "id": station_id,
+            "name": station["name"],
+            "lat": station["lat"],
+            "lon": station["lon"],
+            "order": len(catalog[line]) + 1
+        })
+        etas.append({
+            "line": line,
+            "station_id": station_id,
+            "station_name": station["name"],
+            "etas": [
+                {
+                    "direction": direction,
+                    "trains": [
+                        {
+                            "arrival_time": (now + timedelta(minutes=2 + 6 * i)).isoformat(),
+                            "eta_minutes": 2 + 6 * i,
+                            "train_id": f"{line}_{station_id}_{direction}_{i}",
+                            "route_id": line,
+                            "status": "on_time",
+                            "delay_seconds": None
+                        }
+                        for i in range(3)
+                    ]
+                }
+                for direction in ("N", "S")
+            ],
+            "last_updated": now.isoformat()
+        })
+    
+    return {
+        "eta": etas,
+        "stations": [{"line": line, "stations": line_stations} for line, line_stations in catalog.items()]
+    }
+
+
+def cpu_per_call_us(fn: Callable[[], None], calls: int, rounds: int) -> Dict:
+    """Median and best CPU microseconds per call over `rounds` batches of `calls`"""
+    samples = []
+    for _ in range(rounds):
+        start = time.process_time()
+        fn()
+        samples.append((time.process_time() - start) / calls * 1e6)
+    return {"median": round(statistics.median(samples), 2), "best": round(min(samples), 2)}
+
+
+def bench(payloads: List[Dict], message: str, rounds: int) -> Dict:
+    """Size and CPU cost of each encoding for one kind of payload"""
+    results = {}
+    for name, media_type in ENCODINGS.items():
+        etags = [
+            representation_etag(make_etag(message, i, "bench"), media_type)
+            for i in range(len(payloads))
+        ]
+        
+        def cold():
+            encoder = ResponseEncoder(Config())
+            for payload in payloads:
+                encoder.encode(payload, message, media_type)
+        
+        warm_encoder = ResponseEncoder(Config())
+        warm_encoder.config.RESPONSE_CACHE_SIZE = len(payloads)
+        for payload, etag in zip(payloads, etags):
+            warm_encoder.encode(payload, message, media_type, etag)
+        
+        def cached():
+            for etag in etags:
+                warm_encoder.cached(etag)
+        
+        sizes = [len(warm_encoder.cached(etag)) for etag in etags]
+        results[name] = {
+            "bytes": {"mean": round(statistics.mean(sizes), 1), "total": sum(sizes)},
+            "cpu_us_per_request": {
+                "encode": cpu_per_call_us(cold, len(payloads), rounds),
+                "cached": cpu_per_call_us(cached, len(payloads), rounds)
+            }
+        }
+    
+    json_bytes = results["json"]["bytes"]["total"]
+    for name in ENCODINGS:
+        results[name]["bytes"]["vs_json"] = round(results[name]["bytes"]["total"] / json_bytes, 3)
+    return results
+
+
+def git_commit() -> str:
+    """Current commit hash, for labelling results"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    config = Config()
+    parser = argparse.ArgumentParser(description="Benchmark API response encodings")
+    parser.add_argument("--rounds", type=int, default=5, help="Timed batches per measurement")
+    parser.add_argument("--output", default="encoding_results.json")
+    args = parser.parse_args()
+    
+    payloads = build_payloads(config.SUPPORTED_LINES)
+    results = {
+        "eta": bench(payloads["eta"], "ETAResponse", args.rounds),
+        "stations": bench(payloads["stations"], "StationsResponse", args.rounds)
+    }
+    
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "params": {
+            "rounds": args.rounds,
+            "eta_payloads": len(payloads["eta"]),
+            "stations_payloads": len(payloads["stations"])
+        },
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    
+    for kind, by_encoding in results.items():
+        for name, r in by_encoding.items():
+            print(f"{kind:9} {name:9} {r['bytes']['mean']:>9.1f} B  x{r['bytes']['vs_json']:<6} "
+                  f"encode {r['cpu_us_per_request']['encode']['median']:>8.2f}us  "
+                  f"cached {r['cpu_us_per_request']['cached']['median']:>6.2f}us")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+#!/usr/bin/env python3
+"""
+Load test for the ETA API
+
+Seeds Redis with a full-system ETA dataset built from
+frontend/src/data/station_coords.json, mints a token through
+AuthService.generate_token, then drives /eta, /eta/stations/{line} and
+/health with a fixed number of concurrent clients. Station selection is
+Zipf-skewed so a few hot stations get most of the traffic, like real
+rider demand.
+
+Usage:
+  # Against a local Redis and an API already running on :8000
+  python scripts/testing/load_test.py --duration 30 --concurrency 64
+  
+  # Start an in-memory fake Redis on :6379 (fakeredis), seed it, and wait;
+  # point the API at it with REDIS_HOST=localhost, then run the load in
+  # another shell with --no-seed
+  python scripts/testing/load_test.py --fake-redis --serve-only
+
+Results are written as JSON (sorted keys, one entry per endpoint) so runs
+from different commits can be diffed directly.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+from collections import defaultdict
+from itertools import accumulate
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, List
+
+import httpx
+import redis
+
+PROJECT_ROOT = Path(__file__).resolve().parents[2]
+STATION_COORDS = PROJECT_ROOT / "frontend" / "src" / "data" / "station_coords.json"
+sys.path.insert(0, str(PROJECT_ROOT / "backend"))
+
+from api.config import Config  # noqa: E402
+from api.services.auth_service import AuthService  # noqa: E402
+from api.services.redis_keys import SNAPSHOT_KEY, STATIONS_VERSION_KEY, eta_key, stations_key  # noqa: E402
+
+
+def load_stations(lines: List[str]) -> List[Dict]:
+    """Return every station on the given lines, in line order"""
+    with open(STATION_COORDS) as f:
+        data = json.load(f)
+    
+    stations = [s for s in data["stations"].values() if s["line"] in lines]
+    stations.sort(key=lambda s: (s["line"], s["order"]))
+    return stations
+
+
+def seed_redis(client: redis.Redis, stations: List[Dict], ttl: int):
+    """Write ETA keys, the snapshot pointer and the station catalog for every station"""
+    now = datetime.utcnow()
+    now_epoch = time.time()
+    version = str(int(now_epoch * 1000))
+    pipe = client.pipeline(transaction=False)
+    catalog: Dict[str, List[Dict]] = defaultdict(list)
+    
+    for station in stations:
+        line, station_id, name = station["line"], station["stop_id"], station["name"]
+        catalog[line].append({
+            "id": station_id,
+            "name": name,
+            "lat": station["lat"],
+            "lon": station["lon"],
+            "order": len(catalog[line]) + 1
+        })
+        for direction in ("N", "S"):
+            first = random.randint(0, 6)
+            trains = [
+                {
+                    "arrival_time": (now + timedelta(minutes=first + 6 * i)).isoformat(),
+                    "eta_minutes": first + 6 * i,
+                    "train_id": f"{line}_{station_id}_{direction}_{i}",
+                    "route_id": line,
+                    "status": "on_time"
+                }
+                for i in range(3)
+            ]
+            pipe.setex(eta_key(line, version, station_id, direction), ttl, json.dumps({
+                "line": line,
+                "station_id": station_id,
+                "direction": direction,
+                "trains": trains,
+                "station_name": name,
+                "last_updated": now.isoformat()
+            }))
+    
+    for line, line_stations in catalog.items():
+        pipe.set(stations_key(line), json.dumps({"line": line, "stations": line_stations}))
+    pipe.setex(SNAPSHOT_KEY, ttl, json.dumps({
+        "version": version,
+        "updated_at": now_epoch,
+        "lines": {
+            line: {"version": version, "updated_at": now_epoch, "next_update_at": now_epoch + 30}
+            for line in catalog
+        }
+    }))
+    pipe.set(STATIONS_VERSION_KEY, f"loadtest-{int(now_epoch)}")
+    pipe.execute()
+    print(f"Seeded {len(stations) * 2} ETA keys across {len(catalog)} lines")
+
+
+def zipf_weights(n: int, s: float) -> List[float]:
+    """Zipf weights for n items with exponent s (s=0 is uniform)"""
+    return [1.0 / (rank ** s) for rank in range(1, n + 1)]
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    index = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+def summarize(latencies: List[float], statuses: Dict[int, int], errors: int, elapsed: float) -> Dict:
+    """Summarize one endpoint's samples (latencies in seconds)"""
+    latencies = sorted(latencies)
+    count = len(latencies)
+    return {
+        "requests": count,
+        "errors": errors,
+        "status_codes": {str(code): n for code, n in sorted(statuses.items())},
+        "rps": round(count / elapsed, 1) if elapsed else 0.0,
+        "latency_ms": {
+            "mean": round(sum(latencies) / count * 1000, 3) if count else 0.0,
+            "p50": round(percentile(latencies, 50) * 1000, 3),
+            "p95": round(percentile(latencies, 95) * 1000, 3),
+            "p99": round(percentile(latencies, 99) * 1000, 3),
+            "max": round(latencies[-1] * 1000, 3) if count else 0.0
+        }
+    }
+
+
+async def run_load(args, token: str, stations: List[Dict]) -> Dict:
+    """Drive the API with args.concurrency clients for args.duration seconds"""
+    mix = dict(item.split("=") for item in args.mix.split(","))
+    endpoints = list(mix)
+    endpoint_weights = [float(mix[name]) for name in endpoints]
+    
+    # Hot stations: shuffle once with a fixed seed, then weight by Zipf rank
+    hot_order = [(s["line"], s["stop_id"]) for s in stations]
+    random.Random(args.random_seed).shuffle(hot_order)
+    station_cum_weights = list(accumulate(zipf_weights(len(hot_order), args.skew)))
+    lines = sorted({s["line"] for s in stations})
+    
+    latencies: Dict[str, List[float]] = defaultdict(list)
+    statuses: Dict[str, Dict[int, int]] = defaultdict(lambda: defaultdict(int))
+    errors: Dict[str, int] = defaultdict(int)
+    headers = {"Authorization": f"Bearer {token}"}
+    deadline = time.perf_counter() + args.duration
+    
+    async def client_loop(client: httpx.AsyncClient, rng: random.Random):
+        while time.perf_counter() < deadline:
+            endpoint = rng.choices(endpoints, endpoint_weights)[0]
+            if endpoint == "eta":
+                line, station_id = rng.choices(hot_order, cum_weights=station_cum_weights)[0]
+                url = f"/eta?line={line}&station_id={station_id}"
+            elif endpoint == "stations":
+                url = f"/eta/stations/{rng.choice(lines)}"
+            else:
+                url = "/health"
+            
+            start = time.perf_counter()
+            try:
+                response = await client.get(url, headers=headers)
+                latencies[endpoint].append(time.perf_counter() - start)
+                statuses[endpoint][response.status_code] += 1
+                if response.status_code >= 400:
+                    errors[endpoint] += 1
+            except httpx.HTTPError:
+                latencies[endpoint].append(time.perf_counter() - start)
+                errors[endpoint] += 1
+    
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=args.base_url, limits=limits, timeout=args.timeout) as client:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            client_loop(client, random.Random(args.random_seed + i))
+            for i in range(args.concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+    
+    results = {
+        name: summarize(latencies[name], statuses[name], errors[name], elapsed)
+        for name in endpoints
+    }
+    total_statuses: Dict[int, int] = defaultdict(int)
+    for name in endpoints:
+        for code, n in statuses[name].items():
+            total_statuses[code] += n
+    results["total"] = summarize(
+        [sample for name in endpoints for sample in latencies[name]],
+        total_statuses,
+        sum(errors.values()),
+        elapsed
+    )
+    return results
+
+
+def git_commit() -> str:
+    """Current commit hash, for labelling results"""
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=PROJECT_ROOT, text=True
+        ).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def start_fake_redis(host: str, port: int):
+    """Start an in-memory fake Redis server (fakeredis) in a background thread"""
+    try:
+        from fakeredis import TcpFakeServer
+    except ImportError:
+        print("ERROR: --fake-redis requires fakeredis>=2.23 (pip install fakeredis)", file=sys.stderr)
+        sys.exit(1)
+    
+    import threading
+    server = TcpFakeServer((host, port), server_type="redis")
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    print(f"Fake Redis listening on {host}:{port}")
+    return server
+
+
+def main():
+    config = Config()
+    parser = argparse.ArgumentParser(description="Load test the ETA API")
+    parser.add_argument("--base-url", default=os.getenv("API_URL", "http://localhost:8000"))
+    parser.add_argument("--redis-host", default=os.getenv("REDIS_HOST", "localhost"))
+    parser.add_argument("--redis-port", type=int, default=config.REDIS_PORT)
+    parser.add_argument("--fake-redis", action="store_true", help="Serve an in-memory fake Redis on --redis-port")
+    parser.add_argument("--serve-only", action="store_true", help="Seed (fake) Redis and wait without generating load")
+    parser.add_argument("--no-seed", dest="seed", action="store_false", help="Skip seeding Redis")
+    parser.add_argument("--seed-ttl", type=int, default=3600, help="TTL of seeded keys in seconds")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--duration", type=float, default=20.0, help="Seconds of load")
+    parser.add_argument("--timeout", type=float, default=5.0, help="Per-request timeout in seconds")
+    parser.add_argument("--skew", type=float, default=1.1, help="Zipf exponent for station popularity (0 = uniform)")
+    parser.add_argument("--mix", default="eta=0.85,stations=0.1,health=0.05", help="Endpoint weights")
+    parser.add_argument("--random-seed", type=int, default=42)
+    parser.add_argument("--output", default="loadtest_results.json")
+    args = parser.parse_args()
+    
+    random.seed(args.random_seed)
+    stations = load_stations(config.SUPPORTED_LINES)
+    
+    if args.fake_redis:
+        start_fake_redis(args.redis_host, args.redis_port)
+    if args.seed:
+        seed_redis(redis.Redis(host=args.redis_host, port=args.redis_port), stations, args.seed_ttl)
+    
+    if args.serve_only:
+        print("Seeded; press Ctrl+C to stop")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            return
+    
+    token = AuthService(config).generate_token(user_id="loadtest", expires_in_hours=1)
+    print(f"Running {args.concurrency} clients for {args.duration}s against {args.base_url}...")
+    results = asyncio.run(run_load(args, token, stations))
+    
+    report = {
+        "commit": git_commit(),
+        "timestamp": datetime.utcnow().isoformat(),
+        "params": {
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "skew": args.skew,
+            "mix": args.mix,
+            "stations": len(stations)
+        },
+        "results": results
+    }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+    
+    total = results["total"]
+    print(f"RPS: {total['rps']}  p50: {total['latency_ms']['p50']}ms  "
+          f"p95: {total['latency_ms']['p95']}ms  p99: {total['latency_ms']['p99']}ms  "
+          f"errors: {total['errors']}")
+    print(f"Wrote {args.output}")
+
+
+if __name__ == "__main__":
+    main()